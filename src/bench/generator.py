@@ -0,0 +1,229 @@
+import json
+import string
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.bench.workbook import generate_workbook
+from src.elt.parsers import BRAPI_QUOTE_LIST_SCHEMA, FUNDAMENTUS_SCHEMA
+
+
+# Cabeçalhos da tabela de resultados do Fundamentus, na ordem da página.
+FUNDAMENTUS_HEADERS = [
+    'Papel', 'Cotação', 'P/L', 'P/VP', 'PSR', 'Div.Yield', 'P/Ativo', 'P/Cap.Giro', 'P/EBIT',
+    'P/Ativ Circ.Liq', 'EV/EBIT', 'EV/EBITDA', 'Mrg Ebit', 'Mrg. Líq.', 'Liq. Corr.', 'ROIC', 'ROE',
+    'Liq.2meses', 'Patrim. Líq', 'Dív.Brut/ Patrim.', 'Cresc. Rec.5a',
+]
+
+SECTORS = [
+    'Finance', 'Energy Minerals', 'Utilities', 'Retail Trade', 'Health Services',
+    'Process Industries', 'Transportation', 'Consumer Non-Durables', None,
+]
+
+
+class BronzeGenerator:
+    def __init__(self, output_dir: str, tickers: int, days: int, users: int, trades: int,
+                 end_date: str = '2024-09-20', seed: int = 42) -> None:
+        """
+        Inicializa o gerador de dados sintéticos no layout do bronze.
+
+        :param output_dir: Diretório onde o bronze e as fixtures serão gerados.
+        :param tickers: Número de tickers em cada snapshot.
+        :param days: Número de dias úteis com snapshots do Fundamentus e da brapi.
+        :param users: Número de usuários.
+        :param trades: Número total de negociações.
+        :param end_date: Data do último snapshot.
+        :param seed: Semente do gerador aleatório.
+        """
+        self.output_dir = Path(output_dir)
+        self.bronze_path = self.output_dir / 'bronze'
+        self.fixtures_path = self.output_dir / 'fixtures'
+        self.n_tickers = tickers
+        self.n_days = days
+        self.n_users = users
+        self.n_trades = trades
+        self.rng = np.random.default_rng(seed)
+        self.dates = pd.bdate_range(end=end_date, periods=days)
+        self.tickers = self._tickers()
+
+
+    def _tickers(self) -> np.ndarray:
+        """Gera códigos de negociação no formato da B3 (ex.: ``ABCD3``)."""
+        letters = np.array(list(string.ascii_uppercase))
+        codes = set()
+        while len(codes) < self.n_tickers:
+            prefix = ''.join(self.rng.choice(letters, 4))
+            codes.add(prefix + str(self.rng.choice(['3', '4', '11'])))
+        return np.array(sorted(codes))
+
+
+    def _fundamentus_day(self, cotacao: np.ndarray) -> pa.Table:
+        """Gera um snapshot do Fundamentus no schema do bronze."""
+        n = self.n_tickers
+        rng = self.rng
+        columns = {
+            'ticker': self.tickers,
+            'cotacao': cotacao,
+            'p_l': rng.normal(12, 8, n),
+            'p_vp': rng.lognormal(0, 0.6, n),
+            'psr': rng.lognormal(0, 0.8, n),
+            'dividend_yield': rng.uniform(0, 0.15, n),
+            'p_ativo': rng.uniform(0, 2, n),
+            'p_capital_giro': rng.normal(5, 10, n),
+            'p_ebit': rng.normal(8, 6, n),
+            'p_ativo_circ_liq': rng.normal(-2, 3, n),
+            'ev_ebit': rng.normal(9, 6, n),
+            'ev_ebitda': rng.normal(7, 5, n),
+            'mrg_ebit': rng.normal(0.15, 0.2, n),
+            'mrg_liquida': rng.normal(0.1, 0.2, n),
+            'liquidez_corr': rng.uniform(0, 4, n),
+            'roic': rng.normal(0.1, 0.1, n),
+            'roe': rng.normal(0.12, 0.15, n),
+            'liquidez_2_meses': rng.lognormal(13, 3, n),
+            'patrimonio_liquido': rng.lognormal(20, 2, n),
+            'div_bruta_patrim': rng.uniform(0, 3, n),
+            'cres_rec_5a': rng.normal(0.08, 0.2, n),
+        }
+        return pa.Table.from_pydict(columns, schema=FUNDAMENTUS_SCHEMA)
+
+
+    def _brapi_day(self, cotacao: np.ndarray, change: np.ndarray, sectors: np.ndarray) -> pa.Table:
+        """Gera um snapshot da lista de cotações da brapi no schema do bronze."""
+        n = self.n_tickers
+        columns = {
+            'stock': self.tickers,
+            'name': np.char.add(self.tickers, ' SA'),
+            'close': cotacao,
+            'change': change,
+            'volume': self.rng.integers(0, 50_000_000, n),
+            'market_cap': cotacao * self.rng.lognormal(19, 2, n),
+            'logo': np.char.add(np.char.add('https://logo.example/', self.tickers), '.svg'),
+            'sector': sectors,
+            'type': np.full(n, 'stock'),
+        }
+        return pa.Table.from_pydict(columns, schema=BRAPI_QUOTE_LIST_SCHEMA)
+
+
+    @staticmethod
+    def _write_partition(table: pa.Table, directory: Path, day: pd.Timestamp) -> None:
+        """Grava um snapshot em ``directory/extracted_date=YYYY-MM-DD/data.parquet``."""
+        extracted_date = pa.scalar(day, type=pa.timestamp('us'))
+        table = table.append_column('_extracted_date', pa.repeat(extracted_date, table.num_rows))
+        partition = directory / f'extracted_date={day:%Y-%m-%d}'
+        partition.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, partition / 'data.parquet')
+
+
+    def generate_snapshots(self) -> int:
+        """
+        Gera os snapshots diários do Fundamentus e da brapi.
+
+        :return: O número de linhas geradas por fonte.
+        """
+        cotacao = self.rng.lognormal(3, 0.8, self.n_tickers)
+        sectors = self.rng.choice(np.array(SECTORS, dtype=object), self.n_tickers)
+        for day in self.dates:
+            change = self.rng.normal(0, 0.02, self.n_tickers)
+            cotacao = np.round(cotacao * (1 + change), 2)
+            self._write_partition(self._fundamentus_day(cotacao), self.bronze_path / 'fundamentus', day)
+            self._write_partition(self._brapi_day(cotacao, change * 100, sectors), self.bronze_path / 'brapi', day)
+        return self.n_tickers * self.n_days
+
+
+    def generate_sheets(self) -> int:
+        """
+        Gera os Parquets de usuários e de negociações por usuário.
+
+        :return: O número de negociações geradas.
+        """
+        extracted_date = pd.Timestamp(self.dates[-1])
+        usuarios_path = self.bronze_path / 'sheets' / 'usuarios'
+        negociacoes_path = self.bronze_path / 'sheets' / 'negociacoes'
+        usuarios_path.mkdir(parents=True, exist_ok=True)
+        negociacoes_path.mkdir(parents=True, exist_ok=True)
+
+        ids = np.arange(1, self.n_users + 1)
+        df_usuarios = pd.DataFrame({
+            'id': ids,
+            'email': [f'user{i}@email.com' for i in ids],
+            'nome': [f'user{i}' for i in ids],
+            '_extracted_date': extracted_date,
+        })
+        df_usuarios.to_parquet(usuarios_path / 'usuarios.parquet', index=False)
+
+        df_negociacoes = pd.DataFrame({
+            'data_movimentacao': self.rng.choice(self.dates.values, self.n_trades),
+            'ticker': self.rng.choice(self.tickers, self.n_trades),
+            'quantidade': self.rng.integers(1, 1000, self.n_trades),
+            'tipo_negociacao': self.rng.choice(['compra', 'venda'], self.n_trades, p=[0.7, 0.3]),
+            'tipo_ativo': 'Ação',
+            'tipo_acao': self.rng.choice(['Ordinária', 'Preferencial'], self.n_trades),
+            'usuario_id': self.rng.integers(1, self.n_users + 1, self.n_trades).astype(str),
+            '_extracted_date': extracted_date,
+        })
+        df_negociacoes['data_movimentacao'] = df_negociacoes['data_movimentacao'].astype('datetime64[ns]')
+        for usuario_id, df_usuario in df_negociacoes.groupby('usuario_id'):
+            df_usuario.to_parquet(negociacoes_path / f'{usuario_id}.parquet', index=False)
+        return self.n_trades
+
+
+    @staticmethod
+    def _format_number(values: np.ndarray, percent: bool = False) -> np.ndarray:
+        """Formata números no padrão brasileiro, como na página do Fundamentus."""
+        suffix = '%' if percent else ''
+        return np.array([
+            f'{value:,.2f}'.replace(',', '_').replace('.', ',').replace('_', '.') + suffix
+            for value in (values * 100 if percent else values)
+        ])
+
+
+    def generate_fixtures(self, trades_per_user: int = 20) -> None:
+        """
+        Gera as respostas locais usadas pelos benchmarks de extração.
+
+        São gerados ``fundamentus.html`` e ``brapi.json`` a partir do último snapshot e
+        uma planilha ``usuarios_negociacoes.xlsx`` com uma aba por usuário.
+
+        :param trades_per_user: Número de negociações em cada aba da planilha.
+        """
+        self.fixtures_path.mkdir(parents=True, exist_ok=True)
+        day = f'extracted_date={self.dates[-1]:%Y-%m-%d}'
+
+        fundamentus = pq.read_table(self.bronze_path / 'fundamentus' / day / 'data.parquet')
+        columns = [fundamentus.column('ticker').to_numpy(zero_copy_only=False)]
+        for name in FUNDAMENTUS_SCHEMA.names[1:]:
+            percent = name in {'dividend_yield', 'mrg_ebit', 'mrg_liquida', 'roic', 'roe', 'cres_rec_5a'}
+            columns.append(self._format_number(fundamentus.column(name).to_numpy(), percent))
+        rows = ''.join(
+            '<tr><td><span class="tips"><a href="detalhes.php?papel={0}">{0}</a></span></td>'.format(row[0])
+            + ''.join(f'<td>{value}</td>' for value in row[1:]) + '</tr>\n'
+            for row in zip(*columns)
+        )
+        header = ''.join(f'<th><a href="#">{name}</a></th>' for name in FUNDAMENTUS_HEADERS)
+        html = (
+            '<html><head><meta charset="utf-8"></head><body>'
+            f'<table id="resultado"><thead><tr>{header}</tr></thead><tbody>\n{rows}</tbody></table>'
+            '</body></html>'
+        )
+        (self.fixtures_path / 'fundamentus.html').write_text(html, encoding='utf-8')
+
+        brapi = pq.read_table(self.bronze_path / 'brapi' / day / 'data.parquet').drop_columns(['_extracted_date'])
+        with open(self.fixtures_path / 'brapi.json', 'w') as file:
+            json.dump({'indexes': [], 'stocks': brapi.to_pylist(), 'availableSectors': SECTORS[:-1]}, file)
+
+        generate_workbook(self.fixtures_path / 'usuarios_negociacoes.xlsx', self.n_users, trades_per_user)
+
+
+    def generate(self) -> dict:
+        """
+        Gera o bronze e as fixtures de extração.
+
+        :return: O número de linhas geradas por fonte.
+        """
+        snapshots = self.generate_snapshots()
+        trades = self.generate_sheets()
+        self.generate_fixtures()
+        return {'fundamentus': snapshots, 'brapi': snapshots, 'negociacoes': trades}
@@ -0,0 +1,232 @@
+import argparse
+import json
+import multiprocessing
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import duckdb
+import yaml
+
+from src.bench.generator import BronzeGenerator
+
+
+STAGES = [
+    'extract_fundamentus',
+    'extract_brapi',
+    'extract_usuarios_negociacoes',
+    'silver_transform',
+    'gold_transform',
+    'load_data',
+]
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def _serve_fixtures(directory: Path) -> ThreadingHTTPServer:
+    """Sobe um servidor HTTP local servindo as fixtures de extração."""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=str(directory)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _project_settings() -> dict:
+    """Lê o settings.yaml do projeto."""
+    with open(Path('configs/settings.yaml'), 'r') as file:
+        return yaml.safe_load(file)
+
+
+def _count(db_path: str, tables: list) -> int:
+    """Soma o número de linhas das tabelas informadas."""
+    conn = duckdb.connect(db_path, read_only=True)
+    try:
+        return sum(conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables)
+    finally:
+        conn.close()
+
+
+def _run_stage(stage: str, config: dict, fixtures_path: str) -> dict:
+    """
+    Executa uma etapa do pipeline e mede tempo, linhas processadas e pico de memória.
+
+    Executada em um processo próprio para que o pico de RSS seja o da etapa.
+    """
+    from src.elt.extract import DataExtractor
+    from src.elt.load import DataLoader
+    from src.elt.transformations import (
+        AnalyticsTransformer, GoldTransformer, PortfolioTransformer, ScreenerTransformer, SilverTransformer
+    )
+    from src.utils.db_utils import DuckDBConnection
+
+    server = None
+    if stage.startswith('extract_'):
+        server = _serve_fixtures(Path(fixtures_path))
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        sources = config['extract']['sources']
+        sources['fundamentus']['url'] = f'{base_url}/fundamentus.html'
+        sources['brapi']['url'] = f'{base_url}/brapi.json'
+
+    db_path = config['paths']['db']
+    start = time.perf_counter()
+    if stage.startswith('extract_'):
+        getattr(DataExtractor(config), stage)()
+    else:
+        db_connection = DuckDBConnection(db_path)
+        if stage == 'silver_transform':
+            transformer = SilverTransformer(db_connection, config)
+            transformer.create_tables()
+            transformer.transform()
+        elif stage == 'gold_transform':
+            for transformer_class in (GoldTransformer, ScreenerTransformer, PortfolioTransformer, AnalyticsTransformer):
+                transformer = transformer_class(db_connection, config)
+                transformer.create_tables()
+                transformer.transform()
+        else:
+            DataLoader(db_connection, config).load_data()
+        db_connection.close()
+    elapsed = time.perf_counter() - start
+
+    if server:
+        server.shutdown()
+
+    extract_bronze = Path(config['paths']['bronze'])
+    if stage == 'extract_fundamentus':
+        rows = duckdb.sql(f"SELECT COUNT(*) FROM '{extract_bronze}/fundamentus/*/*.parquet'").fetchone()[0]
+    elif stage == 'extract_brapi':
+        rows = duckdb.sql(f"SELECT COUNT(*) FROM '{extract_bronze}/brapi/*/*.parquet'").fetchone()[0]
+    elif stage == 'extract_usuarios_negociacoes':
+        rows = duckdb.sql(f"SELECT COUNT(*) FROM '{extract_bronze}/sheets/negociacoes/*.parquet'").fetchone()[0]
+    elif stage == 'silver_transform':
+        rows = _count(db_path, ['silver.fundamentus_resultado', 'silver.brapi_quote_list', 'silver.negociacoes'])
+    else:
+        rows = _count(db_path, ['gold.fact_indicadores', 'gold.fact_negociacoes', 'gold.fact_oportunidades'])
+
+    return {
+        'seconds': round(elapsed, 4),
+        'rows': rows,
+        'rows_per_second': round(rows / elapsed, 1) if elapsed else None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def run(tickers: int, days: int, users: int, trades: int, workdir: str = None) -> dict:
+    """
+    Gera os dados sintéticos e executa o benchmark de cada etapa.
+
+    :param tickers: Número de tickers por snapshot.
+    :param days: Número de dias com snapshots.
+    :param users: Número de usuários.
+    :param trades: Número total de negociações.
+    :param workdir: Diretório de trabalho. Se omitido, usa um diretório temporário.
+    :return: O relatório com os parâmetros de escala e os resultados de cada etapa.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(workdir or tmp)
+        generator = BronzeGenerator(workdir, tickers=tickers, days=days, users=users, trades=trades)
+        start = time.perf_counter()
+        generator.generate()
+        print(f"Dados sintéticos gerados em {time.perf_counter() - start:.1f}s")
+
+        (workdir / 'db').mkdir(exist_ok=True)
+        (workdir / 'gold').mkdir(exist_ok=True)
+        config = {
+            'paths': {
+                'bronze': str(generator.bronze_path),
+                'gold': str(workdir / 'gold'),
+                'db': str(workdir / 'db' / 'bench.db'),
+                'usuarios_negociacoes': str(generator.fixtures_path / 'usuarios_negociacoes.xlsx'),
+            },
+            'extract': {'sources': {'fundamentus': {}, 'brapi': {}}},
+            # As regras e estratégias do screener são as do projeto.
+            'screener': _project_settings().get('screener', {}),
+        }
+        # As extrações gravam em um bronze separado para não misturar com os dados gerados.
+        extract_config = {**config, 'paths': {**config['paths'], 'bronze': str(workdir / 'extract_bronze')}}
+
+        stages = {}
+        context = multiprocessing.get_context('spawn')
+        for stage in STAGES:
+            stage_config = extract_config if stage.startswith('extract_') else config
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                stages[stage] = executor.submit(_run_stage, stage, stage_config, str(generator.fixtures_path)).result()
+            print(f"{stage:<30} {stages[stage]['seconds']:>9.3f}s {stages[stage]['rows']:>12} linhas "
+                  f"{stages[stage]['peak_rss_mb']:>9.1f} MB")
+
+    return {
+        'meta': {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'duckdb': duckdb.__version__,
+            'scale': {'tickers': tickers, 'days': days, 'users': users, 'trades': trades},
+        },
+        'stages': stages,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Compara os resultados com um baseline e retorna as etapas que regrediram.
+
+    Uma etapa regride se o tempo ou o pico de memória ultrapassar o baseline em mais
+    do que ``tolerance`` (ex.: 0.2 = 20%).
+
+    :param results: Relatório da execução atual.
+    :param baseline: Relatório de referência.
+    :param tolerance: Tolerância relativa.
+    :return: Uma lista de mensagens, uma por regressão encontrada.
+    """
+    if results['meta']['scale'] != baseline['meta']['scale']:
+        print("Aviso: o baseline foi gerado com outra escala de dados.")
+
+    regressions = []
+    for stage, current in results['stages'].items():
+        reference = baseline['stages'].get(stage)
+        if not reference:
+            continue
+        for metric in ['seconds', 'peak_rss_mb']:
+            if reference[metric] and current[metric] > reference[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{stage}: {metric} {current[metric]} > {reference[metric]} (+{tolerance:.0%})"
+                )
+    return regressions
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark das etapas do pipeline com dados sintéticos.')
+    parser.add_argument('--tickers', type=int, default=1000, help='Número de tickers por snapshot.')
+    parser.add_argument('--days', type=int, default=30, help='Número de dias com snapshots.')
+    parser.add_argument('--users', type=int, default=50, help='Número de usuários.')
+    parser.add_argument('--trades', type=int, default=10000, help='Número total de negociações.')
+    parser.add_argument('--workdir', help='Diretório de trabalho (padrão: diretório temporário).')
+    parser.add_argument('--output', default='bench_results.json', help='Arquivo JSON com os resultados.')
+    parser.add_argument('--baseline', help='Arquivo JSON de referência para detectar regressões.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Tolerância relativa em relação ao baseline.')
+    args = parser.parse_args(argv)
+
+    results = run(args.tickers, args.days, args.users, args.trades, workdir=args.workdir)
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"Resultados salvos em {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Regressão: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import argparse
+import random
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+from openpyxl import Workbook
+
+from src.elt.extract import DataExtractor
+
+
+def generate_workbook(path: Path, users: int, trades_per_user: int, seed: int = 42) -> None:
+    """
+    Gera uma planilha no formato de ``usuarios_negociacoes.xlsx`` com uma aba por usuário.
+
+    :param path: Caminho do arquivo .xlsx a ser gerado.
+    :param users: Número de usuários (abas de negociações).
+    :param trades_per_user: Número de negociações em cada aba.
+    :param seed: Semente do gerador aleatório.
+    """
+    rng = random.Random(seed)
+    tickers = ['PETR4', 'VALE3', 'ITUB4', 'BBDC4', 'ABEV3', 'ELET3', 'WEGE3', 'BBAS3', 'B3SA3', 'RENT3']
+    inicio = datetime(2020, 1, 1)
+
+    workbook = Workbook(write_only=True)
+    for usuario_id in range(1, users + 1):
+        sheet = workbook.create_sheet(str(usuario_id))
+        sheet.append(['data_movimentacao', 'ticker', 'quantidade', 'tipo_negociacao', 'tipo_ativo', 'tipo_acao'])
+        for _ in range(trades_per_user):
+            sheet.append([
+                inicio + timedelta(days=rng.randrange(1700)),
+                rng.choice(tickers),
+                rng.randrange(1, 1000),
+                rng.choice(['compra', 'venda']),
+                'Ação',
+                rng.choice(['Ordinária', 'Preferencial']),
+            ])
+
+    sheet = workbook.create_sheet('usuarios')
+    sheet.append(['id', 'email', 'nome'])
+    for usuario_id in range(1, users + 1):
+        sheet.append([usuario_id, f'user{usuario_id}@email.com', f'user{usuario_id}'])
+    workbook.save(path)
+
+
+def _legacy_extract(config: dict) -> None:
+    """Extração original: um ``pd.read_excel`` (e uma nova leitura da planilha) por usuário."""
+    workbook_path = Path(config['paths']['usuarios_negociacoes'])
+    bronze_path = Path(config['paths']['bronze']) / 'sheets' / 'negociacoes'
+    df_usuarios = pd.read_excel(workbook_path, sheet_name='usuarios')
+    for row in df_usuarios.itertuples(index=False):
+        df_negociacoes = pd.read_excel(workbook_path, sheet_name=str(row.id))
+        df_negociacoes['usuario_id'] = str(row.id)
+        df_negociacoes.to_parquet(bronze_path / f'{row.id}.parquet', index=False)
+
+
+def _streaming_extract(config: dict) -> None:
+    """Extração atual, em uma única leitura da planilha."""
+    DataExtractor(config).extract_usuarios_negociacoes()
+
+
+def _run(variant: str, config: dict) -> dict:
+    """Executa uma variante e mede o tempo e o pico de memória (RSS) do processo."""
+    extract = _legacy_extract if variant == 'legacy' else _streaming_extract
+    start = time.perf_counter()
+    extract(config)
+    elapsed = time.perf_counter() - start
+    return {
+        'variant': variant,
+        'seconds': round(elapsed, 3),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def benchmark(users: int, trades_per_user: int, legacy: bool = True) -> list:
+    """
+    Compara a extração original com a extração em streaming em uma planilha gerada.
+
+    Cada variante roda em um processo separado para que o pico de memória seja isolado.
+
+    :param users: Número de usuários (abas) da planilha gerada.
+    :param trades_per_user: Número de negociações por aba.
+    :param legacy: Se True, também executa a extração original.
+    :return: Uma lista com o resultado de cada variante.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        workbook_path = tmp / 'usuarios_negociacoes.xlsx'
+        generate_workbook(workbook_path, users, trades_per_user)
+        for directory in ['usuarios', 'negociacoes']:
+            (tmp / 'bronze' / 'sheets' / directory).mkdir(parents=True)
+        config = {'paths': {'bronze': str(tmp / 'bronze'), 'usuarios_negociacoes': str(workbook_path)}}
+
+        variants = ['legacy', 'streaming'] if legacy else ['streaming']
+        for variant in variants:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                results.append(executor.submit(_run, variant, config).result())
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark da extração de usuarios_negociacoes.xlsx.')
+    parser.add_argument('--users', type=int, default=300, help='Número de abas de usuários.')
+    parser.add_argument('--trades', type=int, default=200, help='Número de negociações por usuário.')
+    parser.add_argument('--no-legacy', action='store_true', help='Não executa a extração original.')
+    args = parser.parse_args()
+
+    for result in benchmark(args.users, args.trades, legacy=not args.no_legacy):
+        print(f"{result['variant']:<10} {result['seconds']:>8.3f}s  pico RSS {result['peak_rss_mb']:>8.1f} MB")
@@ -0,0 +1,307 @@
+import argparse
+import importlib
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+_STARTED = time.perf_counter()
+
+# Módulos importados pela CLI e o tempo gasto em cada um: (módulo, segundos, módulos carregados).
+_IMPORTS = []
+
+COMMANDS = ['run', 'extract', 'transform', 'load', 'query', 'serve', 'bench']
+
+EXTRACT_SOURCES = {
+    'fundamentus': 'extract_fundamentus',
+    'brapi': 'extract_brapi',
+    'sheets': 'extract_usuarios_negociacoes',
+    'precos': 'extract_precos',
+}
+
+
+def _import(module: str):
+    """
+    Importa um módulo sob demanda e registra o tempo gasto.
+
+    Os módulos pesados (pandas, duckdb, requests e as etapas do pipeline) só são
+    importados pelo comando que os usa, para que ``--help`` e ``query`` iniciem rápido.
+    """
+    start = time.perf_counter()
+    loaded = len(sys.modules)
+    imported = importlib.import_module(module)
+    _IMPORTS.append((module, time.perf_counter() - start, len(sys.modules) - loaded))
+    return imported
+
+
+def import_report() -> str:
+    """Retorna o relatório do tempo de inicialização e de cada importação da CLI."""
+    total = sum(seconds for _, seconds, _ in _IMPORTS)
+    lines = [
+        f"Importações da CLI: {total * 1000:.1f} ms "
+        f"(tempo desde o início da CLI: {(time.perf_counter() - _STARTED) * 1000:.1f} ms)"
+    ]
+    for module, seconds, loaded in sorted(_IMPORTS, key=lambda item: item[1], reverse=True):
+        lines.append(f"  {module:<45} {seconds * 1000:>9.1f} ms  ({loaded} módulos)")
+    return '\n'.join(lines)
+
+
+def _load_config(path: str) -> dict:
+    """Lê o settings.yaml."""
+    yaml = _import('yaml')
+    with open(Path(path), 'r') as file:
+        return yaml.safe_load(file)
+
+
+def _run_pipeline(config: dict, full_refresh: bool = False, inicio: date = None, fim: date = None,
+                  extract: bool = True, stages: list = None) -> None:
+    """
+    Executa o pipeline, ou apenas alguns estágios, com publicação e instrumentação.
+
+    :param config: Dicionário de configuração do projeto.
+    :param full_refresh: Se True, reconstrói a camada gold.
+    :param inicio: Primeira data do bronze a recarregar (backfill). Opcional.
+    :param fim: Última data do bronze a recarregar (backfill). Opcional.
+    :param extract: Se False, não extrai as fontes.
+    :param stages: Estágios a executar. Padrão: todos.
+    """
+    SnapshotPublisher = _import('src.utils.publish').SnapshotPublisher
+    Instrumentation = _import('src.utils.instrumentation').Instrumentation
+    QueryCache = _import('src.utils.query_cache').QueryCache
+    DuckDBConnection = _import('src.utils.db_utils').DuckDBConnection
+    Pipeline = _import('src.elt.pipeline').Pipeline
+
+    # Com a publicação de snapshots, o pipeline constrói uma versão nova e a publica ao final
+    publisher = SnapshotPublisher.from_config(config)
+    pipeline_config = publisher.prepare() if publisher else config
+
+    # Criando conexão com o banco DuckDB em disco, com coleta de métricas das queries
+    instrumentation = Instrumentation.from_config(config)
+    db_conn = DuckDBConnection(
+        pipeline_config['paths']['db'],
+        instrumentation=instrumentation,
+        settings=config.get('duckdb'),
+        cache=QueryCache.from_config(config),
+    )
+
+    # Executando o pipeline ELT: extração, silver, gold e carga como um grafo de etapas
+    try:
+        pipeline = Pipeline(db_conn, pipeline_config, full_refresh=full_refresh)
+        pipeline.run(inicio=inicio, fim=fim, extract=extract, stages=stages)
+    except Exception:
+        db_conn.close()
+        if publisher:
+            publisher.discard()
+        raise
+    db_conn.close()
+
+    # Publicando a versão construída
+    if publisher:
+        publisher.publish()
+
+    # Relatório de execução
+    if instrumentation.enabled:
+        print(instrumentation.summary())
+        report_path = instrumentation.save(config.get('instrumentation', {}).get('report_dir', 'logs/runs'))
+        print(f"Relatório de execução salvo em {report_path}")
+
+
+def cmd_run(args: argparse.Namespace, config: dict) -> int:
+    """Executa o pipeline completo, um backfill ou um rollback."""
+    if args.rollback is not None:
+        publisher = _import('src.utils.publish').SnapshotPublisher.from_config(config)
+        if publisher is None:
+            args.parser.error('--rollback requer publish.enabled no settings.yaml.')
+        publisher.rollback(args.rollback or None)
+        return 0
+    inicio, fim = args.backfill or (None, None)
+    _run_pipeline(config, full_refresh=args.full_refresh, inicio=inicio, fim=fim, extract=not args.backfill)
+    return 0
+
+
+def cmd_extract(args: argparse.Namespace, config: dict) -> int:
+    """Extrai uma fonte, ou todas, para a camada bronze."""
+    extractor = _import('src.elt.extract').DataExtractor(config)
+    try:
+        if args.source:
+            getattr(extractor, EXTRACT_SOURCES[args.source])()
+        else:
+            extractor.extract_all()
+    finally:
+        extractor.close()
+    return 0
+
+
+def cmd_transform(args: argparse.Namespace, config: dict) -> int:
+    """Executa as etapas da camada silver ou gold."""
+    inicio, fim = args.backfill or (None, None)
+    _run_pipeline(
+        config, full_refresh=args.full_refresh, inicio=inicio, fim=fim, extract=False, stages=[args.layer]
+    )
+    return 0
+
+
+def cmd_load(args: argparse.Namespace, config: dict) -> int:
+    """Exporta a camada gold para Parquet."""
+    _run_pipeline(config, extract=False, stages=['load'])
+    return 0
+
+
+def cmd_query(args: argparse.Namespace, config: dict) -> int:
+    """Executa uma consulta somente leitura no banco publicado."""
+    duckdb = _import('duckdb')
+    conn = duckdb.connect(config['paths']['db'], read_only=True)
+    try:
+        relation = conn.sql(args.sql)
+        if relation is None:
+            return 0
+        if args.format == 'table':
+            relation.show(max_rows=args.limit)
+            return 0
+        # CSV e JSON são escritos em lotes Arrow, com memória limitada pelo tamanho do lote.
+        if args.limit:
+            relation = relation.limit(args.limit)
+        batches = relation.fetch_arrow_reader(config.get('duckdb', {}).get('batch_size', 122880))
+        if args.format == 'csv':
+            writer = _import('csv').writer(sys.stdout)
+            writer.writerow(relation.columns)
+            for batch in batches:
+                writer.writerows(zip(*(column.to_pylist() for column in batch.columns)))
+        else:
+            json = _import('json')
+            for batch in batches:
+                for row in batch.to_pylist():
+                    print(json.dumps(row, default=str, ensure_ascii=False))
+    finally:
+        conn.close()
+    return 0
+
+
+def cmd_serve(args: argparse.Namespace, config: dict) -> int:
+    """Sobe o serviço de consultas somente leitura da camada gold."""
+    _import('src.serve.server').serve(config, host=args.host, port=args.port)
+    return 0
+
+
+def cmd_bench(args: argparse.Namespace, config: dict) -> int:
+    """Executa o benchmark das etapas do pipeline com dados sintéticos."""
+    return _import('src.bench.runner').main(args.bench_args)
+
+
+def _common_options(defaults: bool = False) -> argparse.ArgumentParser:
+    """
+    Opções aceitas antes e depois do comando.
+
+    Nos subcomandos os padrões são suprimidos, para não sobrescreverem as opções
+    informadas antes do comando.
+    """
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        '--config',
+        default='configs/settings.yaml' if defaults else argparse.SUPPRESS,
+        help='Arquivo de configuração (padrão: configs/settings.yaml).'
+    )
+    common.add_argument(
+        '--import-time',
+        action='store_true',
+        default=False if defaults else argparse.SUPPRESS,
+        help='Mostra o tempo de inicialização e de cada importação no stderr.'
+    )
+    return common
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Monta o parser da linha de comando."""
+    common = _common_options()
+    backfill = argparse.ArgumentParser(add_help=False)
+    backfill.add_argument(
+        '--full-refresh',
+        action='store_true',
+        help='Reconstrói a camada gold a partir de todo o histórico silver em vez de processar apenas o delta.'
+    )
+    backfill.add_argument(
+        '--backfill',
+        nargs=2,
+        metavar=('INICIO', 'FIM'),
+        type=date.fromisoformat,
+        help='Recarrega as partições do bronze entre INICIO e FIM (YYYY-MM-DD) em uma única execução, sem extrair.'
+    )
+
+    parser = argparse.ArgumentParser(
+        prog='main.py',
+        description='Pipeline ELT do investments-dashboard. Sem comando, executa o pipeline completo (run).',
+        parents=[_common_options(defaults=True)],
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='COMANDO')
+
+    run = subparsers.add_parser('run', parents=[common, backfill], help='Executa o pipeline completo.')
+    run.add_argument(
+        '--rollback',
+        nargs='?',
+        const='',
+        metavar='VERSAO',
+        help='Publica novamente a versão anterior (ou VERSAO) do banco e da camada gold, sem executar o pipeline.'
+    )
+    run.set_defaults(func=cmd_run, parser=run)
+
+    extract = subparsers.add_parser('extract', parents=[common], help='Extrai as fontes para a camada bronze.')
+    extract.add_argument('source', nargs='?', choices=list(EXTRACT_SOURCES), help='Fonte a extrair (padrão: todas).')
+    extract.set_defaults(func=cmd_extract)
+
+    transform = subparsers.add_parser(
+        'transform', parents=[common, backfill], help='Executa as etapas da camada silver ou gold.'
+    )
+    transform.add_argument('layer', choices=['silver', 'gold'], help='Camada a transformar.')
+    transform.set_defaults(func=cmd_transform)
+
+    load = subparsers.add_parser('load', parents=[common], help='Exporta a camada gold para Parquet.')
+    load.set_defaults(func=cmd_load)
+
+    query = subparsers.add_parser('query', parents=[common], help='Consulta o banco publicado (somente leitura).')
+    query.add_argument('sql', help='Consulta SQL.')
+    query.add_argument('--format', choices=['table', 'csv', 'json'], default='table', help='Formato da saída.')
+    query.add_argument('--limit', type=int, default=None, help='Número máximo de linhas exibidas.')
+    query.set_defaults(func=cmd_query)
+
+    serve = subparsers.add_parser(
+        'serve', parents=[common], help='Sobe o serviço local de consultas da camada gold (somente leitura).'
+    )
+    serve.add_argument('--host', help='Endereço de escuta (padrão: serve.host).')
+    serve.add_argument('--port', type=int, help='Porta (padrão: serve.port).')
+    serve.set_defaults(func=cmd_serve)
+
+    bench = subparsers.add_parser(
+        'bench', parents=[common], help='Benchmark com dados sintéticos (argumentos repassados ao src.bench.runner).'
+    )
+    bench.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv: list = None) -> int:
+    """
+    Ponto de entrada da CLI.
+
+    Sem comando (ex.: ``python main.py --full-refresh``), executa ``run``, como as
+    versões anteriores do ``main.py``.
+
+    :param argv: Argumentos da linha de comando. Padrão: ``sys.argv[1:]``.
+    :return: O código de saída.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not any(arg in COMMANDS for arg in argv) and not {'-h', '--help'} & set(argv):
+        argv.insert(0, 'run')
+    parser = build_parser()
+    args, extra = parser.parse_known_args(argv)
+    if args.command == 'bench':
+        args.bench_args = extra
+    elif extra:
+        parser.error(f"argumentos não reconhecidos: {' '.join(extra)}")
+    try:
+        return args.func(args, _load_config(args.config))
+    finally:
+        if args.import_time:
+            print(import_report(), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,23 @@
-from .extract import DataExtractor
-from .load import DataLoader
-from .transform import DataTransformer
+from importlib import import_module
 
-__all__ = ['DataExtractor', 'DataLoader', 'DataTransformer']
\ No newline at end of file
+# Os módulos são importados sob demanda (PEP 562): importar o pacote não carrega
+# pandas, requests e duckdb, o que mantém rápida a inicialização da CLI.
+_EXPORTS = {
+    'DataExtractor': '.extract',
+    'DataLoader': '.load',
+    'Pipeline': '.pipeline',
+}
+
+__all__ = ['DataExtractor', 'DataLoader', 'Pipeline']
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
@@ -1,10 +1,14 @@
-import gc
-import requests
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 from pathlib import Path
-from datetime import datetime
-from io import StringIO
-# import yfinance as yf
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from openpyxl import load_workbook
+from src.elt.parsers import BrapiParser, FundamentusParser
+from src.elt.prices import HistoricalPriceExtractor, PriceCache, PriceProvider
+from src.utils.http_utils import HTTPClient, ResponseCache
 pd.set_option('display.max_columns', None)
 
 class DataExtractor:
@@ -15,68 +19,234 @@ class DataExtractor:
         :param config: Dicionário de configuração contendo caminhos e outras informações.
         """
         self.config = config
+        self.extract_config = config.get('extract', {})
+        self.http_cache = ResponseCache.from_config(config)
+        self._clients = {}
 
-    def extract_fundamentus(self) -> None:
-        """Extrai dados de ações do site Fundamentus e os salva em Parquet."""
-        url = 'http://www.fundamentus.com.br/resultado.php'
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+    def _source_settings(self, source: str) -> dict:
+        """
+        Retorna a configuração de uma fonte definida em ``extract.sources``.
+
+        :param source: Nome da fonte.
+        """
+        return self.extract_config.get('sources', {}).get(source, {})
+
+
+    def _client(self, source: str) -> HTTPClient:
+        """
+        Retorna o cliente HTTP da fonte, criando a sessão na primeira chamada.
+
+        :param source: Nome da fonte.
+        """
+        if source not in self._clients:
+            self._clients[source] = HTTPClient(self._source_settings(source), cache=self.http_cache)
+        return self._clients[source]
+
+
+    def extract_all(self) -> None:
+        """
+        Extrai todas as fontes simultaneamente, cada uma em uma thread.
+
+        Os preços históricos, se habilitados, são extraídos ao final, pois usam os
+        tickers das negociações extraídas.
+        """
+        extractions = {
+            'fundamentus': self.extract_fundamentus,
+            'usuarios_negociacoes': self.extract_usuarios_negociacoes,
+            'brapi': self.extract_brapi,
         }
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        df_tabelas = pd.read_html(StringIO(response.text), decimal=',', thousands='.')
-        df_tabela_acoes = df_tabelas[0]
-        df_tabela_acoes.columns = df_tabela_acoes.columns.str.lower().str.replace(' ', '_').str.replace('/', '_').str.replace('.', '')
-        df_tabela_acoes["_extracted_date"] = pd.Timestamp.now().normalize()
+        max_workers = self.extract_config.get('max_workers', len(extractions))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='extract') as executor:
+            futures = {source: executor.submit(extraction) for source, extraction in extractions.items()}
+
+        errors = {source: future.exception() for source, future in futures.items() if future.exception()}
+        if self._source_settings('precos').get('enabled', False):
+            try:
+                self.extract_precos()
+            except Exception as error:
+                errors['precos'] = error
+        self.close()
+        if errors:
+            for source, error in errors.items():
+                print(f"Falha na extração de {source}: {error}")
+            raise RuntimeError(f"Falha na extração das fontes: {', '.join(errors)}") from next(iter(errors.values()))
+
+
+    def close(self) -> None:
+        """Fecha as sessões HTTP abertas."""
+        for client in self._clients.values():
+            client.close()
+        self._clients = {}
+
+
+    @staticmethod
+    def _snapshot_unchanged(bronze_path: Path, content_hash: str) -> bool:
+        """
+        Indica se a partição do dia já foi gravada a partir de uma resposta idêntica.
+
+        O hash da resposta que gerou a partição fica nos metadados do Parquet.
+        """
+        if not bronze_path.exists():
+            return False
+        metadata = pq.read_schema(bronze_path).metadata or {}
+        return metadata.get(b'content_hash') == content_hash.encode('utf-8')
+
+
+    def _extract_snapshot(self, source: str, default_url: str, parser) -> None:
+        """
+        Extrai o snapshot diário de uma fonte HTTP e o salva em Parquet.
+
+        Se a partição do dia já foi gravada a partir de uma resposta idêntica, o parse
+        e a gravação são ignorados.
+
+        :param source: Nome da fonte em ``extract.sources`` e no bronze.
+        :param default_url: URL usada se a fonte não definir ``url``.
+        :param parser: Parser da resposta, com o método ``parse``.
+        """
+        url = self._source_settings(source).get('url', default_url)
+        response = self._client(source).fetch(url)
         formatted_datetime = datetime.now().strftime("%Y-%m-%d")
-        bronze_path = Path(self.config['paths']['bronze']) / 'fundamentus' / f'{formatted_datetime}.parquet'
-        df_tabela_acoes.to_parquet(bronze_path, index=False)
+        bronze_path = Path(self.config['paths']['bronze']) / source / f'extracted_date={formatted_datetime}' / 'data.parquet'
+        if self._snapshot_unchanged(bronze_path, response.content_hash):
+            print(f"Resposta de {source} sem alterações ({response.status}), {bronze_path} mantido.")
+            return
+
+        table = parser.parse(response.content)
+        extracted_date = pa.scalar(pd.Timestamp.now().normalize(), type=pa.timestamp('us'))
+        table = table.append_column('_extracted_date', pa.repeat(extracted_date, table.num_rows))
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), 'content_hash': response.content_hash})
+        bronze_path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table, bronze_path)
         print(f"Dados extraídos e salvos em {bronze_path}")
-    
+
+
+    def extract_fundamentus(self) -> None:
+        """Extrai dados de ações do site Fundamentus e os salva em Parquet."""
+        self._extract_snapshot('fundamentus', 'http://www.fundamentus.com.br/resultado.php', FundamentusParser())
+
 
     def extract_brapi(self) -> None:
         """Extrai dados de ações da API brapi e os salva em Parquet."""
-        url = 'https://brapi.dev/api/quote/list'
-        response = requests.get(url)
-        response.raise_for_status()
-        tickers = response.json()['stocks']
-        list_info_acoes = []
-        for ticker in tickers:
-            dict_info_acoes = {
-                'stock': ticker.get('stock'),
-                'name': ticker.get('name'),
-                'close': ticker.get('close'),
-                'change': ticker.get('change'),
-                'volume': ticker.get('volume'),
-                'market_cap': ticker.get('market_cap'),
-                'logo': ticker.get('logo'),
-                'sector': ticker.get('sector'),
-                'type': ticker.get('type'),
-            }
-            list_info_acoes.append(dict_info_acoes)
-        df_info_acoes = pd.DataFrame(list_info_acoes)
-        df_info_acoes["_extracted_date"] = pd.Timestamp.now().normalize()
-        formatted_datetime = datetime.now().strftime("%Y-%m-%d")
-        bronze_path = Path(self.config['paths']['bronze']) / 'brapi' / f'{formatted_datetime}.parquet'
-        df_info_acoes.to_parquet(bronze_path, index=False)
-        print(f"Dados extraídos e salvos em {bronze_path}")
+        self._extract_snapshot('brapi', 'https://brapi.dev/api/quote/list', BrapiParser())
+
+
+    @staticmethod
+    def _convert_cell(value):
+        """Converte floats inteiros em int, como faz o ``pd.read_excel``."""
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        return value
+
+
+    @staticmethod
+    def _read_sheet(worksheet) -> pd.DataFrame:
+        """
+        Lê uma aba da planilha em modo streaming, linha a linha.
+
+        :param worksheet: Aba aberta em modo somente leitura pelo openpyxl.
+        :return: Um DataFrame com a primeira linha da aba como cabeçalho.
+        """
+        rows = worksheet.iter_rows(values_only=True)
+        header = next(rows, ())
+        columns = [index for index, name in enumerate(header) if name is not None]
+        records = [
+            [DataExtractor._convert_cell(row[index]) if index < len(row) else None for index in columns]
+            for row in rows
+            if any(value is not None for value in row)
+        ]
+        return pd.DataFrame.from_records(records, columns=[header[index] for index in columns])
 
 
     def extract_usuarios_negociacoes(self) -> None:
-        """Extrai dados da sheets e os salva em Parquet."""
+        """
+        Extrai dados da sheets e os salva em Parquet.
+
+        A planilha é aberta uma única vez em modo somente leitura e as abas são lidas
+        em sequência, enquanto a gravação dos Parquets de cada usuário é distribuída
+        em um pool de threads. O número de abas lidas aguardando gravação é limitado
+        por ``max_pending`` para controlar o pico de memória.
+        """
+        settings = self._source_settings('usuarios_negociacoes')
+        max_workers = settings.get('max_workers', 4)
+        max_pending = settings.get('max_pending', 2 * max_workers)
         usuarios_negociacoes_path = Path(self.config['paths']['usuarios_negociacoes'])
-        df_usuarios = pd.read_excel(usuarios_negociacoes_path, sheet_name="usuarios")
-        df_usuarios["_extracted_date"] = pd.Timestamp.now().normalize()
-        bronze_path = Path(self.config['paths']['bronze']) / 'sheets' / 'usuarios' / 'usuarios.parquet'
-        df_usuarios.to_parquet(bronze_path, index=False)
-        print(f"Dados extraídos e salvos em {bronze_path}")
+        extracted_date = pd.Timestamp.now().normalize()
+
+        workbook = load_workbook(usuarios_negociacoes_path, read_only=True, data_only=True)
+        try:
+            df_usuarios = self._read_sheet(workbook['usuarios'])
+            df_usuarios["_extracted_date"] = extracted_date
+            bronze_path = Path(self.config['paths']['bronze']) / 'sheets' / 'usuarios' / 'usuarios.parquet'
+            bronze_path.parent.mkdir(parents=True, exist_ok=True)
+            (bronze_path.parent.parent / 'negociacoes').mkdir(parents=True, exist_ok=True)
+            df_usuarios.to_parquet(bronze_path, index=False)
+            print(f"Dados extraídos e salvos em {bronze_path}")
+
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='negociacoes') as executor:
+                pending = set()
+                for usuario_id in df_usuarios['id']:
+                    df_negociacoes = self._read_sheet(workbook[str(usuario_id)])
+                    df_negociacoes["usuario_id"] = str(usuario_id)
+                    df_negociacoes["_extracted_date"] = extracted_date
+                    bronze_path = Path(self.config['paths']['bronze']) / 'sheets' / 'negociacoes' / f'{usuario_id}.parquet'
+                    pending.add(executor.submit(df_negociacoes.to_parquet, bronze_path, index=False))
+                    del df_negociacoes
+
+                    if len(pending) >= max_pending:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            future.result()
+
+                for future in pending:
+                    future.result()
+        finally:
+            workbook.close()
+        print(f"Transações extraídas e salvas")
+
+
+    def _tickers_negociados(self) -> list:
+        """Retorna os tickers das negociações extraídas para o bronze."""
+        tickers = set()
+        for path in (Path(self.config['paths']['bronze']) / 'sheets' / 'negociacoes').glob('*.parquet'):
+            tickers.update(pq.read_table(path, columns=['ticker'])['ticker'].drop_null().to_pylist())
+        return sorted(tickers)
+
 
-        for row in df_usuarios.itertuples(index=False):
-            df_negociacoes = pd.read_excel(usuarios_negociacoes_path, sheet_name=str(row.id))
-            df_negociacoes["usuario_id"] = str(row.id)
-            df_negociacoes["_extracted_date"] = pd.Timestamp.now().normalize()
-            bronze_path = Path(self.config['paths']['bronze']) / 'sheets' / 'negociacoes' / f'{row.id}.parquet'
-            df_negociacoes.to_parquet(bronze_path, index=False)
-            del df_negociacoes
-            gc.collect()
-    print(f"Transações extraídas e salvas")
+    def extract_precos(self) -> None:
+        """
+        Extrai o histórico de preços diários dos tickers negociados e os salva em Parquet.
+
+        Apenas os intervalos de datas ausentes do cache em disco (``cache_dir``) são
+        baixados, em lotes de ``batch_size`` tickers com no máximo ``max_concurrency``
+        lotes simultâneos. Os preços baixados na execução são gravados na partição do
+        dia em ``bronze/precos``.
+        """
+        settings = self._source_settings('precos')
+        tickers = sorted(set(settings.get('tickers', [])) | set(self._tickers_negociados()))
+        extractor = HistoricalPriceExtractor(
+            PriceProvider.from_settings(settings),
+            PriceCache(settings.get('cache_dir', 'data/cache/precos')),
+            batch_size=settings.get('batch_size', 50),
+            max_concurrency=settings.get('max_concurrency', 2),
+        )
+        table_precos = extractor.extract(tickers, date.fromisoformat(str(settings.get('inicio', '2020-01-01'))))
+
+        formatted_datetime = datetime.now().strftime("%Y-%m-%d")
+        bronze_path = Path(self.config['paths']['bronze']) / 'precos' / f'extracted_date={formatted_datetime}' / 'data.parquet'
+        if bronze_path.exists():
+            # Uma nova execução no mesmo dia substitui os preços já baixados no dia.
+            anterior = pq.read_table(bronze_path).drop_columns(['_extracted_date'])
+            chaves = pc.binary_join_element_wise(table_precos['ticker'], pc.cast(table_precos['date'], pa.string()), '|')
+            chaves_anteriores = pc.binary_join_element_wise(anterior['ticker'], pc.cast(anterior['date'], pa.string()), '|')
+            anterior = anterior.filter(pc.invert(pc.is_in(chaves_anteriores, value_set=chaves)))
+            table_precos = pa.concat_tables([anterior.cast(table_precos.schema), table_precos])
+        if not table_precos.num_rows:
+            print("Nenhum preço novo extraído.")
+            return
+
+        extracted_date = pa.scalar(pd.Timestamp.now().normalize(), type=pa.timestamp('us'))
+        table_precos = table_precos.append_column('_extracted_date', pa.repeat(extracted_date, table_precos.num_rows))
+        bronze_path.parent.mkdir(parents=True, exist_ok=True)
+        pq.write_table(table_precos, bronze_path)
+        print(f"Dados extraídos e salvos em {bronze_path}")
@@ -1,8 +1,34 @@
+import hashlib
+import json
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
 from src.utils.db_utils import DuckDBConnection
 
 class DataLoader:
+    # Tabelas exportadas para a camada Gold.
+    TABLES = [
+        'dim_tempo',
+        'dim_acoes',
+        'dim_tipo',
+        'dim_usuarios',
+        'dim_regras',
+        'dim_estrategias',
+        'fact_regras_indicadores',
+        'fact_oportunidades',
+        'fact_indicadores',
+        'fact_precos',
+        'fact_negociacoes',
+        'fact_posicoes',
+        'fact_carteira_diaria',
+        'fact_indicadores_janelas',
+        'fact_percentis_setor',
+        'fact_setores',
+    ]
+
     def __init__(self, db_connection: 'DuckDBConnection', config: dict) -> None:
         """
         Inicializa o carregador de dados.
@@ -12,18 +38,150 @@ class DataLoader:
         """
         self.db_connection = db_connection
         self.config = config
+        self.load_config = config.get('load', {})
+        self.gold_path = Path(self.config['paths']['gold'])
+        self.manifest_path = self.gold_path / '_manifest.json'
+
+
+    def _table_settings(self, table: str) -> dict:
+        """
+        Retorna as opções de exportação de uma tabela (ordenação, compressão, row groups e partições).
+
+        As opções de ``load.tables.<tabela>`` sobrescrevem as de ``load.defaults``.
+
+        :param table: Nome da tabela gold.
+        """
+        settings = {'sort_by': None, 'compression': None, 'row_group_size': None, 'partition_by': None}
+        settings.update(self.load_config.get('defaults', {}))
+        settings.update(self.load_config.get('tables', {}).get(table) or {})
+        return settings
+
+
+    def _output_path(self, table: str, settings: dict) -> Path:
+        """Retorna o arquivo Parquet da tabela ou, se particionada, o diretório das partições."""
+        if settings['partition_by']:
+            return self.gold_path / table
+        return self.gold_path / f'{table}.parquet'
+
+
+    def _read_manifest(self) -> dict:
+        """Lê o manifesto com o estado de cada tabela na última exportação."""
+        if not self.manifest_path.exists():
+            return {}
+        with open(self.manifest_path) as file:
+            return json.load(file)
+
+
+    def _write_manifest(self, manifest: dict) -> None:
+        """Grava o manifesto de forma atômica."""
+        temp_path = self.manifest_path.with_suffix('.tmp')
+        with open(temp_path, 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+
+    @staticmethod
+    def table_stamp(db_connection: 'DuckDBConnection', table: str, settings: dict) -> tuple:
+        """
+        Identifica o estado de uma tabela junto com as opções de exportação, sem ler o conteúdo.
+
+        O estado é a versão da tabela em ``gold.controle_tabelas``, incrementada pelo
+        pipeline a cada etapa que a altera, o momento dessa alteração (que distingue as
+        versões de um banco recriado) e o número de linhas. Mudar as opções também força
+        a regravação.
+
+        :param db_connection: Conexão usada na consulta.
+        :param table: Nome da tabela gold.
+        :param settings: Opções de exportação da tabela.
+        :return: O identificador, ou None se a tabela não tiver versão, e o número de linhas.
+        """
+        versioned = db_connection.sql("""
+            SELECT COUNT(*) AS n
+            FROM information_schema.tables
+            WHERE table_schema = 'gold' AND table_name = 'controle_tabelas'
+        """, cache=False)
+        if not int(versioned['n'][0]):
+            # Fora do pipeline (ex.: nos benchmarks) não há versões: a tabela é sempre exportada.
+            rows = db_connection.sql(f"SELECT COUNT(*) AS rows FROM gold.{table}", cache=False)
+            return None, int(rows['rows'][0])
+        df = db_connection.sql(f"""
+            SELECT
+                (SELECT COUNT(*) FROM gold.{table}) AS rows,
+                versao,
+                alterada_em::VARCHAR AS alterada_em
+            FROM (SELECT 1) AS unica
+            LEFT JOIN gold.controle_tabelas
+            ON tabela = 'gold.{table}'
+        """, step=f"STAMP gold.{table}", cache=False)
+        rows = int(df['rows'][0])
+        if df['versao'].isna()[0]:
+            return None, rows
+        content = json.dumps([int(df['versao'][0]), df['alterada_em'][0], rows, settings], sort_keys=True)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest(), rows
+
+
+    def export_table(self, table: str, previous: dict) -> dict:
+        """
+        Exporta uma tabela gold se ela mudou desde a última exportação.
+
+        Executada em um cursor próprio, para que as tabelas sejam exportadas em paralelo.
+
+        :param table: Nome da tabela gold.
+        :param previous: Entrada da tabela no manifesto da última exportação.
+        :return: A nova entrada do manifesto.
+        """
+        settings = self._table_settings(table)
+        output_path = self._output_path(table, settings)
+        cursor = self.db_connection.cursor()
+        try:
+            stamp, rows = self.table_stamp(cursor, table, settings)
+            if stamp and previous and previous.get('stamp') == stamp and output_path.exists():
+                print(f"gold.{table} sem alterações, exportação ignorada.")
+                return previous
+            cursor.save_parquet(f'gold.{table}', output_path, **settings)
+        finally:
+            cursor.close()
+
+        # Remove a exportação no layout anterior quando o particionamento da tabela muda.
+        stale_path = self._output_path(table, {'partition_by': not settings['partition_by']})
+        if stale_path.is_dir():
+            shutil.rmtree(stale_path)
+        elif stale_path.exists():
+            stale_path.unlink()
+
+        return {
+            'stamp': stamp,
+            'rows': rows,
+            'path': output_path.name,
+            'exported_at': datetime.now().isoformat(timespec='seconds'),
+        }
+
 
     def load_data(self) -> None:
-        """Carrega dados transformados e salva no formato Parquet na camada Gold."""
-        gold_path = Path(self.config['paths']['gold'])
+        """
+        Carrega dados transformados e salva no formato Parquet na camada Gold.
+
+        As tabelas são exportadas em paralelo, cada uma com sua ordenação, compressão,
+        tamanho de row group e particionamento; tabelas que não mudaram desde a última
+        exportação são mantidas.
+        """
+        self.gold_path.mkdir(parents=True, exist_ok=True)
+        manifest = self._read_manifest()
 
-        self.db_connection.save_parquet('gold.dim_tempo', gold_path / 'dim_tempo.parquet')
-        self.db_connection.save_parquet('gold.dim_acoes', gold_path / 'dim_acoes.parquet')
-        self.db_connection.save_parquet('gold.dim_tipo', gold_path / 'dim_tipo.parquet')
-        self.db_connection.save_parquet('gold.dim_usuarios', gold_path / 'dim_usuarios.parquet')
+        with ThreadPoolExecutor(max_workers=self.load_config.get('max_workers', 4)) as executor:
+            futures = {
+                table: executor.submit(self.export_table, table, manifest.get(table))
+                for table in self.TABLES
+            }
+        errors = []
+        for table, future in futures.items():
+            try:
+                manifest[table] = future.result()
+            except Exception as error:
+                errors.append(f"gold.{table}: {error}")
 
-        self.db_connection.save_parquet('gold.fact_oportunidades', gold_path / 'fact_oportunidades.parquet')
-        self.db_connection.save_parquet('gold.fact_indicadores', gold_path / 'fact_indicadores.parquet')
-        self.db_connection.save_parquet('gold.fact_negociacoes', gold_path / 'fact_negociacoes.parquet')
+        self._write_manifest(manifest)
+        if errors:
+            raise RuntimeError(f"Falha ao exportar tabelas para a camada Gold: {'; '.join(errors)}")
 
         print("Dados carregados e salvos na camada Gold.")
@@ -0,0 +1,4 @@
+from .brapi_parser import BrapiParser, BRAPI_QUOTE_LIST_SCHEMA
+from .fundamentus_parser import FundamentusParser, FUNDAMENTUS_SCHEMA
+
+__all__ = ['BrapiParser', 'BRAPI_QUOTE_LIST_SCHEMA', 'FundamentusParser', 'FUNDAMENTUS_SCHEMA']
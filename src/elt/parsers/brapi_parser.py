@@ -0,0 +1,52 @@
+from io import BytesIO
+import pyarrow as pa
+import pyarrow.json as pa_json
+
+
+# Schema do bronze da brapi, alinhado aos tipos de silver.brapi_quote_list.
+# volume é int64 (INTEGER na silver) para que volumes altos não falhem na extração.
+BRAPI_QUOTE_LIST_SCHEMA = pa.schema([
+    ('stock', pa.string()),
+    ('name', pa.string()),
+    ('close', pa.float32()),
+    ('change', pa.float32()),
+    ('volume', pa.int64()),
+    ('market_cap', pa.float32()),
+    ('logo', pa.string()),
+    ('sector', pa.string()),
+    ('type', pa.string()),
+])
+
+
+class BrapiParser:
+    def __init__(self, schema: pa.Schema = BRAPI_QUOTE_LIST_SCHEMA, field: str = 'stocks') -> None:
+        """
+        Inicializa o parser de respostas da brapi.
+
+        :param schema: Schema das colunas a extrair de cada item da lista.
+        :param field: Campo da resposta que contém a lista de itens.
+        """
+        self.schema = schema
+        self.field = field
+
+
+    def parse(self, content: bytes) -> pa.Table:
+        """
+        Decodifica o JSON da resposta diretamente em colunas Arrow tipadas.
+
+        O JSON é lido pelo leitor nativo do Arrow com um schema explícito, sem criar
+        objetos Python por item: campos desconhecidos são ignorados e campos ausentes
+        viram nulos.
+
+        :param content: Corpo da resposta HTTP.
+        :return: Uma tabela Arrow com as colunas de ``schema``.
+        """
+        read_options = pa_json.ReadOptions(block_size=len(content) + 1, use_threads=False)
+        parse_options = pa_json.ParseOptions(
+            explicit_schema=pa.schema([(self.field, pa.list_(pa.struct(self.schema)))]),
+            unexpected_field_behavior='ignore',
+            newlines_in_values=True,
+        )
+        response = pa_json.read_json(BytesIO(content), read_options=read_options, parse_options=parse_options)
+        items = response.column(self.field).combine_chunks().flatten()
+        return pa.Table.from_struct_array(items).cast(self.schema)
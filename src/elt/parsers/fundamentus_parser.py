@@ -0,0 +1,105 @@
+import lxml.html
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+# Colunas da tabela de resultados do Fundamentus: cabeçalho normalizado,
+# nome da coluna no bronze e formato do valor na página.
+FUNDAMENTUS_COLUMNS = [
+    ('papel', 'ticker', 'texto'),
+    ('cotação', 'cotacao', 'numero'),
+    ('p_l', 'p_l', 'numero'),
+    ('p_vp', 'p_vp', 'numero'),
+    ('psr', 'psr', 'numero'),
+    ('divyield', 'dividend_yield', 'percentual'),
+    ('p_ativo', 'p_ativo', 'numero'),
+    ('p_capgiro', 'p_capital_giro', 'numero'),
+    ('p_ebit', 'p_ebit', 'numero'),
+    ('p_ativ_circliq', 'p_ativo_circ_liq', 'numero'),
+    ('ev_ebit', 'ev_ebit', 'numero'),
+    ('ev_ebitda', 'ev_ebitda', 'numero'),
+    ('mrg_ebit', 'mrg_ebit', 'percentual'),
+    ('mrg_líq', 'mrg_liquida', 'percentual'),
+    ('liq_corr', 'liquidez_corr', 'numero'),
+    ('roic', 'roic', 'percentual'),
+    ('roe', 'roe', 'percentual'),
+    ('liq2meses', 'liquidez_2_meses', 'numero'),
+    ('patrim_líq', 'patrimonio_liquido', 'numero'),
+    ('dívbrut__patrim', 'div_bruta_patrim', 'numero'),
+    ('cresc_rec5a', 'cres_rec_5a', 'percentual'),
+]
+
+# Schema do bronze do Fundamentus, alinhado aos tipos de silver.fundamentus_resultado.
+FUNDAMENTUS_SCHEMA = pa.schema([
+    (name, pa.string() if kind == 'texto' else pa.float32())
+    for _, name, kind in FUNDAMENTUS_COLUMNS
+])
+
+
+class FundamentusParser:
+    @staticmethod
+    def normalize_header(header: str) -> str:
+        """
+        Normaliza o cabeçalho de uma coluna da página (ex.: ``Div.Yield`` -> ``divyield``).
+
+        :param header: Texto do cabeçalho.
+        """
+        return header.strip().lower().replace(' ', '_').replace('/', '_').replace('.', '')
+
+
+    @staticmethod
+    def to_number(values: pa.Array, percent: bool = False) -> pa.Array:
+        """
+        Converte textos numéricos no formato brasileiro (``1.234,56`` ou ``12,5%``) em float.
+
+        A conversão é vetorizada; valores vazios ou inválidos viram nulos e
+        percentuais são divididos por 100.
+
+        :param values: Array Arrow de textos.
+        :param percent: Se True, os valores são percentuais.
+        """
+        values = pc.utf8_trim_whitespace(values)
+        values = pc.replace_substring(values, '.', '')
+        values = pc.replace_substring(values, ',', '.')
+        values = pc.replace_substring(values, '%', '')
+        valid = pc.match_substring_regex(values, r'^[+-]?[0-9]+(\.[0-9]+)?$')
+        numbers = pc.cast(pc.if_else(valid, values, pa.scalar(None, pa.string())), pa.float64())
+        if percent:
+            numbers = pc.divide(numbers, 100)
+        return pc.cast(numbers, pa.float32())
+
+
+    def parse(self, html: bytes) -> pa.Table:
+        """
+        Extrai a tabela de resultados da página do Fundamentus em uma única passada.
+
+        :param html: Conteúdo HTML da página ``resultado.php``. Em bytes, a codificação é
+            detectada pela declaração ``<meta charset>`` da própria página.
+        :return: Uma tabela Arrow no schema ``FUNDAMENTUS_SCHEMA``.
+        :raises ValueError: Se a tabela não for encontrada ou as colunas forem diferentes das esperadas.
+        """
+        document = lxml.html.fromstring(html)
+        tables = document.xpath('//table[@id="resultado"]')
+        if not tables:
+            raise ValueError("Tabela de resultados não encontrada na página do Fundamentus.")
+        table = tables[0]
+
+        headers = [self.normalize_header(th.text_content()) for th in table.xpath('./thead/tr/th')]
+        expected = [header for header, _, _ in FUNDAMENTUS_COLUMNS]
+        if headers != expected:
+            raise ValueError(
+                f"Colunas da tabela do Fundamentus mudaram: esperado {expected}, encontrado {headers}."
+            )
+
+        cells = [td.text_content() for td in table.xpath('./tbody/tr/td')]
+        if len(cells) % len(headers):
+            raise ValueError("Tabela do Fundamentus com linhas incompletas.")
+
+        columns = []
+        for index, (_, _, kind) in enumerate(FUNDAMENTUS_COLUMNS):
+            values = pa.array(cells[index::len(headers)], type=pa.string())
+            if kind == 'texto':
+                columns.append(pc.utf8_trim_whitespace(values))
+            else:
+                columns.append(self.to_number(values, percent=kind == 'percentual'))
+        return pa.Table.from_arrays(columns, schema=FUNDAMENTUS_SCHEMA)
@@ -0,0 +1,212 @@
+from datetime import date
+from pathlib import Path
+
+from src.elt.extract import DataExtractor
+from src.elt.load import DataLoader
+from src.elt.transformations import (
+    AnalyticsTransformer, GoldTransformer, PortfolioTransformer, ScreenerTransformer, ShardTransformer,
+    SilverTransformer
+)
+from src.utils.dag import DAGRunner, Step
+from src.utils.db_utils import DuckDBConnection
+
+
+class Pipeline:
+    # Tabelas silver carregadas a partir do bronze.
+    SILVER_TABLES = ['usuarios', 'negociacoes', 'brapi_quote_list', 'fundamentus_resultado', 'precos']
+
+    def __init__(self, db_connection: 'DuckDBConnection', config: dict, full_refresh: bool = False) -> None:
+        """
+        Inicializa o pipeline ELT como um grafo de etapas.
+
+        Cada etapa de extração, silver, gold e carga declara os recursos que lê e grava;
+        o ``DAGRunner`` executa em paralelo as etapas independentes, grava um checkpoint
+        por etapa e ignora as etapas cujas entradas não mudaram. As opções ficam na
+        seção ``pipeline`` do settings.yaml.
+
+        :param db_connection: Conexão com o banco de dados DuckDB.
+        :param config: Dicionário de configuração contendo caminhos e outras informações.
+        :param full_refresh: Se True, reconstrói a camada gold e executa todas as etapas.
+        """
+        self.db_connection = db_connection
+        self.config = config
+        self.full_refresh = full_refresh
+        self.pipeline_config = config.get('pipeline', {})
+        self.bronze_path = Path(config['paths']['bronze'])
+        self.gold_path = Path(config['paths']['gold'])
+
+
+    def _bronze(self, pattern: str) -> str:
+        """Retorna o recurso dos arquivos do bronze que casam com ``pattern``."""
+        return f'file:{self.bronze_path}/{pattern}'
+
+
+    def runner(self, inicio: date = None, fim: date = None, extract: bool = True,
+               extractor: DataExtractor = None) -> DAGRunner:
+        """
+        Monta o grafo de etapas do pipeline.
+
+        :param inicio: Primeira data do bronze a recarregar (backfill). Opcional.
+        :param fim: Última data do bronze a recarregar (backfill). Opcional.
+        :param extract: Se False, as etapas de extração não são incluídas.
+        :param extractor: Extrator usado nas etapas de extração.
+        :return: O ``DAGRunner`` com as etapas declaradas.
+        """
+        runner = DAGRunner(
+            self.db_connection,
+            self.config,
+            max_workers=self.pipeline_config.get('max_workers', 4),
+            skip_unchanged=self.pipeline_config.get('skip_unchanged', True),
+            resume=self.pipeline_config.get('resume', True),
+        )
+        config = self.config
+        full_refresh = self.full_refresh
+        silver = [f'table:silver.{table}' for table in self.SILVER_TABLES]
+
+        if extract:
+            extractor = extractor or DataExtractor(config)
+            runner.add(Step(
+                'extract_fundamentus', lambda cursor: extractor.extract_fundamentus(),
+                outputs=[self._bronze('fundamentus/**/*.parquet')], stage='extract',
+            ))
+            runner.add(Step(
+                'extract_brapi', lambda cursor: extractor.extract_brapi(),
+                outputs=[self._bronze('brapi/**/*.parquet')], stage='extract',
+            ))
+            runner.add(Step(
+                'extract_usuarios_negociacoes', lambda cursor: extractor.extract_usuarios_negociacoes(),
+                outputs=[self._bronze('sheets/**/*.parquet')], stage='extract',
+            ))
+            if config.get('extract', {}).get('sources', {}).get('precos', {}).get('enabled', False):
+                # Usa os tickers das negociações extraídas.
+                runner.add(Step(
+                    'extract_precos', lambda cursor: extractor.extract_precos(),
+                    inputs=[self._bronze('sheets/**/*.parquet')],
+                    outputs=[self._bronze('precos/**/*.parquet')], stage='extract', always=True,
+                ))
+
+        runner.add(Step(
+            'silver_tabelas', lambda cursor: SilverTransformer(cursor, config).create_tables(), stage='silver',
+        ))
+        runner.add(Step(
+            'silver_usuarios', lambda cursor: SilverTransformer(cursor, config).load_usuarios(),
+            inputs=[self._bronze('sheets/usuarios/*.parquet')], outputs=['table:silver.usuarios'],
+            after=['silver_tabelas'], stage='silver',
+        ))
+        runner.add(Step(
+            'silver_negociacoes', lambda cursor: SilverTransformer(cursor, config).load_negociacoes(),
+            inputs=[self._bronze('sheets/negociacoes/*.parquet')], outputs=['table:silver.negociacoes'],
+            after=['silver_tabelas'], stage='silver',
+        ))
+        for source, table, method in [
+            ('brapi', 'brapi_quote_list', 'load_brapi'),
+            ('fundamentus', 'fundamentus_resultado', 'load_fundamentus'),
+            ('precos', 'precos', 'load_precos'),
+        ]:
+            runner.add(Step(
+                f'silver_{source}',
+                lambda cursor, method=method: getattr(SilverTransformer(cursor, config), method)(inicio=inicio, fim=fim),
+                inputs=[self._bronze(f'{source}/**/*.parquet')], outputs=[f'table:silver.{table}'],
+                after=['silver_tabelas'], stage='silver',
+            ))
+
+        def gold_tabelas(cursor: 'DuckDBConnection') -> None:
+            GoldTransformer(cursor, config, full_refresh=full_refresh).create_tables()
+            ScreenerTransformer(cursor, config, full_refresh=full_refresh).create_tables()
+            PortfolioTransformer(cursor, config, full_refresh=full_refresh).create_tables()
+            AnalyticsTransformer(cursor, config, full_refresh=full_refresh).create_tables()
+
+        def gold_fatos(cursor: 'DuckDBConnection') -> None:
+            # As tabelas temporárias de delta são da conexão: as etapas usam o mesmo cursor.
+            gold_transformer = GoldTransformer(cursor, config, full_refresh=full_refresh)
+            shard_transformer = ShardTransformer(cursor, config, full_refresh=full_refresh)
+            if shard_transformer.enabled:
+                # As tabelas por usuário são calculadas nos shards, em processos próprios.
+                gold_transformer.transform_indicadores()
+                ScreenerTransformer(cursor, config, full_refresh=full_refresh).transform()
+                shard_transformer.transform()
+                gold_transformer.update_watermarks()
+            else:
+                shard_transformer.discard()
+                gold_transformer.transform_fatos()
+                ScreenerTransformer(cursor, config, full_refresh=full_refresh).transform()
+                PortfolioTransformer(cursor, config, full_refresh=full_refresh).transform()
+            AnalyticsTransformer(cursor, config, full_refresh=full_refresh).transform()
+
+        def gold(method: str):
+            return lambda cursor: getattr(GoldTransformer(cursor, config, full_refresh=full_refresh), method)()
+
+        runner.add(Step(
+            'gold_tabelas', gold_tabelas,
+            outputs=['table:gold.dim_tempo'], stage='gold',
+        ))
+        runner.add(Step(
+            'gold_chaves', gold('registrar_chaves'),
+            inputs=silver, outputs=['table:gold.registro_chaves'], after=['gold_tabelas'], stage='gold',
+        ))
+        runner.add(Step(
+            'gold_dim_acoes', gold('transform_dim_acoes'),
+            inputs=['table:silver.brapi_quote_list', 'table:gold.registro_chaves'],
+            outputs=['table:gold.dim_acoes'], stage='gold',
+        ))
+        runner.add(Step(
+            'gold_dim_tipo', gold('transform_dim_tipo'),
+            inputs=['table:silver.negociacoes', 'table:gold.registro_chaves'],
+            outputs=['table:gold.dim_tipo'], stage='gold',
+        ))
+        runner.add(Step(
+            'gold_dim_usuarios', gold('transform_dim_usuarios'),
+            inputs=['table:silver.usuarios', 'table:gold.registro_chaves'],
+            outputs=['table:gold.dim_usuarios'], stage='gold',
+        ))
+        # As dimensões leem as marcas d'água que transform_fatos avança.
+        runner.add(Step(
+            'gold_fatos', gold_fatos,
+            inputs=silver + [
+                'table:gold.registro_chaves', 'table:gold.dim_tempo', 'config:screener', 'config:analytics',
+                'config:sharding', 'today',
+            ],
+            outputs=[
+                f'table:gold.{table}' for table in DataLoader.TABLES
+                if table not in ('dim_tempo', 'dim_acoes', 'dim_tipo', 'dim_usuarios')
+            ],
+            after=['gold_dim_acoes', 'gold_dim_tipo', 'gold_dim_usuarios'], stage='gold',
+        ))
+
+        runner.add(Step(
+            'load', lambda cursor: DataLoader(cursor, config).load_data(),
+            inputs=[f'table:gold.{table}' for table in DataLoader.TABLES] + ['config:load'],
+            outputs=[f'file:{self.gold_path}/**/*.parquet'], stage='load',
+        ))
+        return runner
+
+
+    def run(self, inicio: date = None, fim: date = None, extract: bool = True, stages: list = None) -> dict:
+        """
+        Executa o pipeline.
+
+        Bancos em formato antigo são reconstruídos com full refresh. Com full refresh ou
+        backfill, todas as etapas são executadas, sem retomar execuções anteriores.
+
+        :param inicio: Primeira data do bronze a recarregar (backfill). Opcional.
+        :param fim: Última data do bronze a recarregar (backfill). Opcional.
+        :param extract: Se False, não extrai as fontes.
+        :param stages: Estágios a executar (``extract``, ``silver``, ``gold``, ``load``).
+            Padrão: todos.
+        :return: O status de cada etapa.
+        """
+        if not self.full_refresh and GoldTransformer(self.db_connection, self.config).requires_full_refresh():
+            print("Camada gold em formato antigo: executando full refresh.")
+            self.full_refresh = True
+
+        extract = extract and (stages is None or 'extract' in stages)
+        extractor = DataExtractor(self.config) if extract else None
+        try:
+            status = self.runner(inicio, fim, extract=extract, extractor=extractor).run(
+                force=self.full_refresh or bool(inicio or fim), stages=stages
+            )
+        finally:
+            if extractor:
+                extractor.close()
+        print("Pipeline concluído.")
+        return status
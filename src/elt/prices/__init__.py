@@ -0,0 +1,12 @@
+from .providers import PriceProvider, YahooFinanceProvider, FakePriceProvider, PRICES_SCHEMA
+from .price_cache import PriceCache
+from .price_extractor import HistoricalPriceExtractor
+
+__all__ = [
+    'PriceProvider',
+    'YahooFinanceProvider',
+    'FakePriceProvider',
+    'PRICES_SCHEMA',
+    'PriceCache',
+    'HistoricalPriceExtractor',
+]
@@ -0,0 +1,122 @@
+import json
+import os
+import re
+import threading
+from datetime import date, timedelta
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.elt.prices.providers import PRICES_SCHEMA
+
+
+class PriceCache:
+    def __init__(self, cache_dir: str) -> None:
+        """
+        Inicializa o cache em disco dos preços baixados.
+
+        Cada ticker tem um Parquet com os preços já baixados e um JSON com os intervalos
+        de datas já consultados no provedor, inclusive os que não retornaram preços
+        (feriados, ticker ainda não listado), para que uma nova execução baixe apenas
+        os intervalos que faltam.
+
+        :param cache_dir: Diretório do cache.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+
+    def _path(self, ticker: str, suffix: str) -> Path:
+        """Retorna o arquivo do ticker no cache com a extensão informada."""
+        nome = re.sub(r'[^\w.-]', '_', ticker)
+        return self.cache_dir / f'{nome}{suffix}'
+
+
+    def ranges(self, ticker: str) -> list:
+        """
+        Retorna os intervalos de datas já consultados de um ticker.
+
+        :param ticker: Ticker da ação.
+        :return: Lista ordenada de tuplas ``(inicio, fim)`` inclusivas e sem sobreposição.
+        """
+        path = self._path(ticker, '.json')
+        if not path.exists():
+            return []
+        with open(path) as file:
+            return [(date.fromisoformat(inicio), date.fromisoformat(fim)) for inicio, fim in json.load(file)]
+
+
+    @staticmethod
+    def merge(ranges: list) -> list:
+        """Une intervalos sobrepostos ou contíguos."""
+        merged = []
+        for inicio, fim in sorted(ranges):
+            if merged and inicio <= merged[-1][1] + timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], fim))
+            else:
+                merged.append((inicio, fim))
+        return merged
+
+
+    def missing(self, ticker: str, inicio: date, fim: date) -> list:
+        """
+        Retorna os intervalos de ``inicio`` a ``fim`` ainda não consultados de um ticker.
+
+        :param ticker: Ticker da ação.
+        :param inicio: Primeira data, inclusiva.
+        :param fim: Última data, inclusiva.
+        """
+        faltantes = []
+        atual = inicio
+        for coberto_inicio, coberto_fim in self.ranges(ticker):
+            if coberto_fim < atual:
+                continue
+            if coberto_inicio > fim:
+                break
+            if coberto_inicio > atual:
+                faltantes.append((atual, coberto_inicio - timedelta(days=1)))
+            atual = coberto_fim + timedelta(days=1)
+        if atual <= fim:
+            faltantes.append((atual, fim))
+        return faltantes
+
+
+    def read(self, ticker: str) -> pa.Table:
+        """Retorna os preços em cache de um ticker."""
+        path = self._path(ticker, '.parquet')
+        if not path.exists():
+            return PRICES_SCHEMA.empty_table()
+        return pq.read_table(path, schema=PRICES_SCHEMA)
+
+
+    @staticmethod
+    def _replace(path: Path, write) -> None:
+        """Grava um arquivo em um caminho temporário e o renomeia ao final."""
+        temp_path = path.with_name(f'.{path.name}.tmp-{os.getpid()}-{threading.get_ident()}')
+        write(temp_path)
+        os.replace(temp_path, path)
+
+
+    def write(self, ticker: str, table: pa.Table, ranges: list) -> None:
+        """
+        Acrescenta ao cache os preços baixados de um ticker e os intervalos consultados.
+
+        Preços de datas já presentes no cache são substituídos pelos novos.
+
+        :param ticker: Ticker da ação.
+        :param table: Preços baixados do ticker, com as colunas de ``PRICES_SCHEMA``.
+        :param ranges: Intervalos ``(inicio, fim)`` consultados no provedor.
+        """
+        table = table.select(PRICES_SCHEMA.names).cast(PRICES_SCHEMA)
+        if table.num_rows:
+            anterior = self.read(ticker)
+            anterior = anterior.filter(pc.invert(pc.is_in(anterior['date'], value_set=table['date'])))
+            precos = pa.concat_tables([anterior, table])
+            precos = precos.take(pc.sort_indices(precos, [('date', 'ascending')]))
+            self._replace(self._path(ticker, '.parquet'), lambda path: pq.write_table(precos, path))
+
+        intervalos = self.merge(self.ranges(ticker) + list(ranges))
+        content = json.dumps([[inicio.isoformat(), fim.isoformat()] for inicio, fim in intervalos])
+        self._replace(self._path(ticker, '.json'), lambda path: path.write_text(content))
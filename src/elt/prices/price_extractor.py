@@ -0,0 +1,88 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.elt.prices.price_cache import PriceCache
+from src.elt.prices.providers import PRICES_SCHEMA, PriceProvider
+
+
+class HistoricalPriceExtractor:
+    def __init__(self, provider: 'PriceProvider', cache: 'PriceCache', batch_size: int = 50,
+                 max_concurrency: int = 2) -> None:
+        """
+        Inicializa o extrator de preços históricos.
+
+        :param provider: Provedor dos preços diários.
+        :param cache: Cache em disco dos preços já baixados.
+        :param batch_size: Número máximo de tickers por requisição ao provedor.
+        :param max_concurrency: Número máximo de lotes baixados simultaneamente.
+        """
+        self.provider = provider
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+
+    def plan(self, tickers: list, inicio: date, fim: date) -> list:
+        """
+        Agrupa os tickers em lotes pelos intervalos de datas que faltam no cache.
+
+        Tickers com os mesmos intervalos faltantes (o caso comum: todos desde a última
+        execução) são baixados juntos, em lotes de até ``batch_size`` tickers.
+
+        :param tickers: Tickers a extrair.
+        :param inicio: Primeira data, inclusiva.
+        :param fim: Última data, inclusiva.
+        :return: Lista de lotes ``(tickers, intervalos)``.
+        """
+        grupos = defaultdict(list)
+        for ticker in sorted(set(tickers)):
+            faltantes = tuple(self.cache.missing(ticker, inicio, fim))
+            if faltantes:
+                grupos[faltantes].append(ticker)
+        return [
+            (grupo[i:i + self.batch_size], faltantes)
+            for faltantes, grupo in grupos.items()
+            for i in range(0, len(grupo), self.batch_size)
+        ]
+
+
+    def _fetch(self, tickers: list, intervalos: tuple, hoje: date) -> pa.Table:
+        """
+        Baixa um lote e grava os preços de cada ticker no cache.
+
+        O dia corrente nunca é marcado como consultado, pois o pregão pode não ter
+        terminado, e é baixado novamente na próxima execução.
+        """
+        tabelas = [self.provider.download(tickers, inicio, fim) for inicio, fim in intervalos]
+        lote = pa.concat_tables(tabelas).select(PRICES_SCHEMA.names).cast(PRICES_SCHEMA)
+        consultados = [(inicio, min(fim, hoje - timedelta(days=1))) for inicio, fim in intervalos]
+        consultados = [(inicio, fim) for inicio, fim in consultados if inicio <= fim]
+        for ticker in tickers:
+            self.cache.write(ticker, lote.filter(pc.equal(lote['ticker'], ticker)), consultados)
+        return lote
+
+
+    def extract(self, tickers: list, inicio: date, fim: date = None) -> pa.Table:
+        """
+        Baixa os preços que faltam no cache, em lotes e com concorrência limitada.
+
+        :param tickers: Tickers a extrair.
+        :param inicio: Primeira data, inclusiva.
+        :param fim: Última data, inclusiva. Padrão: hoje.
+        :return: Os preços baixados nesta execução.
+        """
+        hoje = date.today()
+        fim = min(fim or hoje, hoje)
+        lotes = self.plan(tickers, inicio, fim)
+        if not lotes:
+            print("Preços históricos já estão em cache.")
+            return PRICES_SCHEMA.empty_table()
+
+        print(f"Baixando preços de {sum(len(lote) for lote, _ in lotes)} ticker(s) em {len(lotes)} lote(s).")
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='precos') as executor:
+            futures = [executor.submit(self._fetch, lote, intervalos, hoje) for lote, intervalos in lotes]
+        return pa.concat_tables([future.result() for future in futures])
@@ -0,0 +1,174 @@
+import time
+import zlib
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+
+# Schema do bronze de preços históricos, alinhado aos tipos de silver.precos.
+PRICES_SCHEMA = pa.schema([
+    ('ticker', pa.string()),
+    ('date', pa.date32()),
+    ('open', pa.float32()),
+    ('high', pa.float32()),
+    ('low', pa.float32()),
+    ('close', pa.float32()),
+    ('adj_close', pa.float32()),
+    ('volume', pa.int64()),
+])
+
+
+class PriceProvider(ABC):
+    """Fonte de preços diários. As subclasses implementam ``download``."""
+
+    @abstractmethod
+    def download(self, tickers: list, inicio: date, fim: date) -> pa.Table:
+        """
+        Baixa os preços diários de um lote de tickers.
+
+        :param tickers: Tickers do lote.
+        :param inicio: Primeira data, inclusiva.
+        :param fim: Última data, inclusiva.
+        :return: Uma tabela Arrow com as colunas de ``PRICES_SCHEMA``.
+        """
+
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> 'PriceProvider':
+        """
+        Cria o provedor indicado em ``provider`` na configuração da fonte ``precos``.
+
+        :param settings: Configuração da fonte ``precos``.
+        :raises ValueError: Se o provedor não for conhecido.
+        """
+        provider = settings.get('provider', 'yahoo')
+        if provider == 'yahoo':
+            return YahooFinanceProvider(suffix=settings.get('suffix', '.SA'))
+        if provider == 'fake':
+            return FakePriceProvider(latency=settings.get('latency', 0.0))
+        raise ValueError(f"Provedor de preços desconhecido: '{provider}'.")
+
+
+class YahooFinanceProvider(PriceProvider):
+    COLUMNS = {
+        'Open': 'open',
+        'High': 'high',
+        'Low': 'low',
+        'Close': 'close',
+        'Adj Close': 'adj_close',
+        'Volume': 'volume',
+    }
+
+    def __init__(self, suffix: str = '.SA') -> None:
+        """
+        Inicializa o provedor do Yahoo Finance.
+
+        :param suffix: Sufixo da bolsa acrescentado aos tickers (``.SA`` para a B3).
+        """
+        self.suffix = suffix
+
+
+    def download(self, tickers: list, inicio: date, fim: date) -> pa.Table:
+        """Baixa o lote de tickers em uma única chamada do ``yf.download``."""
+        import yfinance as yf
+
+        simbolos = {f'{ticker}{self.suffix}': ticker for ticker in tickers}
+        df = yf.download(
+            tickers=list(simbolos),
+            start=inicio.isoformat(),
+            end=(fim + timedelta(days=1)).isoformat(),
+            group_by='ticker',
+            auto_adjust=False,
+            actions=False,
+            threads=False,
+            progress=False,
+        )
+        if df.empty:
+            return PRICES_SCHEMA.empty_table()
+        if not isinstance(df.columns, pd.MultiIndex):
+            df = pd.concat({next(iter(simbolos)): df}, axis=1)
+
+        df = df.stack(level=0, future_stack=True).rename_axis(['date', 'simbolo']).reset_index()
+        df = df.rename(columns=self.COLUMNS).dropna(subset=['close'])
+        df['ticker'] = df['simbolo'].map(simbolos)
+        df['date'] = pd.to_datetime(df['date']).dt.tz_localize(None).dt.date
+        df['volume'] = df['volume'].fillna(0).astype('int64')
+        return pa.Table.from_pandas(df[PRICES_SCHEMA.names], schema=PRICES_SCHEMA, preserve_index=False)
+
+
+class FakePriceProvider(PriceProvider):
+    INICIO = date(2000, 1, 3)
+
+    def __init__(self, latency: float = 0.0) -> None:
+        """
+        Inicializa o provedor de preços sintéticos, usado em testes e benchmarks locais.
+
+        Os preços de cada ticker seguem um passeio aleatório em dias de semana, a partir
+        de 2000-01-03, cujos choques de cada dia são derivados apenas do ticker e da data,
+        de modo que baixar um intervalo em partes ou de uma só vez produz os mesmos valores.
+
+        :param latency: Espera, em segundos, simulada a cada lote.
+        """
+        self.latency = latency
+        self.calls = []
+
+
+    @staticmethod
+    def _uniformes(semente: int, dias: np.ndarray, coluna: int) -> np.ndarray:
+        """
+        Retorna um valor uniforme em (0, 1) por dia, função só da semente, do dia e da coluna.
+
+        Usa o finalizador do splitmix64 sobre a combinação dos três, em vez de um gerador
+        sequencial, cujo valor de um dia dependeria de quantos dias foram gerados antes.
+        """
+        with np.errstate(over='ignore'):
+            x = (dias.astype(np.uint64) << np.uint64(8)) | np.uint64(coluna)
+            x = x ^ np.uint64(semente << 32)
+            x = x * np.uint64(0x9E3779B97F4A7C15)
+            x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            x = x ^ (x >> np.uint64(31))
+        return ((x >> np.uint64(11)).astype(np.float64) + 0.5) / float(1 << 53)
+
+
+    @classmethod
+    def _normais(cls, semente: int, dias: np.ndarray, coluna: int, media: float, desvio: float) -> np.ndarray:
+        """Retorna um valor normal por dia (Box-Muller sobre duas colunas uniformes)."""
+        u1 = cls._uniformes(semente, dias, 2 * coluna)
+        u2 = cls._uniformes(semente, dias, 2 * coluna + 1)
+        return media + desvio * np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+
+    @classmethod
+    def _series(cls, ticker: str, fim: date) -> pd.DataFrame:
+        """Gera a série de um ticker desde 2000-01-03 até ``fim``."""
+        datas = pd.bdate_range(cls.INICIO, fim)
+        dias = (datas - pd.Timestamp(cls.INICIO)).days.to_numpy()
+        semente = zlib.crc32(ticker.encode('utf-8'))
+        close = 10.0 * np.exp(np.cumsum(cls._normais(semente, dias, 0, 0.0003, 0.02)))
+        spread = np.abs(cls._normais(semente, dias, 1, 0.0, 0.01))
+        volume = 1_000 + (cls._uniformes(semente, dias, 6) * 999_000).astype('int64')
+        return pd.DataFrame({
+            'ticker': ticker,
+            'date': datas.date,
+            'open': close * (1 + cls._normais(semente, dias, 2, 0.0, 0.005)),
+            'high': close * (1 + spread),
+            'low': close * (1 - spread),
+            'close': close,
+            'adj_close': close,
+            'volume': volume,
+        })
+
+
+    def download(self, tickers: list, inicio: date, fim: date) -> pa.Table:
+        """Gera os preços do lote, registrando a chamada em ``calls``."""
+        self.calls.append((tuple(tickers), inicio, fim))
+        if self.latency:
+            time.sleep(self.latency)
+        frames = [self._series(ticker, fim) for ticker in tickers]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=PRICES_SCHEMA.names)
+        df = df[df['date'] >= inicio]
+        return pa.Table.from_pandas(df[PRICES_SCHEMA.names], schema=PRICES_SCHEMA, preserve_index=False)
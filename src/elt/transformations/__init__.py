@@ -1,4 +1,26 @@
-from .silver_transformations import SilverTransformer
-from .gold_transformations import GoldTransformer
+from importlib import import_module
 
-__all__ = ['SilverTransformer', 'GoldTransformer']
\ No newline at end of file
+# Importados sob demanda, como em src/elt/__init__.py.
+_EXPORTS = {
+    'SilverTransformer': '.silver_transformations',
+    'GoldTransformer': '.gold_transformations',
+    'PortfolioTransformer': '.portfolio_transformations',
+    'ScreenerTransformer': '.screener_transformations',
+    'AnalyticsTransformer': '.analytics_transformations',
+    'ShardTransformer': '.shard_transformations',
+}
+
+__all__ = ['SilverTransformer', 'GoldTransformer', 'PortfolioTransformer', 'ScreenerTransformer', 'AnalyticsTransformer',
+           'ShardTransformer']
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
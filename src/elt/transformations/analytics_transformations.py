@@ -0,0 +1,355 @@
+from src.utils.db_utils import DuckDBConnection
+
+
+class AnalyticsTransformer:
+    # Colunas numéricas de gold.fact_indicadores que podem ser analisadas.
+    INDICADORES = [
+        'cotacao', 'p_vp', 'dividend_yield', 'ev_ebit', 'roic', 'p_l', 'liquidez_2_meses', 'cres_rec_5a'
+    ]
+
+    def __init__(self, db_connection: 'DuckDBConnection', config: dict, full_refresh: bool = False) -> None:
+        """
+        Inicializa o transformador dos agregados de indicadores usados nos gráficos.
+
+        As janelas móveis (em dias úteis) e os indicadores analisados são lidos
+        da seção ``analytics`` do settings.yaml.
+
+        :param db_connection: Conexão com o banco de dados DuckDB.
+        :param config: Dicionário de configuração contendo caminhos e outras informações.
+        :param full_refresh: Se True, recalcula os agregados de todas as datas.
+        :raises ValueError: Se um indicador não for uma coluna de ``gold.fact_indicadores``
+            ou uma janela não for um inteiro positivo.
+        """
+        self.db_connection = db_connection
+        self.config = config
+        self.full_refresh = full_refresh
+        self.analytics_config = config.get('analytics', {})
+        self.enabled = self.analytics_config.get('enabled', True)
+        self.janelas = self.analytics_config.get('janelas', [7, 30, 90, 252])
+        self.indicadores = self.analytics_config.get('indicadores', ['cotacao', 'p_l', 'p_vp', 'dividend_yield', 'roic'])
+
+        desconhecidos = set(self.indicadores) - set(self.INDICADORES)
+        if desconhecidos:
+            raise ValueError(f"Indicadores inexistentes em gold.fact_indicadores: {sorted(desconhecidos)}.")
+        if not all(isinstance(janela, int) and janela > 0 for janela in self.janelas):
+            raise ValueError(f"As janelas devem ser inteiros positivos: {self.janelas}.")
+
+
+    def create_tables(self) -> None:
+        """
+        Cria as tabelas de janelas móveis e de percentis por setor no esquema gold.
+
+        Assim como as tabelas da carteira, não têm chave primária: as linhas
+        recalculadas são removidas e reinseridas. ``gold.analytics_config`` guarda as
+        janelas e os indicadores com que os agregados foram calculados.
+        """
+        create_table = 'CREATE OR REPLACE TABLE' if self.full_refresh else 'CREATE TABLE IF NOT EXISTS'
+
+        self.db_connection.execute(f"""
+            {create_table} gold.analytics_config (
+                janelas INTEGER[],
+                indicadores VARCHAR[]
+            );
+        """)
+
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_indicadores_janelas (
+                acao_id INTEGER,
+                tempo_id INTEGER,
+                janela INTEGER,
+                indicador VARCHAR,
+                valor DOUBLE,
+                media DOUBLE,
+                minimo DOUBLE,
+                maximo DOUBLE,
+                desvio_padrao DOUBLE,
+                variacao DOUBLE,
+                observacoes INTEGER
+            );
+        """)
+
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_percentis_setor (
+                tempo_id INTEGER,
+                acao_id INTEGER,
+                indicador VARCHAR,
+                valor DOUBLE,
+                percentil DOUBLE
+            );
+        """)
+
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_setores (
+                tempo_id INTEGER,
+                setor VARCHAR,
+                indicador VARCHAR,
+                acoes INTEGER,
+                media DOUBLE,
+                p25 DOUBLE,
+                mediana DOUBLE,
+                p75 DOUBLE
+            );
+        """)
+
+
+    def _config_alterada(self) -> bool:
+        """
+        Verifica se as janelas ou os indicadores configurados diferem dos gravados em
+        ``gold.analytics_config``.
+
+        :return: True se os agregados de todas as datas precisam ser recalculados.
+        """
+        df = self.db_connection.sql("""
+            SELECT janelas, indicadores
+            FROM gold.analytics_config
+        """, cache=False)
+        gravada = [(sorted(janelas), sorted(indicadores)) for janelas, indicadores in zip(df['janelas'], df['indicadores'])]
+        return gravada != [(sorted(self.janelas), sorted(self.indicadores))]
+
+
+    def _gravar_config(self) -> None:
+        """Regrava ``gold.analytics_config`` com as janelas e os indicadores configurados."""
+        janelas = ', '.join(str(janela) for janela in self.janelas)
+        indicadores = ', '.join(f"'{indicador}'" for indicador in self.indicadores)
+        self.db_connection.execute("DELETE FROM gold.analytics_config")
+        self.db_connection.execute(f"""
+            INSERT INTO gold.analytics_config
+            VALUES ([{janelas}]::INTEGER[], [{indicadores}]::VARCHAR[])
+        """)
+
+
+    def _valores(self, filtro: str) -> str:
+        """
+        Retorna a consulta dos indicadores em formato longo (um valor por linha).
+
+        :param filtro: Condição SQL sobre ``gold.fact_indicadores`` (alias ``i``).
+        """
+        return f"""
+            UNPIVOT (
+                SELECT
+                    i.acao_id,
+                    i.tempo_id,
+                    {', '.join(f'i.{indicador}' for indicador in self.indicadores)}
+                FROM gold.fact_indicadores AS i
+                WHERE i.acao_id IS NOT NULL
+                AND {filtro}
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY i.acao_id, i.tempo_id ORDER BY i.id) = 1
+            )
+            ON {', '.join(self.indicadores)}
+            INTO NAME indicador VALUE valor
+        """
+
+
+    def transform_janelas(self) -> None:
+        """
+        Atualiza as janelas móveis de cada ação e indicador.
+
+        A janela de N termina em cada snapshot e cobre os snapshots dos N últimos dias
+        úteis (``dia_util_ordinal`` de ``gold.dim_tempo``), de modo que uma data sem
+        snapshot não estende a janela. Um snapshot novo altera apenas as janelas que o
+        contêm: as que terminam nos N - 1 dias úteis seguintes a ele. Só são lidos os
+        snapshots a partir de N - 1 dias úteis antes do primeiro snapshot novo de cada
+        ação; no caso comum, um snapshot novo na data mais recente, só as janelas dessa
+        data são calculadas e acrescentadas.
+        """
+        max_janela = max(self.janelas)
+
+        # Dias úteis do primeiro e do último snapshot novo por ação (todo o histórico
+        # das ações ainda sem janelas calculadas) e o primeiro dia útil a ser lido.
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE janelas_afetadas AS
+            WITH inicio AS (
+                SELECT acao_id, tempo_id
+                FROM delta_indicadores
+                WHERE acao_id IS NOT NULL
+                UNION ALL
+                SELECT DISTINCT acao_id, tempo_id
+                FROM gold.fact_indicadores
+                WHERE acao_id NOT IN (SELECT DISTINCT acao_id FROM gold.fact_indicadores_janelas)
+            )
+            SELECT
+                inicio.acao_id,
+                MIN(t.dia_util_ordinal) AS inicio,
+                MAX(t.dia_util_ordinal) AS fim,
+                MIN(t.dia_util_ordinal) - {max_janela - 1} AS leitura
+            FROM inicio
+            JOIN gold.dim_tempo AS t
+                ON inicio.tempo_id = t.id
+            GROUP BY inicio.acao_id
+        """)
+
+        # Primeira data lida entre todas as ações afetadas, que limita a leitura de
+        # gold.fact_indicadores (ordenada por data) antes do filtro por ação.
+        leitura = self.db_connection.sql("""
+            SELECT COALESCE(MIN(t.id), 0) AS tempo_id
+            FROM gold.dim_tempo AS t
+            WHERE t.dia_util_ordinal >= (SELECT MIN(leitura) FROM janelas_afetadas)
+        """, cache=False)
+        leitura = int(leitura['tempo_id'][0])
+
+        # Série de cada indicador das ações afetadas, a partir do primeiro dia útil lido.
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE serie_indicadores AS
+            SELECT
+                v.acao_id,
+                v.tempo_id,
+                t.dia_util_ordinal AS ordinal,
+                v.indicador,
+                v.valor
+            FROM ({self._valores(f'i.acao_id IN (SELECT acao_id FROM janelas_afetadas) AND i.tempo_id >= {leitura}')}) AS v
+            JOIN gold.dim_tempo AS t
+                ON v.tempo_id = t.id
+            JOIN janelas_afetadas AS a
+                ON v.acao_id = a.acao_id
+            WHERE t.dia_util_ordinal >= a.leitura
+        """)
+
+        calculos = [
+            f"""
+            SELECT
+                acao_id,
+                tempo_id,
+                {janela} AS janela,
+                indicador,
+                valor,
+                AVG(valor) OVER janela_{janela} AS media,
+                MIN(valor) OVER janela_{janela} AS minimo,
+                MAX(valor) OVER janela_{janela} AS maximo,
+                STDDEV_SAMP(valor) OVER janela_{janela} AS desvio_padrao,
+                valor / NULLIF(FIRST_VALUE(valor) OVER janela_{janela}, 0) - 1 AS variacao,
+                COUNT(valor) OVER janela_{janela} AS observacoes,
+                ordinal
+            FROM serie_indicadores
+            WINDOW janela_{janela} AS (
+                PARTITION BY acao_id, indicador
+                ORDER BY ordinal
+                RANGE BETWEEN {janela - 1} PRECEDING AND CURRENT ROW
+            )
+            """
+            for janela in self.janelas
+        ]
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE janelas_novas AS
+            SELECT calculo.* EXCLUDE (ordinal)
+            FROM ({' UNION ALL '.join(calculos)}) AS calculo
+            JOIN janelas_afetadas AS a
+                ON calculo.acao_id = a.acao_id
+                AND calculo.ordinal BETWEEN a.inicio AND a.fim + calculo.janela - 1
+        """)
+
+        # Datas recarregadas (backfill) podem ter perdido ações: remove as linhas dessas
+        # datas antes de substituir as janelas recalculadas.
+        self.db_connection.execute(f"""
+            DELETE FROM gold.fact_indicadores_janelas
+            WHERE tempo_id IN (SELECT DISTINCT tempo_id FROM delta_indicadores)
+        """)
+
+        self.db_connection.execute(f"""
+            DELETE FROM gold.fact_indicadores_janelas AS old
+            USING janelas_novas AS new
+            WHERE old.acao_id = new.acao_id
+            AND old.tempo_id = new.tempo_id
+            AND old.janela = new.janela
+            AND old.indicador = new.indicador
+        """)
+
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_indicadores_janelas
+            SELECT *
+            FROM janelas_novas
+            ORDER BY acao_id, indicador, janela, tempo_id
+        """)
+
+
+    def transform_setores(self) -> None:
+        """
+        Atualiza os percentis de cada ação no seu setor e a distribuição de cada setor.
+
+        O corte transversal de uma data depende só dos snapshots dessa data, então são
+        recalculadas apenas as datas com snapshot novo e as datas ainda não calculadas.
+        """
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE datas_setores AS
+            SELECT DISTINCT tempo_id
+            FROM delta_indicadores
+            UNION
+            SELECT DISTINCT tempo_id
+            FROM gold.fact_indicadores
+            WHERE tempo_id NOT IN (SELECT DISTINCT tempo_id FROM gold.fact_percentis_setor)
+        """)
+
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE valores_setores AS
+            SELECT
+                v.tempo_id,
+                v.acao_id,
+                acao.sector AS setor,
+                v.indicador,
+                v.valor
+            FROM ({self._valores('i.tempo_id IN (SELECT tempo_id FROM datas_setores)')}) AS v
+            JOIN gold.dim_acoes AS acao
+                ON v.acao_id = acao.id
+            WHERE acao.sector IS NOT NULL
+        """)
+
+        self.db_connection.execute(f"""
+            DELETE FROM gold.fact_percentis_setor
+            WHERE tempo_id IN (SELECT tempo_id FROM datas_setores)
+        """)
+
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_percentis_setor
+            SELECT
+                tempo_id,
+                acao_id,
+                indicador,
+                valor,
+                PERCENT_RANK() OVER (PARTITION BY tempo_id, setor, indicador ORDER BY valor) AS percentil
+            FROM valores_setores
+            ORDER BY tempo_id, acao_id
+        """)
+
+        self.db_connection.execute(f"""
+            DELETE FROM gold.fact_setores
+            WHERE tempo_id IN (SELECT tempo_id FROM datas_setores)
+        """)
+
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_setores
+            SELECT
+                tempo_id,
+                setor,
+                indicador,
+                COUNT(*)::INTEGER AS acoes,
+                AVG(valor) AS media,
+                QUANTILE_CONT(valor, 0.25) AS p25,
+                QUANTILE_CONT(valor, 0.5) AS mediana,
+                QUANTILE_CONT(valor, 0.75) AS p75
+            FROM valores_setores
+            GROUP BY tempo_id, setor, indicador
+            ORDER BY tempo_id, setor, indicador
+        """)
+
+
+    def transform(self) -> None:
+        """
+        Atualiza as janelas móveis e os percentis por setor de forma incremental.
+
+        Se as janelas ou os indicadores mudaram, os agregados são apagados e
+        recalculados em todas as datas, já que as linhas existentes foram calculadas
+        com a configuração anterior.
+
+        Deve ser executado após ``GoldTransformer.transform``, que cria a tabela
+        temporária ``delta_indicadores``.
+        """
+        if not self.enabled:
+            print("Agregados de indicadores desabilitados (analytics.enabled).")
+            return
+        if self.full_refresh or self._config_alterada():
+            print("Recalculando as janelas móveis e os percentis por setor em todas as datas.")
+            for tabela in ['fact_indicadores_janelas', 'fact_percentis_setor', 'fact_setores']:
+                self.db_connection.execute(f"DELETE FROM gold.{tabela}")
+            self._gravar_config()
+        self.transform_janelas()
+        self.transform_setores()
+        print("Janelas móveis e percentis por setor atualizados na camada Gold.")
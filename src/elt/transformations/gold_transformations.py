@@ -1,22 +1,194 @@
+from datetime import date
+
 from src.utils.db_utils import DuckDBConnection
 
 
 class GoldTransformer:
-    def __init__(self, db_connection: 'DuckDBConnection', config: dict) -> None:
+    def __init__(self, db_connection: 'DuckDBConnection', config: dict, full_refresh: bool = False) -> None:
+        """
+        Inicializa o transformador da camada gold.
+
+        :param db_connection: Conexão com o banco de dados DuckDB.
+        :param config: Dicionário de configuração contendo caminhos e outras informações.
+        :param full_refresh: Se True, recria as tabelas gold a partir de todo o histórico silver.
+        """
         self.db_connection = db_connection
         self.config = config
-    
+        self.full_refresh = full_refresh
+        self.tempo_config = {
+            'inicio': '2010-01-01',
+            'fim': '2030-12-31',
+            **config.get('tempo', {}),
+        }
 
-    def create_tables(self) -> None:
-        """Cria as tabelas necessárias no esquema gold."""
-        self.db_connection.execute("""
-            CREATE SCHEMA IF NOT EXISTS gold;
+
+    def _watermark(self, tabela: str) -> int:
+        """
+        Retorna o último id da tabela silver já processado na camada gold.
+
+        :param tabela: Nome da tabela silver.
+        :return: O último id processado ou 0 se a tabela nunca foi processada.
+        """
+        df = self.db_connection.sql(f"""
+            SELECT COALESCE(MAX(ultimo_id), 0) AS ultimo_id
+            FROM gold.controle_incremental
+            WHERE tabela = '{tabela}'
         """)
+        return int(df['ultimo_id'].iloc[0])
 
-        self.db_connection.execute("""
-            CREATE TABLE IF NOT EXISTS gold.dim_tempo AS
+
+    def _update_watermark(self, tabela: str) -> None:
+        """
+        Registra o maior id atual da tabela silver como processado.
+
+        :param tabela: Nome da tabela silver.
+        """
+        self.db_connection.execute(f"""
+            INSERT OR REPLACE INTO gold.controle_incremental
+            SELECT
+                '{tabela}' AS tabela,
+                COALESCE(MAX(id), 0) AS ultimo_id,
+                CURRENT_TIMESTAMP AS atualizado_em
+            FROM {tabela}
+        """)
+
+
+    @staticmethod
+    def chave_tipo(alias: str) -> str:
+        """
+        Retorna a expressão SQL da chave de um tipo de negociação no registro de chaves.
+
+        :param alias: Alias da tabela com as colunas ``tipo_ativo``, ``tipo_acao`` e ``tipo_negociacao``.
+        """
+        return (
+            f"CONCAT_WS('|', COALESCE({alias}.tipo_ativo, ''), COALESCE({alias}.tipo_acao, ''), "
+            f"COALESCE({alias}.tipo_negociacao, ''))"
+        )
+
+
+    def _registrar_chaves(self, dominio: str, chaves: str, ordem: str = 'chave') -> None:
+        """
+        Registra em ``gold.registro_chaves`` as chaves ainda sem id de um domínio.
+
+        Os ids de um domínio são sequenciais e nunca são renumerados: chaves novas
+        recebem ids a partir do maior id já registrado.
+
+        :param dominio: Domínio das chaves (``acao``, ``tipo`` ou ``usuario``).
+        :param chaves: Query que retorna a coluna ``chave``.
+        :param ordem: Ordem de atribuição dos ids às chaves novas.
+        """
+        self.db_connection.execute(f"""
+            INSERT INTO gold.registro_chaves
             SELECT
-                id,
+                '{dominio}' AS dominio,
+                chave,
+                (
+                    SELECT COALESCE(MAX(id), 0)
+                    FROM gold.registro_chaves
+                    WHERE dominio = '{dominio}'
+                ) + ROW_NUMBER() OVER (ORDER BY {ordem}) AS id,
+                CURRENT_TIMESTAMP AS criado_em
+            FROM (
+                SELECT DISTINCT chave
+                FROM ({chaves})
+                WHERE chave IS NOT NULL
+            ) AS new
+            WHERE chave NOT IN (
+                SELECT chave
+                FROM gold.registro_chaves
+                WHERE dominio = '{dominio}'
+            )
+        """, step=f"REGISTRO {dominio}")
+
+
+    def requires_full_refresh(self) -> bool:
+        """
+        Verifica se a camada gold está em um formato antigo: chaves de tempo sequenciais
+        ou tabelas fato com o ticker repetido em vez do ``acao_id`` do registro de chaves.
+
+        :return: True se a camada gold precisa ser reconstruída com ``full_refresh``.
+        """
+        df = self.db_connection.sql("""
+            SELECT table_name, column_name
+            FROM information_schema.columns
+            WHERE table_schema = 'gold'
+        """, cache=False)
+        colunas = set(zip(df['table_name'], df['column_name']))
+        if ('fact_indicadores', 'ticker') in colunas or ('fact_negociacoes', 'ticker') in colunas:
+            return True
+        if ('dim_tempo', 'id') not in colunas:
+            return False
+        df = self.db_connection.sql("""
+            SELECT COALESCE(MIN(id), 19000101) AS menor_id
+            FROM gold.dim_tempo
+        """, cache=False)
+        return int(df['menor_id'].iloc[0]) < 19000101
+
+
+    def _feriados(self) -> list:
+        """
+        Retorna os feriados do intervalo de ``gold.dim_tempo``.
+
+        São combinados os feriados fixos (``MM-DD``, repetidos todo ano) e as datas
+        específicas configuradas na seção ``tempo`` do settings.yaml.
+        """
+        inicio = date.fromisoformat(str(self.tempo_config['inicio']))
+        fim = date.fromisoformat(str(self.tempo_config['fim']))
+        feriados = {date.fromisoformat(str(feriado)) for feriado in self.tempo_config.get('feriados', [])}
+        for ano in range(inicio.year, fim.year + 1):
+            for feriado in self.tempo_config.get('feriados_fixos', []):
+                mes, dia = map(int, feriado.split('-'))
+                feriados.add(date(ano, mes, dia))
+        return sorted(feriado for feriado in feriados if inicio <= feriado <= fim)
+
+
+    def _dim_tempo_atualizada(self) -> bool:
+        """Verifica se ``gold.dim_tempo`` já cobre o intervalo e os feriados configurados."""
+        df = self.db_connection.sql("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_schema = 'gold' AND table_name = 'dim_tempo'
+        """, cache=False)
+        if 'dia_util' not in set(df['column_name']):
+            return False
+
+        df = self.db_connection.sql("""
+            SELECT
+                STRFTIME(MIN(data), '%Y-%m-%d') AS inicio,
+                STRFTIME(MAX(data), '%Y-%m-%d') AS fim,
+                STRING_AGG(STRFTIME(data, '%Y-%m-%d'), ',' ORDER BY data)
+                    FILTER (WHERE NOT dia_util AND ISODOW(data) < 6) AS feriados
+            FROM gold.dim_tempo
+        """, cache=False)
+        feriados = ','.join(str(feriado) for feriado in self._feriados() if feriado.isoweekday() < 6)
+        return (
+            df['inicio'].iloc[0] == str(self.tempo_config['inicio'])
+            and df['fim'].iloc[0] == str(self.tempo_config['fim'])
+            and (df['feriados'].iloc[0] or '') == feriados
+        )
+
+
+    def _create_dim_tempo(self) -> None:
+        """
+        Gera ``gold.dim_tempo`` para o intervalo configurado na seção ``tempo``.
+
+        Cada data recebe a chave YYYYMMDD, o indicador de dia útil (dias de semana que
+        não são feriados) e o número de dias úteis decorridos desde o início do intervalo.
+        """
+        feriados = ', '.join(f"DATE '{feriado}'" for feriado in self._feriados())
+        # Sem feriados, ``NOT IN (NULL)`` seria NULL e nenhum dia seria útil.
+        filtro_feriados = f"AND generate_series::DATE NOT IN ({feriados})" if feriados else ''
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TABLE gold.dim_tempo AS
+            WITH datas AS (
+                SELECT
+                    generate_series::DATE AS data,
+                    ISODOW(generate_series) < 6
+                        {filtro_feriados} AS dia_util
+                FROM generate_series(DATE '{self.tempo_config['inicio']}', DATE '{self.tempo_config['fim']}', INTERVAL 1 DAY)
+            )
+            SELECT
+                gold.tempo_id(data) AS id,
                 data,
                 EXTRACT(YEAR FROM data) AS ano,
                 EXTRACT(MONTH FROM data) AS mes,
@@ -24,12 +196,68 @@ class GoldTransformer:
                 EXTRACT(WEEK FROM data) AS semana,
                 EXTRACT(QUARTER FROM data) AS trimestre,
                 IF(EXTRACT(MONTH FROM data) <= 6, 1, 2) AS semestre,
-                STRFTIME(data, '%Y-%m-%d') AS data_str
-            FROM silver.tempo;
+                STRFTIME(data, '%Y-%m-%d') AS data_str,
+                ISODOW(data) AS dia_semana,
+                COALESCE(dia_util, false) AS dia_util,
+                SUM(IF(dia_util, 1, 0)) OVER (ORDER BY data)::INTEGER AS dia_util_ordinal
+            FROM datas
+            ORDER BY data
         """)
 
+
+    def create_macros(self) -> None:
+        """Cria as macros usadas nas transformações gold."""
+        # Chave de tempo determinística: a data no formato YYYYMMDD.
         self.db_connection.execute("""
-            CREATE OR REPLACE TABLE gold.dim_acoes (
+            CREATE OR REPLACE MACRO gold.tempo_id(data) AS
+                (YEAR(data::DATE) * 10000 + MONTH(data::DATE) * 100 + DAY(data::DATE))::INTEGER
+        """)
+
+
+    def create_tables(self) -> None:
+        """
+        Cria as tabelas necessárias no esquema gold.
+
+        No modo incremental as tabelas existentes são mantidas; com ``full_refresh``
+        elas são recriadas vazias e as marcas d'água são descartadas.
+        """
+        create_table = 'CREATE OR REPLACE TABLE' if self.full_refresh else 'CREATE TABLE IF NOT EXISTS'
+
+        self.db_connection.execute("""
+            CREATE SCHEMA IF NOT EXISTS gold;
+        """)
+
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS gold.controle_incremental (
+                tabela VARCHAR PRIMARY KEY,
+                ultimo_id INTEGER,
+                atualizado_em TIMESTAMP
+            );
+        """)
+
+        if self.full_refresh:
+            self.db_connection.execute("""
+                DELETE FROM gold.controle_incremental;
+            """)
+
+        self.create_macros()
+
+        if self.full_refresh or not self._dim_tempo_atualizada():
+            self._create_dim_tempo()
+
+        # O registro de chaves nunca é recriado: os ids permanecem estáveis mesmo
+        # após um full refresh.
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS gold.registro_chaves (
+                dominio VARCHAR,
+                chave VARCHAR,
+                id INTEGER,
+                criado_em TIMESTAMP
+            );
+        """)
+
+        self.db_connection.execute(f"""
+            {create_table} gold.dim_acoes (
                 id INTEGER PRIMARY KEY,
                 ticker VARCHAR,
                 name VARCHAR,
@@ -39,12 +267,11 @@ class GoldTransformer:
             );
         """)
 
-        self.db_connection.execute("""
-            CREATE OR REPLACE TABLE gold.fact_indicadores (
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_indicadores (
                 id INTEGER PRIMARY KEY,
                 tempo_id INTEGER,
                 acao_id INTEGER,
-                ticker VARCHAR,
                 cotacao FLOAT,
                 p_vp FLOAT,
                 dividend_yield FLOAT,
@@ -56,12 +283,25 @@ class GoldTransformer:
             );
         """)
 
-        self.db_connection.execute("""
-            CREATE OR REPLACE TABLE gold.fact_oportunidades (
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_precos (
+                id INTEGER PRIMARY KEY,
+                tempo_id INTEGER,
+                acao_id INTEGER,
+                abertura FLOAT,
+                maxima FLOAT,
+                minima FLOAT,
+                fechamento FLOAT,
+                fechamento_ajustado FLOAT,
+                volume BIGINT
+            );
+        """)
+
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_oportunidades (
                 id INTEGER PRIMARY KEY,
                 tempo_id INTEGER,
                 acao_id INTEGER,
-                ticker VARCHAR,
                 cotacao FLOAT,
                 p_vp FLOAT,
                 dividend_yield FLOAT,
@@ -71,8 +311,8 @@ class GoldTransformer:
             );
         """)
 
-        self.db_connection.execute("""
-            CREATE OR REPLACE TABLE gold.dim_tipo (
+        self.db_connection.execute(f"""
+            {create_table} gold.dim_tipo (
                 id INTEGER PRIMARY KEY,
                 tipo_ativo VARCHAR,
                 tipo_acao VARCHAR,
@@ -80,22 +320,33 @@ class GoldTransformer:
             );
         """)
 
-        self.db_connection.execute("""
-            CREATE OR REPLACE TABLE gold.dim_usuarios (
+        self.db_connection.execute(f"""
+            {create_table} gold.dim_usuarios (
                 id INTEGER PRIMARY KEY,
                 nome VARCHAR,
                 email VARCHAR
             );
         """)
 
-        self.db_connection.execute("""
-            CREATE OR REPLACE TABLE gold.fact_negociacoes (
+        self.create_fact_negociacoes()
+
+
+    def create_fact_negociacoes(self) -> None:
+        """
+        Cria ``gold.fact_negociacoes``.
+
+        É a única tabela gold criada nos bancos dos shards de usuários, que leem as
+        demais tabelas das exportações do banco principal.
+        """
+        create_table = 'CREATE OR REPLACE TABLE' if self.full_refresh else 'CREATE TABLE IF NOT EXISTS'
+
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_negociacoes (
                 id INTEGER PRIMARY KEY,
                 usuario_id INTEGER,
                 acao_id INTEGER,
                 tempo_id INTEGER,
                 tipo_id INTEGER,
-                ticker VARCHAR,
                 quantidade INTEGER,
                 valor_total FLOAT,
                 cotacao FLOAT,
@@ -111,82 +362,213 @@ class GoldTransformer:
 
 
     def transform(self) -> None:
-        self.db_connection.execute(f"""
-            INSERT INTO gold.dim_tempo
-            SELECT
-                new.id,
-                new.data,
-                EXTRACT(YEAR FROM new.data) AS ano,
-                EXTRACT(MONTH FROM new.data) AS mes,
-                EXTRACT(DAY FROM new.data) AS dia,
-                EXTRACT(WEEK FROM new.data) AS semana,
-                EXTRACT(QUARTER FROM new.data) AS trimestre,
-                IF(EXTRACT(MONTH FROM new.data) <= 6, 1, 2) AS semestre,
-                STRFTIME(new.data, '%Y-%m-%d') AS data_str
-            FROM silver.tempo AS new
-            LEFT JOIN gold.dim_tempo AS old
-                ON new.id = old.id
-            WHERE old.id IS NULL
+        """
+        Atualiza as tabelas gold de forma incremental.
+
+        Apenas os snapshots silver com id acima da marca d'água e as negociações
+        novas ou alteradas são processados e mesclados nas tabelas gold.
+        """
+        self.registrar_chaves()
+        self.transform_dim_acoes()
+        self.transform_dim_tipo()
+        self.transform_dim_usuarios()
+        self.transform_fatos()
+
+
+    def registrar_chaves(self) -> None:
+        """Registra os tickers, tipos de negociação e usuários novos do silver."""
+        ultimo_fundamentus = self._watermark('silver.fundamentus_resultado')
+        ultimo_brapi = self._watermark('silver.brapi_quote_list')
+        ultimo_precos = self._watermark('silver.precos')
+
+        self._registrar_chaves('acao', f"""
+            SELECT ticker AS chave FROM silver.brapi_quote_list WHERE id > {ultimo_brapi}
+            UNION ALL
+            SELECT ticker AS chave FROM silver.fundamentus_resultado WHERE id > {ultimo_fundamentus}
+            UNION ALL
+            SELECT ticker AS chave FROM silver.precos WHERE id > {ultimo_precos}
+            UNION ALL
+            SELECT ticker AS chave FROM silver.negociacoes
         """)
+        self._registrar_chaves('tipo', f"""
+            SELECT {self.chave_tipo('negociacoes')} AS chave FROM silver.negociacoes
+        """)
+        self._registrar_chaves('usuario', f"""
+            SELECT id::VARCHAR AS chave FROM silver.usuarios
+            UNION ALL
+            SELECT usuario_id::VARCHAR AS chave FROM silver.negociacoes
+        """, ordem='TRY_CAST(chave AS INTEGER), chave')
+
+
+    def transform_dim_acoes(self) -> None:
+        """
+        Atualiza ``gold.dim_acoes``.
+
+        Deve ser executado antes de ``transform_fatos``, que avança a marca d'água da brapi.
+        """
+        ultimo_brapi = self._watermark('silver.brapi_quote_list')
 
+        # Atributos de cada ação segundo o snapshot mais recente da brapi; tickers sem
+        # snapshot da brapi entram na dimensão sem atributos.
         self.db_connection.execute(f"""
-            INSERT INTO gold.dim_acoes
-            SELECT
-                row_number() OVER (ORDER BY ticker, name, logo, sector, type) AS id,
-                ticker,
-                name,
-                logo,
-                sector,
-                type
-            FROM (
-                SELECT DISTINCT
+            INSERT OR REPLACE INTO gold.dim_acoes
+            WITH atributos AS (
+                SELECT
                     ticker,
                     name,
                     logo,
                     sector,
                     type
                 FROM silver.brapi_quote_list
-            ) AS distinct_brapi_quote_list;
+                WHERE ticker IN (SELECT ticker FROM silver.brapi_quote_list WHERE id > {ultimo_brapi})
+                QUALIFY ROW_NUMBER() OVER (PARTITION BY ticker ORDER BY extracted_date DESC, id DESC) = 1
+            )
+            SELECT
+                registro.id,
+                registro.chave AS ticker,
+                atributos.name,
+                atributos.logo,
+                atributos.sector,
+                atributos.type
+            FROM gold.registro_chaves AS registro
+            LEFT JOIN atributos
+                ON registro.chave = atributos.ticker
+            WHERE
+                registro.dominio = 'acao'
+                AND (
+                    atributos.ticker IS NOT NULL
+                    OR registro.id NOT IN (SELECT id FROM gold.dim_acoes)
+                )
         """)
 
+
+    def transform_dim_tipo(self) -> None:
+        """Acrescenta a ``gold.dim_tipo`` os tipos de negociação novos."""
         self.db_connection.execute(f"""
             INSERT INTO gold.dim_tipo
             SELECT
-                row_number() OVER (ORDER BY tipo_ativo, tipo_acao, tipo_negociacao) AS id,
-                tipo_ativo,
-                tipo_acao,
-                tipo_negociacao
+                registro.id,
+                new.tipo_ativo,
+                new.tipo_acao,
+                new.tipo_negociacao
             FROM (
                 SELECT DISTINCT
                     tipo_ativo,
                     tipo_acao,
                     tipo_negociacao
                 FROM silver.negociacoes
-            ) AS distinct_negociacoes;
+            ) AS new
+            JOIN gold.registro_chaves AS registro
+                ON registro.dominio = 'tipo'
+                AND registro.chave = {self.chave_tipo('new')}
+            WHERE registro.id NOT IN (SELECT id FROM gold.dim_tipo)
         """)
 
+
+    def transform_dim_usuarios(self) -> None:
+        """Acrescenta ou atualiza em ``gold.dim_usuarios`` os usuários novos ou alterados."""
         self.db_connection.execute(f"""
-            INSERT INTO gold.dim_usuarios
+            INSERT OR REPLACE INTO gold.dim_usuarios
             SELECT
-                row_number() OVER (ORDER BY nome, email) AS id,
-                nome,
-                email
-            FROM (
-                SELECT DISTINCT
-                    nome,
-                    email
-                FROM silver.usuarios
-            ) AS distinct_usuarios;
+                registro.id,
+                new.nome,
+                new.email
+            FROM silver.usuarios AS new
+            JOIN gold.registro_chaves AS registro
+                ON registro.dominio = 'usuario'
+                AND registro.chave = new.id::VARCHAR
+            LEFT JOIN gold.dim_usuarios AS old
+                ON registro.id = old.id
+            WHERE
+                old.id IS NULL
+                OR new.nome IS DISTINCT FROM old.nome
+                OR new.email IS DISTINCT FROM old.email
         """)
 
+
+    def transform_fatos(self) -> None:
+        """
+        Atualiza as tabelas fato e avança as marcas d'água.
+
+        Cria as tabelas temporárias ``delta_indicadores`` e ``delta_negociacoes``,
+        usadas em seguida, na mesma conexão, pelo screener e pela carteira.
+        """
+        self.transform_indicadores()
+        self.transform_negociacoes()
+        self.update_watermarks()
+        print("Dados transformados na camada Gold.")
+
+
+    def transform_indicadores(self) -> None:
+        """
+        Atualiza ``gold.fact_precos`` e ``gold.fact_indicadores`` com os snapshots novos.
+
+        Cria a tabela temporária ``delta_indicadores``. As marcas d'água só são avançadas
+        por ``update_watermarks``, depois das tabelas que dependem do delta.
+        """
+        ultimo_fundamentus = self._watermark('silver.fundamentus_resultado')
+        ultimo_brapi = self._watermark('silver.brapi_quote_list')
+        ultimo_precos = self._watermark('silver.precos')
+
+        # Preços históricos novos: cada par de ação e data fica com o preço da extração
+        # mais recente, substituindo o já gravado.
         self.db_connection.execute(f"""
-            INSERT INTO gold.fact_indicadores
+            CREATE OR REPLACE TEMP TABLE delta_precos AS
+            SELECT
+                precos.id,
+                gold.tempo_id(precos.data) AS tempo_id,
+                acao.id AS acao_id,
+                precos.open AS abertura,
+                precos.high AS maxima,
+                precos.low AS minima,
+                precos.close AS fechamento,
+                precos.adj_close AS fechamento_ajustado,
+                precos.volume
+            FROM silver.precos AS precos
+            LEFT JOIN gold.registro_chaves AS acao
+                ON acao.dominio = 'acao'
+                AND precos.ticker = acao.chave
+            WHERE precos.id > {ultimo_precos}
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY precos.ticker, precos.data ORDER BY precos.extracted_date DESC, precos.id DESC) = 1
+        """)
+
+        self.db_connection.execute(f"""
+            DELETE FROM gold.fact_precos AS old
+            USING delta_precos AS new
+            WHERE old.acao_id = new.acao_id
+            AND old.tempo_id = new.tempo_id
+        """)
+
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_precos
+            SELECT *
+            FROM delta_precos
+            ORDER BY acao_id, tempo_id
+        """)
+
+        # Datas com snapshot novo no Fundamentus ou na brapi, ou com preço histórico
+        # novo, desde a última execução. Sem cotação nos snapshots, vale o fechamento
+        # do histórico de preços.
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE delta_indicadores AS
+            WITH datas_novas AS (
+                SELECT DISTINCT extracted_date
+                FROM silver.fundamentus_resultado
+                WHERE id > {ultimo_fundamentus}
+                UNION
+                SELECT DISTINCT extracted_date
+                FROM silver.brapi_quote_list
+                WHERE id > {ultimo_brapi}
+                UNION
+                SELECT DISTINCT data
+                FROM silver.precos
+                WHERE id > {ultimo_precos}
+            )
             SELECT DISTINCT
                 fd.id,
-                tempo.id AS tempo_id,
-                brapi.id AS acao_id,
-                fd.ticker,
-                COALESCE(fd.cotacao, brapi.close) AS cotacao,
+                gold.tempo_id(fd.extracted_date) AS tempo_id,
+                acao.id AS acao_id,
+                COALESCE(fd.cotacao, brapi.close, precos.fechamento) AS cotacao,
                 fd.p_vp,
                 fd.dividend_yield,
                 fd.ev_ebit,
@@ -195,52 +577,122 @@ class GoldTransformer:
                 fd.liquidez_2_meses,
                 fd.cres_rec_5a
             FROM silver.fundamentus_resultado AS fd
-            LEFT JOIN silver.tempo AS tempo
-                ON fd.extracted_date = tempo.data
+            LEFT JOIN gold.registro_chaves AS acao
+                ON acao.dominio = 'acao'
+                AND fd.ticker = acao.chave
             LEFT JOIN silver.brapi_quote_list AS brapi
                 ON fd.ticker = brapi.ticker
                 AND fd.extracted_date = brapi.extracted_date
+            LEFT JOIN gold.fact_precos AS precos
+                ON acao.id = precos.acao_id
+                AND gold.tempo_id(fd.extracted_date) = precos.tempo_id
+            WHERE fd.extracted_date IN (SELECT extracted_date FROM datas_novas)
         """)
 
+        # Datas recarregadas no silver (backfill) recebem novos ids: remove as linhas
+        # anteriores dessas datas antes de inserir o delta.
         self.db_connection.execute(f"""
-            INSERT INTO gold.fact_oportunidades
-            SELECT DISTINCT
-                id,
-                tempo_id,
+            DELETE FROM gold.fact_indicadores
+            WHERE tempo_id IN (SELECT DISTINCT tempo_id FROM delta_indicadores)
+        """)
+
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_indicadores
+            SELECT *
+            FROM delta_indicadores
+        """)
+
+
+    def transform_negociacoes(self) -> None:
+        """
+        Atualiza ``gold.fact_negociacoes`` com as negociações novas ou alteradas.
+
+        Deve ser executado após ``transform_indicadores``: as negociações cujo snapshot
+        de indicadores mudou são recalculadas a partir de ``delta_indicadores``.
+        """
+        # silver.negociacoes é recarregada a cada execução: mescla apenas as
+        # negociações novas, alteradas ou cujo snapshot de indicadores mudou.
+        self.db_connection.execute(f"""
+            DELETE FROM gold.fact_negociacoes
+            WHERE id NOT IN (SELECT id FROM silver.negociacoes)
+        """)
+
+        # Um snapshot novo de uma ação altera o preço das negociações feitas a partir
+        # da data do snapshot (até o snapshot seguinte).
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE delta_negociacoes AS
+            WITH acoes_alteradas AS (
+                SELECT
+                    acao_id,
+                    MIN(tempo_id) AS tempo_id
+                FROM delta_indicadores
+                GROUP BY acao_id
+            )
+            SELECT
+                neg.id,
+                usuario.id AS usuario_id,
+                acao.id AS acao_id,
+                gold.tempo_id(neg.data_movimentacao) AS tempo_id,
+                tipo.id AS tipo_id,
+                IF(neg.tipo_negociacao = 'venda', -neg.quantidade, neg.quantidade) AS quantidade,
+                neg.quantidade AS quantidade_absoluta
+            FROM silver.negociacoes AS neg
+            LEFT JOIN gold.registro_chaves AS usuario
+                ON usuario.dominio = 'usuario'
+                AND neg.usuario_id::VARCHAR = usuario.chave
+            LEFT JOIN gold.registro_chaves AS acao
+                ON acao.dominio = 'acao'
+                AND neg.ticker = acao.chave
+            LEFT JOIN gold.registro_chaves AS tipo
+                ON tipo.dominio = 'tipo'
+                AND {self.chave_tipo('neg')} = tipo.chave
+            LEFT JOIN gold.fact_negociacoes AS old
+                ON neg.id = old.id
+            LEFT JOIN acoes_alteradas AS alterada
+                ON acao.id = alterada.acao_id
+            WHERE
+                old.id IS NULL
+                OR usuario.id IS DISTINCT FROM old.usuario_id
+                OR acao.id IS DISTINCT FROM old.acao_id
+                OR IF(neg.tipo_negociacao = 'venda', -neg.quantidade, neg.quantidade) IS DISTINCT FROM old.quantidade
+                OR gold.tempo_id(neg.data_movimentacao) IS DISTINCT FROM old.tempo_id
+                OR tipo.id IS DISTINCT FROM old.tipo_id
+                OR gold.tempo_id(neg.data_movimentacao) >= alterada.tempo_id
+        """)
+
+        # Índice dos snapshots por ação e data, com um único snapshot por par
+        # (acao_id, tempo_id), restrito às ações negociadas no delta.
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE indicadores_por_acao AS
+            SELECT
                 acao_id,
-                ticker,
+                tempo_id,
                 cotacao,
                 p_vp,
                 dividend_yield,
                 ev_ebit,
                 roic,
-                p_l
+                p_l,
+                liquidez_2_meses,
+                cres_rec_5a
             FROM gold.fact_indicadores
-            WHERE 
-                liquidez_2_meses > 100000
-                AND cotacao > 0
-                AND ev_ebit > 0
-                AND p_vp < 1
-                AND roic > 0.1
-                AND p_l > 0
-                AND cres_rec_5a > 0
-            QUALIFY ROW_NUMBER() OVER (
-                PARTITION BY ticker, cotacao, p_vp, dividend_yield, ev_ebit, roic, p_l
-                ORDER BY ticker, cotacao, p_vp, dividend_yield, ev_ebit, roic, p_l
-            ) = 1
+            WHERE acao_id IN (SELECT DISTINCT acao_id FROM delta_negociacoes)
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY acao_id, tempo_id ORDER BY id) = 1
+            ORDER BY acao_id, tempo_id
         """)
 
+        # Cada negociação recebe o último snapshot da ação com data menor ou igual
+        # à da negociação (ASOF JOIN), mesmo em dias sem snapshot.
         self.db_connection.execute(f"""
-            INSERT INTO gold.fact_negociacoes
-            SELECT DISTINCT
+            INSERT OR REPLACE INTO gold.fact_negociacoes
+            SELECT
                 neg.id,
                 neg.usuario_id,
-                fi.acao_id,
-                tempo.id AS tempo_id,
-                tipo.id AS tipo_id,
-                neg.ticker,
-                IF(neg.tipo_negociacao = 'venda', -neg.quantidade, neg.quantidade) AS quantidade,
-                (fi.cotacao * neg.quantidade) AS valor_total,
+                neg.acao_id,
+                neg.tempo_id,
+                neg.tipo_id,
+                neg.quantidade,
+                (fi.cotacao * neg.quantidade_absoluta) AS valor_total,
                 fi.cotacao,
                 fi.p_vp,
                 fi.dividend_yield,
@@ -249,16 +701,15 @@ class GoldTransformer:
                 fi.p_l,
                 fi.liquidez_2_meses,
                 fi.cres_rec_5a
-            FROM silver.negociacoes AS neg
-            LEFT JOIN silver.tempo AS tempo
-                ON neg.data_movimentacao = tempo.data
-            LEFT JOIN gold.fact_indicadores AS fi
-                ON neg.ticker = fi.ticker
-                AND tempo.id = fi.tempo_id
-            LEFT JOIN gold.dim_tipo AS tipo
-                ON neg.tipo_ativo = tipo.tipo_ativo
-                AND neg.tipo_acao = tipo.tipo_acao
-                AND neg.tipo_negociacao = tipo.tipo_negociacao
+            FROM delta_negociacoes AS neg
+            ASOF LEFT JOIN indicadores_por_acao AS fi
+                ON neg.acao_id = fi.acao_id
+                AND neg.tempo_id >= fi.tempo_id
         """)
 
-        print("Dados transformados na camada Gold.")
\ No newline at end of file
+
+    def update_watermarks(self) -> None:
+        """Registra como processados os snapshots silver atuais."""
+        self._update_watermark('silver.fundamentus_resultado')
+        self._update_watermark('silver.brapi_quote_list')
+        self._update_watermark('silver.precos')
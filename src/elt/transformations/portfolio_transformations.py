@@ -0,0 +1,227 @@
+from src.utils.db_utils import DuckDBConnection
+
+
+class PortfolioTransformer:
+    def __init__(self, db_connection: 'DuckDBConnection', config: dict, full_refresh: bool = False) -> None:
+        """
+        Inicializa o transformador das posições e da carteira diária dos usuários.
+
+        :param db_connection: Conexão com o banco de dados DuckDB.
+        :param config: Dicionário de configuração contendo caminhos e outras informações.
+        :param full_refresh: Se True, recria as tabelas a partir de todo o histórico gold.
+        """
+        self.db_connection = db_connection
+        self.config = config
+        self.full_refresh = full_refresh
+
+
+    def create_tables(self) -> None:
+        """
+        Cria as tabelas de posições e de carteira diária no esquema gold.
+
+        As tabelas não têm chave primária: as linhas recalculadas são removidas e
+        reinseridas, e o índice de chaves compostas do DuckDB acusa chaves duplicadas
+        ao reinserir chaves removidas.
+        """
+        create_table = 'CREATE OR REPLACE TABLE' if self.full_refresh else 'CREATE TABLE IF NOT EXISTS'
+
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_posicoes (
+                usuario_id INTEGER,
+                acao_id INTEGER,
+                tempo_id INTEGER,
+                quantidade INTEGER,
+                posicao INTEGER
+            );
+        """)
+
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_carteira_diaria (
+                usuario_id INTEGER,
+                tempo_id INTEGER,
+                valor_mercado DOUBLE,
+                quantidade_ativos INTEGER
+            );
+        """)
+
+
+    def transform(self) -> None:
+        """
+        Atualiza as posições e a carteira diária de forma incremental.
+
+        As posições de cada usuário e ação são recalculadas a partir da primeira data
+        cujo saldo de negociações mudou; a carteira diária de cada usuário é recalculada
+        a partir da primeira data afetada por uma posição alterada ou por um snapshot
+        novo de uma ação da carteira, e estendida até a data mais recente.
+
+        Deve ser executado após ``GoldTransformer.transform``, que cria a tabela
+        temporária ``delta_indicadores``.
+        """
+        # Saldo negociado por usuário, ação e data. Negociações sem usuário ou ação
+        # mapeados não formam posição: com chaves nulas, as comparações abaixo nunca as
+        # casariam com as já gravadas e elas seriam dadas como alteradas a cada execução.
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE movimentos AS
+            SELECT
+                usuario_id,
+                acao_id,
+                tempo_id,
+                SUM(quantidade)::INTEGER AS quantidade
+            FROM gold.fact_negociacoes
+            WHERE tempo_id IS NOT NULL
+            AND usuario_id IS NOT NULL
+            AND acao_id IS NOT NULL
+            GROUP BY usuario_id, acao_id, tempo_id
+        """)
+
+        # Primeira data com saldo diferente do já gravado, por usuário e ação.
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE posicoes_alteradas AS
+            SELECT
+                COALESCE(new.usuario_id, old.usuario_id) AS usuario_id,
+                COALESCE(new.acao_id, old.acao_id) AS acao_id,
+                MIN(COALESCE(new.tempo_id, old.tempo_id)) AS tempo_id
+            FROM movimentos AS new
+            FULL OUTER JOIN gold.fact_posicoes AS old
+                ON new.usuario_id = old.usuario_id
+                AND new.acao_id = old.acao_id
+                AND new.tempo_id = old.tempo_id
+            WHERE new.quantidade IS DISTINCT FROM old.quantidade
+            GROUP BY ALL
+        """)
+
+        self.db_connection.execute(f"""
+            DELETE FROM gold.fact_posicoes AS p
+            USING posicoes_alteradas AS a
+            WHERE p.usuario_id = a.usuario_id
+            AND p.acao_id = a.acao_id
+            AND p.tempo_id >= a.tempo_id
+        """)
+
+        # A posição acumulada continua a partir da última posição mantida.
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_posicoes
+            WITH posicao_anterior AS (
+                SELECT
+                    usuario_id,
+                    acao_id,
+                    ARG_MAX(posicao, tempo_id) AS posicao
+                FROM gold.fact_posicoes
+                SEMI JOIN posicoes_alteradas
+                    USING (usuario_id, acao_id)
+                GROUP BY usuario_id, acao_id
+            )
+            SELECT
+                m.usuario_id,
+                m.acao_id,
+                m.tempo_id,
+                m.quantidade,
+                COALESCE(anterior.posicao, 0) + SUM(m.quantidade) OVER (
+                    PARTITION BY m.usuario_id, m.acao_id
+                    ORDER BY m.tempo_id
+                ) AS posicao
+            FROM movimentos AS m
+            JOIN posicoes_alteradas AS a
+                ON m.usuario_id = a.usuario_id
+                AND m.acao_id = a.acao_id
+                AND m.tempo_id >= a.tempo_id
+            LEFT JOIN posicao_anterior AS anterior
+                ON m.usuario_id = anterior.usuario_id
+                AND m.acao_id = anterior.acao_id
+        """)
+
+        # Primeira data a recalcular na carteira de cada usuário: posições alteradas,
+        # snapshots novos de ações da carteira ou datas ainda não calculadas.
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE carteiras_alteradas AS
+            WITH inicio AS (
+                SELECT usuario_id, tempo_id
+                FROM posicoes_alteradas
+                UNION ALL
+                SELECT p.usuario_id, MIN(di.tempo_id)
+                FROM (SELECT DISTINCT usuario_id, acao_id FROM gold.fact_posicoes) AS p
+                JOIN delta_indicadores AS di
+                    ON p.acao_id = di.acao_id
+                GROUP BY p.usuario_id
+                UNION ALL
+                SELECT p.usuario_id, COALESCE(c.ultimo + 1, p.primeiro)
+                FROM (
+                    SELECT usuario_id, MIN(tempo_id) AS primeiro
+                    FROM gold.fact_posicoes
+                    GROUP BY usuario_id
+                ) AS p
+                LEFT JOIN (
+                    SELECT usuario_id, MAX(tempo_id) AS ultimo
+                    FROM gold.fact_carteira_diaria
+                    GROUP BY usuario_id
+                ) AS c
+                    ON p.usuario_id = c.usuario_id
+            )
+            SELECT
+                usuario_id,
+                MIN(tempo_id) AS tempo_id
+            FROM inicio
+            GROUP BY usuario_id
+        """)
+
+        self.db_connection.execute(f"""
+            DELETE FROM gold.fact_carteira_diaria AS c
+            USING carteiras_alteradas AS a
+            WHERE c.usuario_id = a.usuario_id
+            AND c.tempo_id >= a.tempo_id
+        """)
+
+        # Um snapshot por ação e data, ordenado para o ASOF JOIN das cotações.
+        self.db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE cotacoes_por_acao AS
+            SELECT
+                acao_id,
+                tempo_id,
+                cotacao
+            FROM gold.fact_indicadores
+            WHERE acao_id IN (SELECT DISTINCT acao_id FROM gold.fact_posicoes)
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY acao_id, tempo_id ORDER BY id) = 1
+            ORDER BY acao_id, tempo_id
+        """)
+
+        # Para cada usuário, ação e data a recalcular, a posição e a cotação vigentes
+        # são as do último registro com data menor ou igual (ASOF JOIN).
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_carteira_diaria
+            WITH ativos AS (
+                SELECT
+                    p.usuario_id,
+                    p.acao_id,
+                    GREATEST(MIN(p.tempo_id), ANY_VALUE(a.tempo_id)) AS inicio
+                FROM gold.fact_posicoes AS p
+                JOIN carteiras_alteradas AS a
+                    ON p.usuario_id = a.usuario_id
+                GROUP BY p.usuario_id, p.acao_id
+            ),
+            grade AS (
+                SELECT
+                    ativos.usuario_id,
+                    ativos.acao_id,
+                    tempo.id AS tempo_id
+                FROM ativos
+                JOIN gold.dim_tempo AS tempo
+                    ON tempo.id >= ativos.inicio
+                    AND tempo.data <= CURRENT_DATE
+            )
+            SELECT
+                grade.usuario_id,
+                grade.tempo_id,
+                SUM(p.posicao * c.cotacao) AS valor_mercado,
+                COUNT(*) FILTER (WHERE p.posicao <> 0)::INTEGER AS quantidade_ativos
+            FROM grade
+            ASOF JOIN gold.fact_posicoes AS p
+                ON grade.usuario_id = p.usuario_id
+                AND grade.acao_id = p.acao_id
+                AND grade.tempo_id >= p.tempo_id
+            ASOF LEFT JOIN cotacoes_por_acao AS c
+                ON grade.acao_id = c.acao_id
+                AND grade.tempo_id >= c.tempo_id
+            GROUP BY grade.usuario_id, grade.tempo_id
+        """)
+
+        print("Posições e carteira diária atualizadas na camada Gold.")
@@ -0,0 +1,295 @@
+import pandas as pd
+
+from src.utils.db_utils import DuckDBConnection
+
+
+class ScreenerTransformer:
+    # As regras são guardadas como bits de um UBIGINT.
+    MAX_REGRAS = 64
+
+    def __init__(self, db_connection: 'DuckDBConnection', config: dict, full_refresh: bool = False) -> None:
+        """
+        Inicializa o screener de indicadores.
+
+        As regras (expressões SQL sobre as colunas de ``gold.fact_indicadores``) e as
+        estratégias (conjuntos de regras) são lidas da seção ``screener`` do settings.yaml.
+
+        :param db_connection: Conexão com o banco de dados DuckDB.
+        :param config: Dicionário de configuração contendo caminhos e outras informações.
+        :param full_refresh: Se True, reavalia as regras em todas as datas.
+        :raises ValueError: Se houver mais de 64 regras ou uma estratégia usar uma regra inexistente.
+        """
+        self.db_connection = db_connection
+        self.config = config
+        self.full_refresh = full_refresh
+        self.screener_config = config.get('screener', {})
+        self.regras = self.screener_config.get('regras', {})
+        self.estrategias = self.screener_config.get('estrategias', {})
+        self.estrategia_oportunidades = self.screener_config.get('oportunidades', 'oportunidades')
+
+        if len(self.regras) > self.MAX_REGRAS:
+            raise ValueError(f"O screener suporta no máximo {self.MAX_REGRAS} regras.")
+        for estrategia, regras in self.estrategias.items():
+            desconhecidas = set(regras) - set(self.regras)
+            if desconhecidas:
+                raise ValueError(f"Estratégia '{estrategia}' usa regras inexistentes: {sorted(desconhecidas)}.")
+        if self.estrategia_oportunidades not in self.estrategias:
+            raise ValueError(f"Estratégia '{self.estrategia_oportunidades}' não definida em screener.estrategias.")
+
+
+    def create_tables(self) -> None:
+        """Cria as tabelas de regras, estratégias e flags do screener no esquema gold."""
+        create_table = 'CREATE OR REPLACE TABLE' if self.full_refresh else 'CREATE TABLE IF NOT EXISTS'
+
+        self.db_connection.execute(f"""
+            {create_table} gold.dim_regras (
+                id INTEGER PRIMARY KEY,
+                nome VARCHAR,
+                expressao VARCHAR,
+                bit INTEGER
+            );
+        """)
+
+        self.db_connection.execute(f"""
+            {create_table} gold.dim_estrategias (
+                id INTEGER PRIMARY KEY,
+                nome VARCHAR,
+                regras VARCHAR[],
+                mascara UBIGINT
+            );
+        """)
+
+        # Estratégia e máscara com que gold.fact_oportunidades foi gerada.
+        self.db_connection.execute(f"""
+            {create_table} gold.controle_oportunidades (
+                estrategia VARCHAR,
+                mascara UBIGINT
+            );
+        """)
+
+        self.db_connection.execute(f"""
+            {create_table} gold.fact_regras_indicadores (
+                indicador_id INTEGER PRIMARY KEY,
+                tempo_id INTEGER,
+                acao_id INTEGER,
+                flags UBIGINT
+            );
+        """)
+
+
+    @staticmethod
+    def _literal(value: str) -> str:
+        """Escapa um texto como literal SQL."""
+        return "'" + value.replace("'", "''") + "'"
+
+
+    def _regras_alteradas(self) -> bool:
+        """
+        Verifica se as regras configuradas diferem das gravadas em ``gold.dim_regras``.
+
+        :return: True se as flags de todas as datas precisam ser recalculadas.
+        """
+        df = self.db_connection.sql("""
+            SELECT nome, expressao
+            FROM gold.dim_regras
+            ORDER BY bit
+        """, cache=False)
+        return list(zip(df['nome'], df['expressao'])) != list(self.regras.items())
+
+
+    def _estrategias_alteradas(self) -> bool:
+        """
+        Verifica se as estratégias configuradas diferem das gravadas em ``gold.dim_estrategias``.
+
+        :return: True se ``gold.dim_estrategias`` precisa ser regravada.
+        """
+        df = self.db_connection.sql("""
+            SELECT nome, regras, mascara
+            FROM gold.dim_estrategias
+            ORDER BY id
+        """, cache=False)
+        gravadas = [
+            (nome, list(regras), int(mascara))
+            for nome, regras, mascara in zip(df['nome'], df['regras'], df['mascara'])
+        ]
+        return gravadas != [(nome, list(regras), self.mascara(regras)) for nome, regras in self.estrategias.items()]
+
+
+    def _mascara_oportunidades_alterada(self, mascara: int) -> bool:
+        """
+        Verifica se ``gold.fact_oportunidades`` foi gerada com outra estratégia ou máscara.
+
+        :param mascara: Máscara atual da estratégia de ``screener.oportunidades``.
+        :return: True se ``gold.fact_oportunidades`` precisa ser regerada.
+        """
+        df = self.db_connection.sql("""
+            SELECT estrategia, mascara
+            FROM gold.controle_oportunidades
+        """, cache=False)
+        gravada = [(estrategia, int(valor)) for estrategia, valor in zip(df['estrategia'], df['mascara'])]
+        return gravada != [(self.estrategia_oportunidades, mascara)]
+
+
+    def mascara(self, regras: list) -> int:
+        """
+        Retorna a máscara de bits de um conjunto de regras.
+
+        :param regras: Nomes das regras.
+        :raises KeyError: Se uma regra não estiver configurada.
+        """
+        bits = {nome: bit for bit, nome in enumerate(self.regras)}
+        mascara = 0
+        for regra in regras:
+            mascara |= 1 << bits[regra]
+        return mascara
+
+
+    def _gravar_estrategias(self) -> None:
+        """Regrava ``gold.dim_estrategias`` com as estratégias configuradas."""
+        self.db_connection.execute("DELETE FROM gold.dim_estrategias")
+        if not self.estrategias:
+            return
+        valores = ', '.join(
+            f"({id}, {self._literal(nome)}, [{', '.join(map(self._literal, regras))}]::VARCHAR[], "
+            f"{self.mascara(regras)}::UBIGINT)"
+            for id, (nome, regras) in enumerate(self.estrategias.items(), start=1)
+        )
+        self.db_connection.execute(f"INSERT INTO gold.dim_estrategias VALUES {valores}")
+
+
+    def transform(self) -> None:
+        """
+        Avalia as regras do screener e atualiza ``gold.fact_oportunidades``.
+
+        Todas as regras são avaliadas em uma única passada sobre as datas novas de
+        ``delta_indicadores`` e gravadas como um bitmap por indicador; se as regras
+        mudaram, todas as datas de ``gold.fact_indicadores`` são reavaliadas.
+        ``gold.fact_oportunidades`` é derivada dos bitmaps com a máscara da estratégia
+        configurada em ``screener.oportunidades``; se a estratégia ou suas regras mudaram,
+        é regerada a partir dos bitmaps gravados, sem reavaliar as regras.
+
+        Deve ser executado após ``GoldTransformer.transform``, que cria a tabela
+        temporária ``delta_indicadores``.
+        """
+        reavaliar = self.full_refresh or self._regras_alteradas()
+        if reavaliar:
+            print("Reavaliando as regras do screener em todas as datas.")
+            self.db_connection.execute("DELETE FROM gold.dim_regras")
+            if self.regras:
+                valores = ', '.join(
+                    f"({bit + 1}, {self._literal(nome)}, {self._literal(expressao)}, {bit})"
+                    for bit, (nome, expressao) in enumerate(self.regras.items())
+                )
+                self.db_connection.execute(f"INSERT INTO gold.dim_regras VALUES {valores}")
+
+        if reavaliar or self._estrategias_alteradas():
+            self._gravar_estrategias()
+
+        mascara = self.mascara(self.estrategias[self.estrategia_oportunidades])
+        regerar = reavaliar or self._mascara_oportunidades_alterada(mascara)
+        if regerar and not reavaliar:
+            print(f"Regerando as oportunidades com a estratégia '{self.estrategia_oportunidades}'.")
+
+        origem = 'gold.fact_indicadores' if reavaliar else 'delta_indicadores'
+        origem_oportunidades = 'gold.fact_indicadores' if regerar else 'delta_indicadores'
+        flags = ' | '.join(
+            f"IF(COALESCE({expressao}, false), {1 << bit}::UBIGINT, 0::UBIGINT)"
+            for bit, expressao in enumerate(self.regras.values())
+        ) or '0::UBIGINT'
+
+        if reavaliar:
+            self.db_connection.execute("DELETE FROM gold.fact_regras_indicadores")
+        else:
+            self.db_connection.execute(f"""
+                DELETE FROM gold.fact_regras_indicadores
+                WHERE tempo_id IN (SELECT DISTINCT tempo_id FROM delta_indicadores)
+            """)
+        if regerar:
+            self.db_connection.execute("DELETE FROM gold.fact_oportunidades")
+        else:
+            self.db_connection.execute(f"""
+                DELETE FROM gold.fact_oportunidades
+                WHERE tempo_id IN (SELECT DISTINCT tempo_id FROM delta_indicadores)
+            """)
+
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_regras_indicadores
+            SELECT
+                id AS indicador_id,
+                tempo_id,
+                acao_id,
+                {flags} AS flags
+            FROM {origem}
+            ORDER BY tempo_id, acao_id
+        """)
+
+        # Mantém apenas a primeira ocorrência de cada combinação de ação e indicadores.
+        self.db_connection.execute(f"""
+            INSERT INTO gold.fact_oportunidades
+            SELECT
+                new.id,
+                new.tempo_id,
+                new.acao_id,
+                new.cotacao,
+                new.p_vp,
+                new.dividend_yield,
+                new.ev_ebit,
+                new.roic,
+                new.p_l
+            FROM {origem_oportunidades} AS new
+            JOIN gold.fact_regras_indicadores AS regras
+                ON new.id = regras.indicador_id
+            LEFT JOIN gold.fact_oportunidades AS old
+                ON new.acao_id IS NOT DISTINCT FROM old.acao_id
+                AND new.cotacao IS NOT DISTINCT FROM old.cotacao
+                AND new.p_vp IS NOT DISTINCT FROM old.p_vp
+                AND new.dividend_yield IS NOT DISTINCT FROM old.dividend_yield
+                AND new.ev_ebit IS NOT DISTINCT FROM old.ev_ebit
+                AND new.roic IS NOT DISTINCT FROM old.roic
+                AND new.p_l IS NOT DISTINCT FROM old.p_l
+            WHERE
+                old.id IS NULL
+                AND regras.flags & {mascara}::UBIGINT = {mascara}::UBIGINT
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY new.acao_id, new.cotacao, new.p_vp, new.dividend_yield, new.ev_ebit, new.roic, new.p_l
+                ORDER BY new.tempo_id, new.id
+            ) = 1
+        """)
+
+        if regerar:
+            self.db_connection.execute("DELETE FROM gold.controle_oportunidades")
+            self.db_connection.execute(f"""
+                INSERT INTO gold.controle_oportunidades
+                VALUES ({self._literal(self.estrategia_oportunidades)}, {mascara}::UBIGINT)
+            """)
+
+        print("Screener avaliado na camada Gold.")
+
+
+    def screen(self, regras: list = None, estrategia: str = None, tempo_id: int = None) -> pd.DataFrame:
+        """
+        Retorna os indicadores que atendem a todas as regras informadas.
+
+        Usa os bitmaps gravados, sem reavaliar as expressões, de modo que qualquer
+        combinação de regras pode ser consultada sobre todo o histórico.
+
+        :param regras: Nomes das regras. Alternativa a ``estrategia``.
+        :param estrategia: Nome de uma estratégia configurada.
+        :param tempo_id: Filtra uma data. Opcional.
+        :return: Um DataFrame com o ticker e as linhas de ``gold.fact_indicadores`` selecionadas.
+        """
+        mascara = self.mascara(regras if regras is not None else self.estrategias[estrategia])
+        filtro_tempo = f"AND regras.tempo_id = {int(tempo_id)}" if tempo_id is not None else ''
+        return self.db_connection.sql(f"""
+            SELECT
+                acoes.ticker,
+                fi.*
+            FROM gold.fact_regras_indicadores AS regras
+            JOIN gold.fact_indicadores AS fi
+                ON regras.indicador_id = fi.id
+            LEFT JOIN gold.dim_acoes AS acoes
+                ON fi.acao_id = acoes.id
+            WHERE regras.flags & {mascara}::UBIGINT = {mascara}::UBIGINT
+            {filtro_tempo}
+            ORDER BY fi.tempo_id, acoes.ticker
+        """)
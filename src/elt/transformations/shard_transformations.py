@@ -0,0 +1,441 @@
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from src.elt.transformations.gold_transformations import GoldTransformer
+from src.elt.transformations.portfolio_transformations import PortfolioTransformer
+from src.utils.db_utils import DuckDBConnection
+
+
+def _build_shard(config: dict, settings: dict, shard: int, mercado_path: str, db_file: str,
+                 full_refresh: bool = False) -> dict:
+    """
+    Atualiza as negociações, posições e carteiras de um shard de usuários.
+
+    Executado em um processo próprio, com um banco próprio: as tabelas de mercado e o
+    ``delta_indicadores`` do banco principal são lidos, somente leitura, das exportações
+    Parquet em ``mercado_path``, e as tabelas do shard são atualizadas de forma
+    incremental pelas mesmas transformações do banco principal.
+
+    As linhas alteradas são acumuladas nas tabelas ``gold.alteracoes_*`` do shard até
+    serem mescladas no banco principal por ``ShardTransformer``.
+
+    :param config: Dicionário de configuração do projeto.
+    :param settings: Opções do DuckDB do processo (threads e memória do shard).
+    :param shard: Número do shard.
+    :param mercado_path: Diretório das exportações compartilhadas pelos shards.
+    :param db_file: Banco do shard.
+    :param full_refresh: Se True, recria as tabelas do shard.
+    :return: O número do shard, as negociações alteradas e o tempo gasto.
+    """
+    start = time.perf_counter()
+    db_connection = DuckDBConnection(db_file, settings=settings)
+    try:
+        db_connection.execute("""
+            CREATE SCHEMA IF NOT EXISTS silver;
+            CREATE SCHEMA IF NOT EXISTS gold;
+        """)
+        gold_transformer = GoldTransformer(db_connection, config, full_refresh=full_refresh)
+        gold_transformer.create_macros()
+
+        for tabela in ShardTransformer.MERCADO:
+            db_connection.execute(f"""
+                CREATE OR REPLACE VIEW gold.{tabela} AS
+                SELECT *
+                FROM read_parquet('{mercado_path}/{tabela}.parquet')
+            """, step=f"SHARD {shard} {tabela}")
+
+        # Um arquivo por mês, regravado apenas quando o mês tem snapshots novos.
+        db_connection.execute(f"""
+            CREATE OR REPLACE VIEW gold.fact_indicadores AS
+            SELECT *
+            FROM read_parquet('{mercado_path}/fact_indicadores/*.parquet')
+        """, step=f"SHARD {shard} fact_indicadores")
+
+        db_connection.execute(f"""
+            CREATE OR REPLACE VIEW silver.negociacoes AS
+            SELECT * EXCLUDE (shard)
+            FROM read_parquet('{mercado_path}/negociacoes.parquet')
+            WHERE shard = {shard}
+        """, step=f"SHARD {shard} negociacoes")
+
+        db_connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE delta_indicadores AS
+            SELECT *
+            FROM read_parquet('{mercado_path}/delta_indicadores.parquet')
+        """, step=f"SHARD {shard} delta_indicadores")
+
+        portfolio_transformer = PortfolioTransformer(db_connection, config, full_refresh=full_refresh)
+        gold_transformer.create_fact_negociacoes()
+        portfolio_transformer.create_tables()
+
+        db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS gold.alteracoes_negociacoes (id INTEGER);
+            CREATE TABLE IF NOT EXISTS gold.alteracoes_posicoes (usuario_id INTEGER, acao_id INTEGER, tempo_id INTEGER);
+            CREATE TABLE IF NOT EXISTS gold.alteracoes_carteira (usuario_id INTEGER, tempo_id INTEGER);
+        """)
+
+        # Negociações removidas do silver, antes que transform_negociacoes as apague.
+        db_connection.execute("""
+            CREATE OR REPLACE TEMP TABLE negociacoes_removidas AS
+            SELECT id
+            FROM gold.fact_negociacoes
+            WHERE id NOT IN (SELECT id FROM silver.negociacoes)
+        """)
+
+        gold_transformer.transform_negociacoes()
+        portfolio_transformer.transform()
+
+        db_connection.execute("""
+            INSERT INTO gold.alteracoes_negociacoes
+            SELECT id FROM negociacoes_removidas
+            UNION
+            SELECT id FROM delta_negociacoes
+        """)
+        db_connection.execute("""
+            INSERT INTO gold.alteracoes_posicoes
+            SELECT usuario_id, acao_id, tempo_id
+            FROM posicoes_alteradas
+        """)
+        db_connection.execute("""
+            INSERT INTO gold.alteracoes_carteira
+            SELECT usuario_id, tempo_id
+            FROM carteiras_alteradas
+        """)
+
+        negociacoes = db_connection.sql("""
+            SELECT COUNT(*) AS n
+            FROM delta_negociacoes
+        """, cache=False)
+    finally:
+        db_connection.close()
+    return {
+        'shard': shard,
+        'negociacoes': int(negociacoes['n'].iloc[0]),
+        'segundos': round(time.perf_counter() - start, 3),
+    }
+
+
+class ShardTransformer:
+    # Tabelas do banco principal lidas pelos shards e exportadas inteiras (são pequenas).
+    MERCADO = ['registro_chaves', 'dim_tempo']
+
+    # Tabelas gold calculadas nos shards e mescladas no banco principal, com as colunas
+    # que identificam as linhas alteradas: linhas com as mesmas colunas e tempo_id maior
+    # ou igual ao registrado em gold.alteracoes_<nome> são substituídas.
+    TABELAS = {
+        'fact_posicoes': ('posicoes', ['usuario_id', 'acao_id']),
+        'fact_carteira_diaria': ('carteira', ['usuario_id']),
+    }
+
+    def __init__(self, db_connection: 'DuckDBConnection', config: dict, full_refresh: bool = False) -> None:
+        """
+        Inicializa o processamento das tabelas por usuário em shards.
+
+        As negociações são divididas pelo hash do ``usuario_id`` em N shards, cada um
+        calculado em um processo e em um banco próprios (``<banco>.shards/shard_<n>.db``),
+        para que o cálculo das negociações, posições e carteiras escale com o número de
+        núcleos. As opções ficam na seção ``sharding`` do settings.yaml.
+
+        :param db_connection: Conexão com o banco de dados DuckDB.
+        :param config: Dicionário de configuração contendo caminhos e outras informações.
+        :param full_refresh: Se True, recria os bancos dos shards.
+        :raises ValueError: Se o número de shards ou de processos não for um inteiro positivo.
+        """
+        self.db_connection = db_connection
+        self.config = config
+        self.full_refresh = full_refresh
+        self.sharding_config = config.get('sharding', {})
+        self.enabled = self.sharding_config.get('enabled', False)
+        self.shards = self.sharding_config.get('shards', 4)
+        self.max_workers = self.sharding_config.get('max_workers') or self.shards
+        self.shards_path = Path(config['paths']['db']).with_suffix('.shards')
+        self.mercado_path = self.shards_path / 'mercado'
+        self.reconstruir_path = self.shards_path / '.reconstruir'
+
+        for option, value in [('shards', self.shards), ('max_workers', self.max_workers)]:
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(f"sharding.{option} deve ser um inteiro positivo: {value}.")
+
+
+    def _db_file(self, shard: int) -> Path:
+        """Retorna o banco de um shard."""
+        return self.shards_path / f'shard_{shard}.db'
+
+
+    def _settings(self, shard: int) -> dict:
+        """
+        Retorna as opções do DuckDB do processo de um shard.
+
+        As threads da seção ``duckdb`` são divididas entre os processos simultâneos, e
+        cada shard faz spill em um subdiretório próprio de ``temp_directory``.
+        """
+        settings = dict(self.config.get('duckdb') or {})
+        threads = settings.get('threads') or os.cpu_count() or 1
+        settings['threads'] = max(1, threads // self.max_workers)
+        if self.sharding_config.get('memory_limit'):
+            settings['memory_limit'] = self.sharding_config['memory_limit']
+        if settings.get('temp_directory'):
+            settings['temp_directory'] = str(Path(settings['temp_directory']) / f'shard_{shard}')
+        return settings
+
+
+    def _prepare(self) -> bool:
+        """
+        Prepara o diretório dos shards e decide se as tabelas por usuário serão reconstruídas.
+
+        Com full refresh os bancos dos shards são recriados. Se algum shard ainda não
+        existe ou o número de shards mudou, os usuários mudam de shard e as tabelas do
+        banco principal são reconstruídas a partir da união dos shards. A decisão é
+        gravada em ``.reconstruir`` até que a reconstrução termine, para que uma falha
+        no meio dela não deixe o banco principal com uma mescla parcial.
+
+        :return: True se as tabelas do banco principal devem ser reconstruídas.
+        """
+        if self.full_refresh and self.shards_path.exists():
+            shutil.rmtree(self.shards_path)
+        self.shards_path.mkdir(parents=True, exist_ok=True)
+
+        existentes = {int(db_file.stem.split('_')[1]): db_file for db_file in self.shards_path.glob('shard_*.db')}
+        if set(existentes) != set(range(self.shards)):
+            self.reconstruir_path.touch()
+        for shard, db_file in existentes.items():
+            if shard >= self.shards:
+                db_file.unlink()
+                Path(f'{db_file}.wal').unlink(missing_ok=True)
+        return self.reconstruir_path.exists()
+
+
+    def _export_mercado(self) -> None:
+        """
+        Exporta para os shards as tabelas de mercado, o delta de indicadores e as negociações.
+
+        Os processos dos shards não podem abrir o banco principal, que fica bloqueado
+        para escrita pelo pipeline. ``fact_indicadores`` é mantida entre as execuções em
+        um arquivo por mês, e só os meses com snapshots em ``delta_indicadores`` são
+        regravados. As negociações, recarregadas inteiras no silver a cada execução, são
+        exportadas ordenadas pelo shard, para que cada processo leia apenas os row
+        groups do seu shard.
+        """
+        self.mercado_path.mkdir(parents=True, exist_ok=True)
+        for tabela in self.MERCADO:
+            self.db_connection.execute(f"""
+                COPY gold.{tabela} TO '{self.mercado_path}/{tabela}.parquet' (FORMAT PARQUET)
+            """, step=f"SHARDS {tabela}")
+
+        self.db_connection.execute(f"""
+            COPY delta_indicadores TO '{self.mercado_path}/delta_indicadores.parquet' (FORMAT PARQUET)
+        """, step="SHARDS delta_indicadores")
+
+        indicadores_path = self.mercado_path / 'fact_indicadores'
+        origem = 'delta_indicadores'
+        if not indicadores_path.exists():
+            indicadores_path.mkdir()
+            origem = 'gold.fact_indicadores'
+        # O esquema vazio garante a leitura mesmo sem nenhum snapshot.
+        self.db_connection.execute(f"""
+            COPY (SELECT * FROM gold.fact_indicadores LIMIT 0)
+            TO '{indicadores_path}/_esquema.parquet' (FORMAT PARQUET)
+        """)
+        meses = self.db_connection.sql(f"""
+            SELECT DISTINCT tempo_id // 100 AS mes
+            FROM {origem}
+            WHERE tempo_id IS NOT NULL
+        """, cache=False)['mes']
+        for mes in meses:
+            self.db_connection.execute(f"""
+                COPY (
+                    SELECT *
+                    FROM gold.fact_indicadores
+                    WHERE tempo_id // 100 = {mes}
+                    ORDER BY acao_id, tempo_id
+                ) TO '{indicadores_path}/{mes}.parquet' (FORMAT PARQUET)
+            """, step=f"SHARDS fact_indicadores {mes}")
+
+        self.db_connection.execute(f"""
+            COPY (
+                SELECT
+                    *,
+                    HASH(usuario_id::VARCHAR) % {self.shards} AS shard
+                FROM silver.negociacoes
+                ORDER BY shard, id
+            ) TO '{self.mercado_path}/negociacoes.parquet' (FORMAT PARQUET)
+        """, step="SHARDS negociacoes")
+
+
+    def _merge(self, reconstruir: bool) -> None:
+        """
+        Mescla no banco principal as linhas alteradas nos shards.
+
+        Os bancos dos shards são anexados depois que os processos terminam. Em uma
+        execução incremental, apenas as negociações e os intervalos de posições e
+        carteiras registrados nas tabelas ``gold.alteracoes_*`` de cada shard são
+        substituídos; ao reconstruir, as tabelas inteiras são substituídas pela união
+        dos shards. A mescla é feita em uma única transação, e as alterações dos shards
+        só são descartadas depois dela: se a mescla falhar, é repetida na próxima execução.
+        As tabelas do banco principal são as lidas pela carga, pelo screener e pelo
+        serviço de consultas, que não precisam conhecer os shards.
+        """
+        shards = [f'shard_{shard}' for shard in range(self.shards)]
+        for shard, alias in enumerate(shards):
+            self.db_connection.execute(f"""
+                ATTACH '{self._db_file(shard)}' AS {alias}
+            """)
+        try:
+            self.db_connection.execute("BEGIN TRANSACTION")
+            try:
+                self._merge_negociacoes(shards, reconstruir)
+                for tabela, (alteracoes, chaves) in self.TABELAS.items():
+                    self._merge_tabela(shards, tabela, alteracoes, chaves, reconstruir)
+                self.db_connection.execute("COMMIT")
+            except Exception:
+                self.db_connection.execute("ROLLBACK")
+                raise
+            self.reconstruir_path.unlink(missing_ok=True)
+
+            for alias in shards:
+                for alteracoes in ['negociacoes', 'posicoes', 'carteira']:
+                    self.db_connection.execute(f"""
+                        DELETE FROM {alias}.gold.alteracoes_{alteracoes}
+                    """)
+        finally:
+            for alias in shards:
+                self.db_connection.execute(f"""
+                    DETACH {alias}
+                """)
+
+
+    def _merge_negociacoes(self, shards: list, reconstruir: bool) -> None:
+        """
+        Mescla ``gold.fact_negociacoes``.
+
+        As negociações alteradas são gravadas com ``INSERT OR REPLACE``: o índice da
+        chave primária do DuckDB acusa chaves duplicadas ao reinserir, na mesma
+        transação, uma chave removida.
+        """
+        if reconstruir:
+            alteradas = ' UNION ALL '.join(f'SELECT * FROM {alias}.gold.fact_negociacoes' for alias in shards)
+            removidas = f"""
+                DELETE FROM gold.fact_negociacoes
+                WHERE id NOT IN (SELECT id FROM ({alteradas}))
+            """
+        else:
+            alteradas = ' UNION ALL '.join(
+                f"""
+                SELECT *
+                FROM {alias}.gold.fact_negociacoes
+                WHERE id IN (SELECT id FROM {alias}.gold.alteracoes_negociacoes)
+                """
+                for alias in shards
+            )
+            removidas = f"""
+                DELETE FROM gold.fact_negociacoes
+                WHERE id IN ({' UNION ALL '.join(f'SELECT id FROM {alias}.gold.alteracoes_negociacoes' for alias in shards)})
+                AND id NOT IN ({' UNION ALL '.join(f'SELECT id FROM {alias}.gold.fact_negociacoes' for alias in shards)})
+            """
+        self.db_connection.execute(removidas, step="SHARDS fact_negociacoes")
+        self.db_connection.execute(f"""
+            INSERT OR REPLACE INTO gold.fact_negociacoes BY NAME
+            {alteradas}
+        """, step="SHARDS fact_negociacoes")
+
+
+    def _merge_tabela(self, shards: list, tabela: str, alteracoes: str, chaves: list, reconstruir: bool) -> None:
+        """
+        Mescla uma tabela sem chave primária (posições ou carteira diária).
+
+        :param shards: Aliases dos bancos dos shards anexados.
+        :param tabela: Tabela gold.
+        :param alteracoes: Sufixo da tabela ``gold.alteracoes_<sufixo>`` dos shards.
+        :param chaves: Colunas que, com ``tempo_id``, identificam as linhas alteradas.
+        :param reconstruir: Se True, substitui a tabela inteira.
+        """
+        if reconstruir:
+            self.db_connection.execute(f"""
+                DELETE FROM gold.{tabela}
+            """, step=f"SHARDS {tabela}")
+            uniao = ' UNION ALL '.join(f'SELECT * FROM {alias}.gold.{tabela}' for alias in shards)
+            self.db_connection.execute(f"""
+                INSERT INTO gold.{tabela} BY NAME
+                {uniao}
+            """, step=f"SHARDS {tabela}")
+            return
+
+        igualdade = ' AND '.join(f't.{chave} IS NOT DISTINCT FROM a.{chave}' for chave in chaves)
+        alteradas = ' UNION ALL '.join(
+            f"SELECT {', '.join(chaves)}, MIN(tempo_id) AS tempo_id FROM {alias}.gold.alteracoes_{alteracoes} GROUP BY ALL"
+            for alias in shards
+        )
+        self.db_connection.execute(f"""
+            DELETE FROM gold.{tabela} AS t
+            USING ({alteradas}) AS a
+            WHERE {igualdade}
+            AND t.tempo_id >= a.tempo_id
+        """, step=f"SHARDS {tabela}")
+        uniao = ' UNION ALL '.join(
+            f"""
+            SELECT t.*
+            FROM {alias}.gold.{tabela} AS t
+            JOIN (
+                SELECT {', '.join(chaves)}, MIN(tempo_id) AS tempo_id
+                FROM {alias}.gold.alteracoes_{alteracoes}
+                GROUP BY ALL
+            ) AS a
+                ON {igualdade}
+                AND t.tempo_id >= a.tempo_id
+            """
+            for alias in shards
+        )
+        self.db_connection.execute(f"""
+            INSERT INTO gold.{tabela} BY NAME
+            {uniao}
+        """, step=f"SHARDS {tabela}")
+
+
+    def transform(self) -> None:
+        """
+        Atualiza as negociações, posições e carteiras de todos os shards em paralelo.
+
+        Deve ser executado após ``GoldTransformer.transform_indicadores``, que cria a
+        tabela temporária ``delta_indicadores``, e antes de ``update_watermarks``. Se um
+        shard falhar, a etapa é repetida inteira na execução seguinte; os shards já
+        atualizados recalculam o mesmo delta, sem alterar o resultado.
+
+        Ao alterar ``sharding.shards``, os usuários mudam de shard: os bancos de shards
+        além de ``sharding.shards`` são removidos e as tabelas por usuário do banco
+        principal são reconstruídas a partir dos shards.
+        """
+        reconstruir = self._prepare()
+        self._export_mercado()
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context) as executor:
+            futures = [
+                executor.submit(
+                    _build_shard, self.config, self._settings(shard), shard, str(self.mercado_path),
+                    str(self._db_file(shard)), self.full_refresh,
+                )
+                for shard in range(self.shards)
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                print(f"Shard {result['shard']}: {result['negociacoes']} negociações alteradas em {result['segundos']:.2f}s.")
+
+        self._merge(reconstruir)
+        print(f"Negociações, posições e carteira diária atualizadas em {self.shards} shards na camada Gold.")
+
+
+    def discard(self) -> None:
+        """
+        Remove os bancos dos shards quando o processamento em shards está desabilitado.
+
+        As tabelas do banco principal passam a ser atualizadas diretamente; bancos de
+        shards mantidos ficariam sem os deltas dessas execuções se o processamento em
+        shards fosse habilitado de novo.
+        """
+        if self.shards_path.exists():
+            shutil.rmtree(self.shards_path)
+            print(f"Shards de usuários removidos de {self.shards_path} (sharding.enabled desabilitado).")
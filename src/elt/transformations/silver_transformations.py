@@ -1,5 +1,6 @@
+import pandas as pd
 from pathlib import Path
-from datetime import datetime
+from datetime import date
 from src.utils.db_utils import DuckDBConnection
 
 
@@ -10,40 +11,19 @@ class SilverTransformer:
 
 
     def create_tables(self) -> None:
-        """Cria as tabelas necessárias no esquema Silver."""
-        self.db_connection.execute("""
-            CREATE SCHEMA IF NOT EXISTS silver;
-        """)
-
-        self.db_connection.execute("""
-            CREATE TABLE IF NOT EXISTS silver.tempo AS
-            SELECT
-                row_number() OVER () AS id,
-                generate_series AS data
-            FROM generate_series(DATE '2010-01-01', CURRENT_DATE(), INTERVAL 1 DAY)
-        """)
+        """
+        Cria as tabelas incrementais no esquema Silver.
 
+        ``silver.usuarios`` e ``silver.negociacoes`` são recriadas a cada carga, em
+        ``load_usuarios`` e ``load_negociacoes``.
+        """
         self.db_connection.execute("""
-            CREATE OR REPLACE TABLE silver.negociacoes (
-                id INTEGER PRIMARY KEY,
-                usuario_id INTEGER,
-                tipo_ativo VARCHAR,
-                ticker VARCHAR,
-                data_movimentacao DATE,
-                quantidade INTEGER,
-                tipo_acao VARCHAR,
-                tipo_negociacao VARCHAR,
-                extracted_date DATE
-            );
+            CREATE SCHEMA IF NOT EXISTS silver;
         """)
 
+        # As datas passaram a ser chaveadas por YYYYMMDD em gold.dim_tempo.
         self.db_connection.execute("""
-            CREATE OR REPLACE TABLE silver.usuarios (
-                id INTEGER PRIMARY KEY,
-                nome VARCHAR,
-                email VARCHAR UNIQUE,
-                extracted_date DATE               
-            );
+            DROP TABLE IF EXISTS silver.tempo
         """)
 
         self.db_connection.execute("""
@@ -90,26 +70,121 @@ class SilverTransformer:
             );
         """)
 
+        # Maior id já atribuído por tabela incremental, que não diminui quando um
+        # backfill remove as datas mais recentes.
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS silver.controle_ids (
+                tabela VARCHAR PRIMARY KEY,
+                ultimo_id INTEGER
+            );
+        """)
+
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS silver.precos (
+                id INTEGER PRIMARY KEY,
+                ticker VARCHAR,
+                data DATE,
+                open FLOAT,
+                high FLOAT,
+                low FLOAT,
+                close FLOAT,
+                adj_close FLOAT,
+                volume BIGINT,
+                extracted_date DATE
+            );
+        """)
+
+
+    @staticmethod
+    def _max_id(table: str) -> str:
+        """
+        Retorna a consulta do maior id já atribuído em uma tabela silver incremental.
+
+        Os ids novos partem dele, de modo que são sempre maiores que as marcas d'água da
+        camada gold, inclusive depois de um backfill das datas mais recentes.
+
+        :param table: Tabela silver.
+        """
+        return f"""
+            SELECT GREATEST(
+                (SELECT COALESCE(MAX(id), 0) FROM {table}),
+                (SELECT COALESCE(MAX(ultimo_id), 0) FROM silver.controle_ids WHERE tabela = '{table}')
+            ) AS max_id
+        """
+
+
+    def _partitions_to_load(self, source: str, table: str, inicio: date = None, fim: date = None) -> str:
+        """
+        Seleciona as partições ``extracted_date=YYYY-MM-DD`` do bronze a serem carregadas.
+
+        Sem intervalo, retorna as partições ainda não carregadas na tabela silver. Com
+        ``inicio`` e ``fim``, retorna todas as partições do intervalo e remove da tabela
+        silver as datas que serão recarregadas, guardando antes o maior id da tabela em
+        ``silver.controle_ids`` para que as linhas recarregadas recebam ids novos.
+
+        :param source: Nome da fonte no bronze (ex.: ``brapi``).
+        :param table: Tabela silver de destino.
+        :param inicio: Primeira data do intervalo de backfill.
+        :param fim: Última data do intervalo de backfill.
+        :return: A lista de arquivos no formato de lista SQL, ou uma string vazia se não há o que carregar.
+        """
+        partitions = {}
+        for partition in sorted((Path(self.config['paths']['bronze']) / source).glob('extracted_date=*')):
+            partition_date = date.fromisoformat(partition.name.split('=', 1)[1])
+            partitions[partition_date] = sorted(partition.glob('*.parquet'))
+
+        if inicio or fim:
+            dates = [d for d in partitions if (not inicio or d >= inicio) and (not fim or d <= fim)]
+            if dates:
+                self.db_connection.execute(f"""
+                    INSERT OR REPLACE INTO silver.controle_ids
+                    SELECT '{table}' AS tabela, max_id
+                    FROM ({self._max_id(table)})
+                """)
+                dates_sql = ', '.join(f"DATE '{d}'" for d in dates)
+                self.db_connection.execute(f"DELETE FROM {table} WHERE extracted_date IN ({dates_sql})")
+        else:
+            loaded = self.db_connection.sql(f"SELECT DISTINCT extracted_date FROM {table}")['extracted_date']
+            loaded = {pd.Timestamp(d).date() for d in loaded}
+            dates = [d for d in partitions if d not in loaded]
+
+        files = [str(file) for d in dates for file in partitions[d]]
+        if not files:
+            print(f"Nenhuma partição nova de {source} para carregar.")
+            return ''
+        print(f"Carregando {len(dates)} partição(ões) de {source}: {dates[0]} a {dates[-1]}.")
+        return '[' + ', '.join(f"'{file}'" for file in files) + ']'
+
+
+    def transform(self, inicio: date = None, fim: date = None) -> None:
+        """
+        Carrega os dados do bronze nas tabelas silver.
 
-    def transform(self) -> None:
+        As partições diárias da brapi, do Fundamentus e dos preços históricos ainda não
+        carregadas são lidas em uma única passada por fonte.
+
+        :param inicio: Primeira data a recarregar (backfill). Opcional.
+        :param fim: Última data a recarregar (backfill). Opcional.
+        """
+        self.load_usuarios()
+        self.load_negociacoes()
+        self.load_brapi(inicio=inicio, fim=fim)
+        self.load_fundamentus(inicio=inicio, fim=fim)
+        self.load_precos(inicio=inicio, fim=fim)
+        print("Dados transformados na camada Silver.")
+
+
+    def load_usuarios(self) -> None:
+        """Recria ``silver.usuarios`` a partir da planilha extraída para o bronze."""
         bronze_path = Path(self.config['paths']['bronze'])
 
-        self.db_connection.execute(f"""
-            INSERT INTO silver.tempo
-            WITH max_id AS (
-                SELECT 
-                    MAX(id) AS max_id
-                FROM silver.tempo
-            ),
-            max_date AS (
-                SELECT
-                    MAX(data) AS max_date
-                FROM silver.tempo
-            )
-            SELECT
-                row_number() OVER () + (SELECT * FROM max_id) AS id,
-                CURRENT_DATE() AS data
-            WHERE CURRENT_DATE() > (SELECT * FROM max_date)
+        self.db_connection.execute("""
+            CREATE OR REPLACE TABLE silver.usuarios (
+                id INTEGER PRIMARY KEY,
+                nome VARCHAR,
+                email VARCHAR UNIQUE,
+                extracted_date DATE               
+            );
         """)
 
         self.db_connection.execute(f"""
@@ -122,10 +197,35 @@ class SilverTransformer:
             FROM read_parquet('{bronze_path}/sheets/usuarios/usuarios.parquet')
         """)
 
+
+    def load_negociacoes(self) -> None:
+        """Recria ``silver.negociacoes`` a partir das negociações extraídas para o bronze."""
+        bronze_path = Path(self.config['paths']['bronze'])
+
+        self.db_connection.execute("""
+            CREATE OR REPLACE TABLE silver.negociacoes (
+                id INTEGER PRIMARY KEY,
+                usuario_id INTEGER,
+                tipo_ativo VARCHAR,
+                ticker VARCHAR,
+                data_movimentacao DATE,
+                quantidade INTEGER,
+                tipo_acao VARCHAR,
+                tipo_negociacao VARCHAR,
+                extracted_date DATE
+            );
+        """)
+
+        # Os ids seguem uma ordem total (a chave natural e, para negociações idênticas, a
+        # posição no arquivo), de modo que os mesmos dados recebem sempre os mesmos ids.
         self.db_connection.execute(f"""
             INSERT INTO silver.negociacoes
             SELECT
-                row_number() OVER () AS id,
+                row_number() OVER (
+                    ORDER BY
+                        usuario_id, data_movimentacao, ticker, tipo_negociacao, quantidade,
+                        tipo_acao, tipo_ativo, filename, file_row_number
+                ) AS id,
                 usuario_id,
                 tipo_ativo,
                 ticker,
@@ -134,69 +234,104 @@ class SilverTransformer:
                 tipo_acao,
                 tipo_negociacao,
                 _extracted_date AS extracted_date
-            FROM read_parquet('{bronze_path}/sheets/negociacoes/*.parquet')
+            FROM read_parquet('{bronze_path}/sheets/negociacoes/*.parquet', filename = true, file_row_number = true)
+            ORDER BY id
         """)
 
-        self.db_connection.execute(f"""
-            INSERT INTO silver.brapi_quote_list
-            WITH max_id AS (
-                SELECT COALESCE(MAX(id), 0) AS max_id
-                FROM silver.brapi_quote_list
-            )
-            SELECT
-                row_number() OVER () + (SELECT max_id FROM max_id) AS id,
-                new.stock AS ticker,
-                new.name,
-                new.close,
-                new.change,
-                new.volume,
-                new.market_cap,
-                new.logo,
-                new.sector,
-                new.type,
-                new._extracted_date AS extracted_date
-            FROM read_parquet('{bronze_path}/brapi/{datetime.now().strftime("%Y-%m-%d")}.parquet') AS new
-            LEFT JOIN silver.brapi_quote_list AS old
-                ON new.stock = old.ticker
-                AND new._extracted_date = old.extracted_date
-            WHERE old.id IS NULL
-        """)
-        
-        self.db_connection.execute(f"""
-            INSERT INTO silver.fundamentus_resultado
-            WITH max_id AS (
-                SELECT COALESCE(MAX(id), 0) AS max_id
-                FROM silver.fundamentus_resultado
-            )
-            SELECT
-                row_number() OVER () + (SELECT max_id FROM max_id) AS id,
-                new.papel AS ticker,
-                new.cotação AS cotacao,
-                new.p_l,
-                new.p_vp,
-                new.psr,
-                CAST(REPLACE(REPLACE(REPLACE(new.divyield, '.', ''), ',', '.'), '%', '') AS FLOAT) / 100 AS dividend_yield,
-                new.p_ativo,
-                new.p_capgiro AS p_capital_giro,
-                new.p_ebit,
-                new.p_ativ_circliq AS p_ativo_circ_liq,
-                new.ev_ebit,
-                new.ev_ebitda,
-                CAST(REPLACE(REPLACE(REPLACE(new.mrg_ebit, '.', ''), ',', '.'), '%', '') AS FLOAT) / 100 AS mrg_ebit,
-                CAST(REPLACE(REPLACE(REPLACE(new.mrg_líq, '.', ''), ',', '.'), '%', '') AS FLOAT) / 100 AS mrg_liquida,
-                new.liq_corr AS liquidez_corr,
-                CAST(REPLACE(REPLACE(REPLACE(new.roic, '.', ''), ',', '.'), '%', '') AS FLOAT) / 100 AS roic,
-                CAST(REPLACE(REPLACE(REPLACE(new.roe, '.', ''), ',', '.'), '%', '') AS FLOAT) / 100 AS roe,
-                new.liq2meses AS liquidez_2_meses,
-                new.patrim_líq AS patrimonio_liquido,
-                new.dívbrut__patrim AS div_bruta_patrim,
-                CAST(REPLACE(REPLACE(REPLACE(new.cresc_rec5a, '.', ''), ',', '.'), '%', '') AS FLOAT) / 100 AS cres_rec_5a,
-                new._extracted_date AS extracted_date
-            FROM read_parquet('{bronze_path}/fundamentus/{datetime.now().strftime("%Y-%m-%d")}.parquet') AS new
-            LEFT JOIN silver.fundamentus_resultado AS old
-                ON new.papel = old.ticker
-                AND new._extracted_date = old.extracted_date
-            WHERE old.id IS NULL
-        """)
 
-        print("Dados transformados na camada Silver.")
+    def load_brapi(self, inicio: date = None, fim: date = None) -> None:
+        """
+        Carrega em ``silver.brapi_quote_list`` as partições da brapi ainda não carregadas.
+
+        :param inicio: Primeira data a recarregar (backfill). Opcional.
+        :param fim: Última data a recarregar (backfill). Opcional.
+        """
+        brapi_files = self._partitions_to_load('brapi', 'silver.brapi_quote_list', inicio, fim)
+        if brapi_files:
+            self.db_connection.execute(f"""
+                INSERT INTO silver.brapi_quote_list
+                WITH max_id AS ({self._max_id('silver.brapi_quote_list')})
+                SELECT
+                    row_number() OVER (ORDER BY new.extracted_date, new.stock) + (SELECT max_id FROM max_id) AS id,
+                    new.stock AS ticker,
+                    new.name,
+                    new.close,
+                    new.change,
+                    new.volume,
+                    new.market_cap,
+                    new.logo,
+                    new.sector,
+                    new.type,
+                    new.extracted_date
+                FROM read_parquet({brapi_files}, hive_partitioning = true, hive_types = {{'extracted_date': DATE}}) AS new
+                ORDER BY new.extracted_date, new.stock
+            """)
+
+
+    def load_fundamentus(self, inicio: date = None, fim: date = None) -> None:
+        """
+        Carrega em ``silver.fundamentus_resultado`` as partições do Fundamentus ainda não carregadas.
+
+        :param inicio: Primeira data a recarregar (backfill). Opcional.
+        :param fim: Última data a recarregar (backfill). Opcional.
+        """
+        fundamentus_files = self._partitions_to_load('fundamentus', 'silver.fundamentus_resultado', inicio, fim)
+        if fundamentus_files:
+            self.db_connection.execute(f"""
+                INSERT INTO silver.fundamentus_resultado
+                WITH max_id AS ({self._max_id('silver.fundamentus_resultado')})
+                SELECT
+                    row_number() OVER (ORDER BY new.extracted_date, new.ticker) + (SELECT max_id FROM max_id) AS id,
+                    new.ticker,
+                    new.cotacao,
+                    new.p_l,
+                    new.p_vp,
+                    new.psr,
+                    new.dividend_yield,
+                    new.p_ativo,
+                    new.p_capital_giro,
+                    new.p_ebit,
+                    new.p_ativo_circ_liq,
+                    new.ev_ebit,
+                    new.ev_ebitda,
+                    new.mrg_ebit,
+                    new.mrg_liquida,
+                    new.liquidez_corr,
+                    new.roic,
+                    new.roe,
+                    new.liquidez_2_meses,
+                    new.patrimonio_liquido,
+                    new.div_bruta_patrim,
+                    new.cres_rec_5a,
+                    new.extracted_date
+                FROM read_parquet({fundamentus_files}, hive_partitioning = true, hive_types = {{'extracted_date': DATE}}) AS new
+                ORDER BY new.extracted_date, new.ticker
+            """)
+
+
+    def load_precos(self, inicio: date = None, fim: date = None) -> None:
+        """
+        Carrega em ``silver.precos`` as partições de preços históricos ainda não carregadas.
+
+        :param inicio: Primeira data a recarregar (backfill). Opcional.
+        :param fim: Última data a recarregar (backfill). Opcional.
+        """
+        precos_files = self._partitions_to_load('precos', 'silver.precos', inicio, fim)
+        if precos_files:
+            self.db_connection.execute(f"""
+                INSERT INTO silver.precos
+                WITH max_id AS ({self._max_id('silver.precos')})
+                SELECT
+                    row_number() OVER (ORDER BY new.extracted_date, new.ticker, new.date) + (SELECT max_id FROM max_id) AS id,
+                    new.ticker,
+                    new.date AS data,
+                    new.open,
+                    new.high,
+                    new.low,
+                    new.close,
+                    new.adj_close,
+                    new.volume,
+                    new.extracted_date
+                FROM read_parquet({precos_files}, hive_partitioning = true, hive_types = {{'extracted_date': DATE}}) AS new
+                ORDER BY new.extracted_date, new.ticker, new.date
+            """)
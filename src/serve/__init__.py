@@ -0,0 +1,4 @@
+from .catalog import ENDPOINTS, Endpoint
+from .server import GoldRequestHandler, GoldService, serve
+
+__all__ = ['ENDPOINTS', 'Endpoint', 'GoldRequestHandler', 'GoldService', 'serve']
@@ -0,0 +1,170 @@
+from datetime import date
+
+
+class Endpoint:
+    # Conversores dos parâmetros recebidos na URL.
+    TYPES = {
+        'int': int,
+        'str': str,
+        'date': date.fromisoformat,
+    }
+
+    def __init__(self, name: str, description: str, sql: str, params: dict, order_by: str) -> None:
+        """
+        Inicializa um endpoint do catálogo.
+
+        :param name: Nome do endpoint, usado no caminho da URL (``/<name>``).
+        :param description: Descrição exibida na listagem do catálogo.
+        :param sql: Consulta sobre as views da camada gold, com os parâmetros como
+            ``{nome}``. Parâmetros opcionais não informados valem NULL.
+        :param params: Parâmetros aceitos: ``{nome: (tipo, obrigatorio)}``.
+        :param order_by: Ordenação das linhas, que mantém a paginação estável.
+        """
+        self.name = name
+        self.description = description
+        self.params = params
+        names = list(params)
+        placeholders = {param: f'${i}' for i, param in enumerate(names, start=1)}
+        self.sql = (
+            f"{sql.format(**placeholders)}\n"
+            f"ORDER BY {order_by}\n"
+            f"LIMIT ${len(names) + 1} OFFSET ${len(names) + 2}"
+        )
+
+
+    def parse(self, query: dict) -> list:
+        """
+        Valida e converte os parâmetros da URL.
+
+        :param query: Parâmetros da URL (``{nome: valor}``).
+        :return: Os valores dos parâmetros, na ordem da consulta.
+        :raises ValueError: Se faltar um parâmetro obrigatório, houver um parâmetro
+            desconhecido ou um valor inválido.
+        """
+        desconhecidos = set(query) - set(self.params)
+        if desconhecidos:
+            raise ValueError(f"Parâmetros desconhecidos em /{self.name}: {sorted(desconhecidos)}.")
+        values = []
+        for name, (type_name, required) in self.params.items():
+            if query.get(name) in (None, ''):
+                if required:
+                    raise ValueError(f"Parâmetro obrigatório em /{self.name}: {name}.")
+                values.append(None)
+                continue
+            try:
+                values.append(self.TYPES[type_name](query[name]))
+            except ValueError:
+                raise ValueError(f"Valor inválido para {name} ({type_name}): {query[name]!r}.") from None
+        return values
+
+
+    def describe(self) -> dict:
+        """Retorna a descrição do endpoint para a listagem do catálogo."""
+        return {
+            'endpoint': f'/{self.name}',
+            'descricao': self.description,
+            'parametros': {
+                name: {'tipo': type_name, 'obrigatorio': required}
+                for name, (type_name, required) in self.params.items()
+            },
+        }
+
+
+# Intervalo de datas opcional sobre a coluna ``t.data`` de ``dim_tempo``.
+PERIODO = "t.data BETWEEN COALESCE({inicio}, DATE '0001-01-01') AND COALESCE({fim}, DATE '9999-12-31')"
+
+ENDPOINTS = {endpoint.name: endpoint for endpoint in [
+    Endpoint(
+        'posicoes',
+        'Posição acumulada de um usuário por ticker, em cada data com negociação.',
+        f"""
+        SELECT p.usuario_id, a.ticker, t.data, p.quantidade, p.posicao
+        FROM fact_posicoes AS p
+        JOIN dim_acoes AS a ON p.acao_id = a.id
+        JOIN dim_tempo AS t ON p.tempo_id = t.id
+        WHERE p.usuario_id = {{usuario_id}}
+        AND ({{ticker}} IS NULL OR a.ticker = {{ticker}})
+        AND {PERIODO}
+        """,
+        {'usuario_id': ('int', True), 'ticker': ('str', False), 'inicio': ('date', False), 'fim': ('date', False)},
+        order_by='a.ticker, t.data',
+    ),
+    Endpoint(
+        'carteira',
+        'Valor de mercado diário da carteira de um usuário.',
+        f"""
+        SELECT c.usuario_id, t.data, c.valor_mercado, c.quantidade_ativos
+        FROM fact_carteira_diaria AS c
+        JOIN dim_tempo AS t ON c.tempo_id = t.id
+        WHERE c.usuario_id = {{usuario_id}}
+        AND {PERIODO}
+        """,
+        {'usuario_id': ('int', True), 'inicio': ('date', False), 'fim': ('date', False)},
+        order_by='t.data',
+    ),
+    Endpoint(
+        'oportunidades',
+        'Oportunidades do screener em uma data (padrão: a mais recente).',
+        """
+        SELECT t.data, a.ticker, a.sector, o.cotacao, o.p_vp, o.dividend_yield, o.ev_ebit, o.roic, o.p_l
+        FROM fact_oportunidades AS o
+        JOIN dim_acoes AS a ON o.acao_id = a.id
+        JOIN dim_tempo AS t ON o.tempo_id = t.id
+        WHERE t.data = COALESCE(
+            {data},
+            (SELECT MAX(ultima.data) FROM fact_oportunidades JOIN dim_tempo AS ultima ON tempo_id = ultima.id)
+        )
+        """,
+        {'data': ('date', False)},
+        order_by='a.ticker',
+    ),
+    Endpoint(
+        'indicadores',
+        'Indicadores de um ticker em um intervalo de datas.',
+        f"""
+        SELECT a.ticker, t.data, i.cotacao, i.p_vp, i.dividend_yield, i.ev_ebit, i.roic, i.p_l,
+            i.liquidez_2_meses, i.cres_rec_5a
+        FROM fact_indicadores AS i
+        JOIN dim_acoes AS a ON i.acao_id = a.id
+        JOIN dim_tempo AS t ON i.tempo_id = t.id
+        WHERE a.ticker = {{ticker}}
+        AND {PERIODO}
+        """,
+        {'ticker': ('str', True), 'inicio': ('date', False), 'fim': ('date', False)},
+        order_by='t.data, i.id',
+    ),
+    Endpoint(
+        'janelas',
+        'Janelas móveis de um ticker por indicador e tamanho de janela.',
+        f"""
+        SELECT a.ticker, t.data, j.indicador, j.janela, j.valor, j.media, j.minimo, j.maximo,
+            j.desvio_padrao, j.variacao, j.observacoes
+        FROM fact_indicadores_janelas AS j
+        JOIN dim_acoes AS a ON j.acao_id = a.id
+        JOIN dim_tempo AS t ON j.tempo_id = t.id
+        WHERE a.ticker = {{ticker}}
+        AND ({{indicador}} IS NULL OR j.indicador = {{indicador}})
+        AND ({{janela}} IS NULL OR j.janela = {{janela}})
+        AND {PERIODO}
+        """,
+        {
+            'ticker': ('str', True), 'indicador': ('str', False), 'janela': ('int', False),
+            'inicio': ('date', False), 'fim': ('date', False),
+        },
+        order_by='j.indicador, j.janela, t.data',
+    ),
+    Endpoint(
+        'setores',
+        'Distribuição dos indicadores por setor e data.',
+        f"""
+        SELECT t.data, s.setor, s.indicador, s.acoes, s.media, s.p25, s.mediana, s.p75
+        FROM fact_setores AS s
+        JOIN dim_tempo AS t ON s.tempo_id = t.id
+        WHERE ({{setor}} IS NULL OR s.setor = {{setor}})
+        AND ({{indicador}} IS NULL OR s.indicador = {{indicador}})
+        AND {PERIODO}
+        """,
+        {'setor': ('str', False), 'indicador': ('str', False), 'inicio': ('date', False), 'fim': ('date', False)},
+        order_by='s.setor, s.indicador, t.data',
+    ),
+]}
@@ -0,0 +1,283 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import duckdb
+import pyarrow as pa
+
+from src.serve.catalog import ENDPOINTS
+from src.utils.db_utils import DuckDBConnection
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+
+class GoldService:
+    def __init__(self, config: dict, max_concurrency: int = 8, default_limit: int = 1000, max_limit: int = 100000,
+                 queue_timeout: float = 5.0) -> None:
+        """
+        Inicializa o serviço de consultas somente leitura sobre a camada gold.
+
+        As consultas leem as exportações Parquet da camada gold (``gold/current`` com a
+        publicação de snapshots habilitada) por views em um DuckDB em memória, mantido
+        aberto entre as requisições. O serviço nunca abre o banco do pipeline, então
+        não disputa o lock com ele, e o cache de metadados dos Parquets é compartilhado
+        por todos os clientes.
+
+        :param config: Dicionário de configuração do projeto.
+        :param max_concurrency: Número máximo de consultas simultâneas.
+        :param default_limit: Número de linhas por página, se não informado.
+        :param max_limit: Número máximo de linhas por página.
+        :param queue_timeout: Segundos que uma requisição aguarda uma vaga antes de ser
+            recusada.
+        """
+        self.config = config
+        self.max_concurrency = max_concurrency
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+        self.queue_timeout = queue_timeout
+        self.gold_path = Path(config['paths']['gold'])
+        self.batch_size = config.get('duckdb', {}).get('batch_size', DuckDBConnection.BATCH_SIZE)
+        self.connection = DuckDBConnection(':memory:', settings=config.get('duckdb'))
+        self.pool = self.connection.reader_pool(max_concurrency)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._version = 0
+        self._schema = None
+        self._readers = {}
+        self._readers_lock = threading.Lock()
+
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'GoldService':
+        """
+        Cria o serviço a partir da seção ``serve`` do settings.yaml.
+
+        :param config: Dicionário de configuração do projeto.
+        """
+        settings = config.get('serve', {})
+        return cls(
+            config,
+            max_concurrency=settings.get('max_concurrency', 8),
+            default_limit=settings.get('default_limit', 1000),
+            max_limit=settings.get('max_limit', 100000),
+            queue_timeout=settings.get('queue_timeout', 5.0),
+        )
+
+
+    def gold_root(self) -> Path:
+        """Retorna o diretório das exportações gold publicadas."""
+        current = self.gold_path / 'current'
+        return current.resolve() if current.exists() else self.gold_path.resolve()
+
+
+    def refresh(self) -> None:
+        """
+        Recria as views se uma nova versão da camada gold foi publicada.
+
+        A versão é identificada pelo diretório publicado e pelo manifesto da exportação,
+        regravado a cada carga. As views de cada versão são criadas em um esquema novo,
+        que passa a ser o das consultas seguintes de uma só vez, de modo que uma consulta
+        nunca mistura tabelas de versões diferentes e tabelas removidas deixam de existir.
+        O esquema anterior é removido quando a última consulta que o usa termina.
+        """
+        root = self.gold_root()
+        manifest = root / '_manifest.json'
+        stamp = (str(root), manifest.stat().st_mtime_ns if manifest.exists() else None)
+        if stamp == self._stamp:
+            return
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            self._version += 1
+            schema = f'gold_v{self._version}'
+            self.connection.execute(f"CREATE SCHEMA {schema}")
+            for path in sorted(root.iterdir()) if root.exists() else []:
+                if path.name.startswith(('.', '_')):
+                    continue
+                if path.is_dir():
+                    source = f"read_parquet('{path}/**/*.parquet', hive_partitioning = true)"
+                elif path.suffix == '.parquet':
+                    source = f"read_parquet('{path}')"
+                else:
+                    continue
+                self.connection.execute(
+                    f"CREATE VIEW {schema}.{path.name.split('.')[0]} AS SELECT * FROM {source}",
+                    step=f"VIEW {path.name}",
+                )
+            with self._readers_lock:
+                previous, self._schema = self._schema, schema
+                unused = previous is not None and not self._readers.get(previous)
+            if unused:
+                self.connection.execute(f"DROP SCHEMA {previous} CASCADE")
+            self._stamp = stamp
+            print(f"Servindo a camada gold de {root}.")
+
+
+    def _acquire_schema(self) -> str:
+        """Retorna o esquema da versão corrente, registrando uma consulta sobre ele."""
+        with self._readers_lock:
+            self._readers[self._schema] = self._readers.get(self._schema, 0) + 1
+            return self._schema
+
+
+    def _release_schema(self, schema: str) -> None:
+        """Encerra uma consulta sobre o esquema e o remove se ele foi substituído e ficou sem uso."""
+        with self._readers_lock:
+            self._readers[schema] -= 1
+            if self._readers[schema] or schema == self._schema:
+                return
+            del self._readers[schema]
+        with self._lock:
+            self.connection.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+
+
+    def query(self, name: str, query: dict) -> tuple:
+        """
+        Executa um endpoint do catálogo e retorna uma página de resultados.
+
+        :param name: Nome do endpoint.
+        :param query: Parâmetros da URL, incluindo ``limit`` e ``offset``.
+        :return: A página em Arrow e o offset da página seguinte (None na última).
+        :raises KeyError: Se o endpoint não existir.
+        :raises ValueError: Se os parâmetros forem inválidos.
+        :raises TimeoutError: Se não houver vaga em ``queue_timeout`` segundos.
+        """
+        endpoint = ENDPOINTS[name]
+        query = dict(query)
+        try:
+            limit = int(query.pop('limit', self.default_limit))
+            offset = int(query.pop('offset', 0))
+        except ValueError:
+            raise ValueError("limit e offset devem ser inteiros.") from None
+        if not 0 < limit <= self.max_limit or offset < 0:
+            raise ValueError(f"limit deve estar entre 1 e {self.max_limit} e offset não pode ser negativo.")
+        values = endpoint.parse(query)
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise TimeoutError(f"Limite de {self.max_concurrency} consultas simultâneas atingido.")
+        try:
+            self.refresh()
+            schema = self._acquire_schema()
+            try:
+                with self.pool.acquire() as cursor:
+                    cursor.execute(f"SET search_path = '{schema}'", step='SEARCH_PATH')
+                    # Uma linha a mais indica se há uma página seguinte.
+                    table = cursor.arrow(endpoint.sql, step=f"GET /{name}", params=values + [limit + 1, offset])
+            finally:
+                self._release_schema(schema)
+        finally:
+            self._slots.release()
+        if table.num_rows > limit:
+            return table.slice(0, limit), offset + limit
+        return table, None
+
+
+    def close(self) -> None:
+        """Fecha o pool de cursores e a conexão."""
+        self.pool.close()
+        self.connection.close()
+
+
+class GoldRequestHandler(BaseHTTPRequestHandler):
+    service: GoldService = None
+
+    def _send_json(self, status: int, body: dict, headers: dict = None) -> None:
+        """Envia uma resposta JSON completa."""
+        content = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+
+    def _stream_json(self, name: str, query: dict, table: pa.Table, next_offset: int) -> None:
+        """Envia uma página em JSON, escrevendo as linhas lote a lote."""
+        proximo = None
+        if next_offset is not None:
+            proximo = f"/{name}?{urlencode({**query, 'offset': next_offset})}"
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.end_headers()
+        header = json.dumps({'endpoint': f'/{name}', 'linhas': table.num_rows, 'proximo': proximo}, ensure_ascii=False)
+        self.wfile.write(f'{header[:-1]}, "dados": ['.encode('utf-8'))
+        separator = ''
+        for batch in table.to_batches(max_chunksize=self.service.batch_size):
+            rows = ','.join(json.dumps(row, ensure_ascii=False, default=str) for row in batch.to_pylist())
+            if rows:
+                self.wfile.write(f'{separator}{rows}'.encode('utf-8'))
+                separator = ','
+        self.wfile.write(b']}')
+
+
+    def _stream_arrow(self, table: pa.Table, next_offset: int) -> None:
+        """Envia uma página no formato Arrow IPC (stream), lote a lote."""
+        self.send_response(200)
+        self.send_header('Content-Type', ARROW_STREAM)
+        if next_offset is not None:
+            self.send_header('X-Next-Offset', str(next_offset))
+        self.end_headers()
+        with pa.ipc.new_stream(self.wfile, table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=self.service.batch_size):
+                writer.write_batch(batch)
+
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        name = url.path.strip('/')
+        query = dict(parse_qsl(url.query))
+        if name == '':
+            self._send_json(200, {'endpoints': [endpoint.describe() for endpoint in ENDPOINTS.values()]})
+            return
+        if name == 'health':
+            self._send_json(200, {'status': 'ok', 'gold': str(self.service.gold_root())})
+            return
+
+        output = query.pop('format', 'arrow' if ARROW_STREAM in self.headers.get('Accept', '') else 'json')
+        try:
+            table, next_offset = self.service.query(name, query)
+        except KeyError:
+            self._send_json(404, {'erro': f"Endpoint '/{name}' não encontrado."})
+            return
+        except ValueError as error:
+            self._send_json(400, {'erro': str(error)})
+            return
+        except TimeoutError as error:
+            self._send_json(503, {'erro': str(error)}, headers={'Retry-After': '1'})
+            return
+        except duckdb.CatalogException as error:
+            self._send_json(503, {'erro': f"Camada gold indisponível: {error}"})
+            return
+
+        if output == 'arrow':
+            self._stream_arrow(table, next_offset)
+        else:
+            self._stream_json(name, query, table, next_offset)
+
+
+def serve(config: dict, host: str = None, port: int = None) -> None:
+    """
+    Sobe o serviço de consultas da camada gold até ser interrompido.
+
+    :param config: Dicionário de configuração do projeto.
+    :param host: Endereço de escuta. Padrão: ``serve.host`` ou 127.0.0.1.
+    :param port: Porta. Padrão: ``serve.port`` ou 8050.
+    """
+    settings = config.get('serve', {})
+    service = GoldService.from_config(config)
+    service.refresh()
+    handler = type('Handler', (GoldRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host or settings.get('host', '127.0.0.1'), port or settings.get('port', 8050)), handler)
+    print(f"Servindo em http://{server.server_address[0]}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
@@ -1,3 +1,26 @@
-from .db_utils import DuckDBConnection
+from importlib import import_module
 
-__all__ = ['DuckDBConnection']
\ No newline at end of file
+# Importados sob demanda, como em src/elt/__init__.py.
+_EXPORTS = {
+    'DAGRunner': '.dag',
+    'Step': '.dag',
+    'DuckDBConnection': '.db_utils',
+    'DuckDBReaderPool': '.db_utils',
+    'Instrumentation': '.instrumentation',
+    'QueryCache': '.query_cache',
+    'SnapshotPublisher': '.publish',
+}
+
+__all__ = ['DAGRunner', 'DuckDBConnection', 'DuckDBReaderPool', 'Instrumentation', 'QueryCache', 'SnapshotPublisher', 'Step']
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,384 @@
+import glob
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import date, datetime
+from pathlib import Path
+from typing import Callable
+
+from src.utils.db_utils import DuckDBConnection
+
+
+class Step:
+    def __init__(self, name: str, func: Callable[['DuckDBConnection'], None], inputs: list = (),
+                 outputs: list = (), after: list = (), stage: str = None, always: bool = False) -> None:
+        """
+        Etapa do pipeline executada pelo ``DAGRunner``.
+
+        Entradas e saídas são recursos identificados por prefixo:
+
+        - ``table:<esquema.tabela>``: uma tabela do DuckDB, identificada pela sua versão
+          (incrementada quando uma etapa que a declara como saída a altera) e pelo
+          número de linhas;
+        - ``file:<glob>``: arquivos em disco (caminho, data de modificação e tamanho);
+        - ``config:<seção>``: uma seção do settings.yaml (ex.: ``config:screener``);
+        - ``today``: a data corrente, para etapas que dependem do dia da execução.
+
+        :param name: Nome único da etapa.
+        :param func: Função executada com um cursor próprio do banco.
+        :param inputs: Recursos lidos pela etapa.
+        :param outputs: Recursos gravados pela etapa.
+        :param after: Etapas que devem terminar antes, além das deduzidas dos recursos.
+        :param stage: Estágio nas métricas (ex.: ``silver``).
+        :param always: Se True, a etapa nunca é ignorada por falta de alterações nas entradas.
+        """
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.stage = stage or name
+        self.always = always or not self.inputs
+
+
+class DAGRunner:
+    def __init__(self, db_connection: 'DuckDBConnection', config: dict, max_workers: int = 4,
+                 skip_unchanged: bool = True, resume: bool = True) -> None:
+        """
+        Inicializa o executor de etapas com dependências.
+
+        As dependências são deduzidas das entradas e saídas na ordem de declaração das
+        etapas: uma etapa espera a última etapa anterior que gravou cada recurso que ela
+        lê ou grava e as etapas anteriores que leram cada recurso que ela grava. Etapas
+        independentes são executadas em paralelo, cada uma em um cursor próprio.
+
+        O estado de cada etapa concluída é gravado em ``gold.controle_etapas``. Uma
+        execução que falhou é retomada na seguinte a partir das etapas não concluídas,
+        e etapas cujas entradas e saídas não mudaram desde a última conclusão são ignoradas.
+
+        :param db_connection: Conexão com o banco de dados DuckDB.
+        :param config: Dicionário de configuração, usado nos recursos ``config:``.
+        :param max_workers: Número máximo de etapas simultâneas.
+        :param skip_unchanged: Se True, ignora etapas cujas entradas não mudaram.
+        :param resume: Se True, retoma a última execução que falhou.
+        """
+        self.db_connection = db_connection
+        self.config = config
+        self.max_workers = max_workers
+        self.skip_unchanged = skip_unchanged
+        self.resume = resume
+        self.steps = []
+        self._fingerprints = {}
+        self._lock = threading.Lock()
+
+
+    def add(self, step: Step) -> Step:
+        """Acrescenta uma etapa ao final do pipeline."""
+        if any(existing.name == step.name for existing in self.steps):
+            raise ValueError(f"Etapa '{step.name}' declarada mais de uma vez.")
+        self.steps.append(step)
+        return step
+
+
+    def dependencies(self) -> dict:
+        """
+        Deduz as dependências de cada etapa a partir das entradas e saídas.
+
+        :return: Dicionário com o conjunto de etapas que cada etapa deve esperar.
+        :raises ValueError: Se uma etapa depender de uma etapa inexistente ou posterior.
+        """
+        ultimo_escritor = {}
+        leitores = {}
+        dependencies = {}
+        for step in self.steps:
+            deps = set()
+            for name in step.after:
+                if name not in dependencies:
+                    raise ValueError(f"Etapa '{step.name}' depende de '{name}', que não foi declarada antes.")
+                deps.add(name)
+            for resource in step.inputs:
+                if resource in ultimo_escritor:
+                    deps.add(ultimo_escritor[resource])
+            for resource in step.outputs:
+                if resource in ultimo_escritor:
+                    deps.add(ultimo_escritor[resource])
+                deps.update(leitores.get(resource, set()))
+            for resource in step.inputs:
+                leitores.setdefault(resource, set()).add(step.name)
+            for resource in step.outputs:
+                ultimo_escritor[resource] = step.name
+                leitores[resource] = set()
+            deps.discard(step.name)
+            dependencies[step.name] = deps
+        return dependencies
+
+
+    def _create_tables(self) -> None:
+        """Cria as tabelas de controle das execuções e das etapas."""
+        self.db_connection.execute("""
+            CREATE SCHEMA IF NOT EXISTS gold;
+        """)
+
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS gold.controle_execucoes (
+                id VARCHAR PRIMARY KEY,
+                status VARCHAR,
+                iniciada_em TIMESTAMP,
+                finalizada_em TIMESTAMP
+            );
+        """)
+
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS gold.controle_etapas (
+                etapa VARCHAR PRIMARY KEY,
+                execucao VARCHAR,
+                status VARCHAR,
+                entradas VARCHAR,
+                saidas VARCHAR,
+                segundos DOUBLE,
+                concluida_em TIMESTAMP
+            );
+        """)
+
+        self.db_connection.execute("""
+            CREATE TABLE IF NOT EXISTS gold.controle_tabelas (
+                tabela VARCHAR PRIMARY KEY,
+                versao BIGINT,
+                alterada_em TIMESTAMP
+            );
+        """)
+
+
+    def _fingerprint(self, cursor: 'DuckDBConnection', resource: str) -> str:
+        """Calcula a impressão digital atual de um recurso."""
+        kind, _, name = resource.partition(':')
+        if kind == 'table':
+            schema, table = name.split('.')
+            exists = cursor.sql(f"""
+                SELECT COUNT(*) AS n
+                FROM information_schema.tables
+                WHERE table_schema = '{schema}' AND table_name = '{table}'
+            """, step=f"FINGERPRINT {name}", cache=False)
+            if not int(exists['n'][0]):
+                return 'ausente'
+            # A versão evita ler o conteúdo da tabela; a contagem de linhas, que não lê
+            # nenhuma coluna, acusa escritas feitas fora do pipeline.
+            df = cursor.sql(f"""
+                SELECT
+                    COALESCE((SELECT versao FROM gold.controle_tabelas WHERE tabela = '{name}'), 0) AS versao,
+                    (SELECT COUNT(*) FROM {name}) AS rows
+            """, step=f"FINGERPRINT {name}", cache=False)
+            return f"{int(df['versao'][0])}:{int(df['rows'][0])}"
+        if kind == 'file':
+            # Caminhos relativos à parte fixa do glob, para que uma cópia do diretório
+            # (ex.: uma versão nova da camada gold) tenha a mesma impressão digital.
+            prefix = name.split('*', 1)[0]
+            stamp = []
+            for path in sorted(glob.glob(name, recursive=True)):
+                stat = Path(path).stat()
+                stamp.append((path[len(prefix):], stat.st_mtime_ns, stat.st_size))
+            return hashlib.sha256(repr(stamp).encode('utf-8')).hexdigest()
+        if kind == 'config':
+            value = self.config
+            for key in name.split('.'):
+                value = (value or {}).get(key)
+            return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        if kind == 'today':
+            return date.today().isoformat()
+        raise ValueError(f"Recurso desconhecido: '{resource}'.")
+
+
+    @staticmethod
+    def _bump_versions(cursor: 'DuckDBConnection', step: Step) -> None:
+        """Incrementa a versão das tabelas de saída que a etapa alterou."""
+        for resource in step.outputs:
+            kind, _, name = resource.partition(':')
+            if kind != 'table' or not ({'*', name.split('.')[-1].lower()} & cursor.writes):
+                continue
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO gold.controle_tabelas
+                SELECT
+                    '{name}' AS tabela,
+                    COALESCE((SELECT versao FROM gold.controle_tabelas WHERE tabela = '{name}'), 0) + 1 AS versao,
+                    CURRENT_TIMESTAMP AS alterada_em
+            """, step=f"VERSION {name}")
+
+
+    def _fingerprints_of(self, cursor: 'DuckDBConnection', resources: list, refresh: bool = False) -> str:
+        """
+        Calcula a impressão digital de um conjunto de recursos.
+
+        Os valores são memorizados durante a execução: um recurso só muda quando a etapa
+        que o grava termina, e então é recalculado com ``refresh``.
+        """
+        values = {}
+        for resource in sorted(resources):
+            with self._lock:
+                cached = None if refresh else self._fingerprints.get(resource)
+            if cached is None:
+                cached = self._fingerprint(cursor, resource)
+                with self._lock:
+                    self._fingerprints[resource] = cached
+            values[resource] = cached
+        return hashlib.sha256(json.dumps(values, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+    def _run_step(self, step: Step, previous: dict, force: bool) -> dict:
+        """
+        Executa uma etapa em um cursor próprio, ou a ignora se nada mudou.
+
+        :return: O registro da etapa para ``gold.controle_etapas``.
+        """
+        cursor = self.db_connection.cursor()
+        try:
+            # O estágio leva o nome da etapa, para distinguir as etapas no resumo das métricas.
+            with cursor.stage(f'{step.stage}:{step.name}'):
+                start = time.perf_counter()
+                entradas = self._fingerprints_of(cursor, step.inputs)
+                if (
+                    not force
+                    and self.skip_unchanged
+                    and not step.always
+                    and previous
+                    and previous['entradas'] == entradas
+                    and previous['saidas'] == self._fingerprints_of(cursor, step.outputs)
+                ):
+                    print(f"Etapa {step.name} ignorada: entradas sem alterações.")
+                    return {'status': 'ignorada', 'entradas': entradas, 'saidas': previous['saidas'], 'segundos': 0.0}
+
+                print(f"Executando a etapa {step.name}.")
+                step.func(cursor)
+                self._bump_versions(cursor, step)
+                saidas = self._fingerprints_of(cursor, step.outputs, refresh=True)
+                return {
+                    'status': 'concluida',
+                    'entradas': entradas,
+                    'saidas': saidas,
+                    'segundos': round(time.perf_counter() - start, 4),
+                }
+        finally:
+            cursor.close()
+
+
+    def _execution(self) -> tuple:
+        """
+        Retorna o id da execução e as etapas já concluídas nela.
+
+        Se a última execução falhou e ``resume`` está habilitado, ela é retomada, desde
+        que tenha sido iniciada no mesmo dia: uma execução de um dia anterior não é
+        retomada, para que as extrações e as etapas que dependem da data (``today``)
+        sejam executadas novamente.
+        """
+        df = self.db_connection.sql("""
+            SELECT id, status, iniciada_em::DATE = CURRENT_DATE AS iniciada_hoje
+            FROM gold.controle_execucoes
+            ORDER BY iniciada_em DESC
+            LIMIT 1
+        """, cache=False)
+        if self.resume and len(df) and df['status'][0] != 'concluida' and df['iniciada_hoje'][0]:
+            execucao = df['id'][0]
+            concluidas = self.db_connection.sql(f"""
+                SELECT etapa
+                FROM gold.controle_etapas
+                WHERE execucao = '{execucao}'
+                AND status IN ('concluida', 'ignorada')
+            """, cache=False)['etapa']
+            print(f"Retomando a execução {execucao}: {len(concluidas)} etapa(s) já concluída(s).")
+            return execucao, set(concluidas)
+        return datetime.now().strftime('%Y%m%dT%H%M%S%f'), set()
+
+
+    def _set_status(self, execucao: str, status: str) -> None:
+        """Grava o status da execução."""
+        finalizada_em = 'NULL' if status == 'em_andamento' else 'CURRENT_TIMESTAMP'
+        self.db_connection.execute(f"""
+            INSERT OR REPLACE INTO gold.controle_execucoes
+            SELECT
+                '{execucao}' AS id,
+                '{status}' AS status,
+                COALESCE(
+                    (SELECT iniciada_em FROM gold.controle_execucoes WHERE id = '{execucao}'),
+                    CURRENT_TIMESTAMP
+                ) AS iniciada_em,
+                {finalizada_em} AS finalizada_em
+        """)
+
+
+    def _record(self, execucao: str, name: str, result: dict) -> None:
+        """Grava o checkpoint de uma etapa."""
+        self.db_connection.execute(f"""
+            INSERT OR REPLACE INTO gold.controle_etapas
+            SELECT
+                '{name}' AS etapa,
+                '{execucao}' AS execucao,
+                '{result['status']}' AS status,
+                '{result['entradas']}' AS entradas,
+                '{result['saidas']}' AS saidas,
+                {result['segundos']} AS segundos,
+                CURRENT_TIMESTAMP AS concluida_em
+        """)
+
+
+    def run(self, force: bool = False, stages: list = None) -> dict:
+        """
+        Executa as etapas respeitando as dependências.
+
+        :param force: Se True, executa todas as etapas, sem retomar nem ignorar nenhuma.
+        :param stages: Estágios a executar (ex.: ``['silver']``). Se informado, somente as
+            etapas desses estágios são executadas, como uma execução avulsa: nenhuma
+            execução anterior é retomada e o controle de execuções não é alterado.
+        :return: O status de cada etapa (``concluida``, ``ignorada`` ou ``retomada``).
+        :raises RuntimeError: Se alguma etapa falhar; as etapas já iniciadas terminam e
+            as demais ficam para a próxima execução.
+        """
+        dependencies = self.dependencies()
+        steps = [step for step in self.steps if stages is None or step.stage in stages]
+        selected = {step.name for step in steps}
+        dependencies = {name: deps & selected for name, deps in dependencies.items() if name in selected}
+        self._create_tables()
+        self._fingerprints = {}
+        if force or stages is not None:
+            execucao, concluidas = datetime.now().strftime('%Y%m%dT%H%M%S%f'), set()
+        else:
+            execucao, concluidas = self._execution()
+        if stages is None:
+            self._set_status(execucao, 'em_andamento')
+
+        df = self.db_connection.sql("SELECT * FROM gold.controle_etapas", cache=False)
+        previous = {row['etapa']: row for row in df.to_dict('records')}
+
+        status = {name: 'retomada' for name in concluidas if name in dependencies}
+        pending = [step for step in steps if step.name not in status]
+        running = {}
+        errors = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='etapa') as executor:
+            while pending or running:
+                if not errors:
+                    for step in list(pending):
+                        if dependencies[step.name] <= set(status):
+                            pending.remove(step)
+                            future = executor.submit(self._run_step, step, previous.get(step.name), force)
+                            running[future] = step
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as error:
+                        print(f"Falha na etapa {step.name}: {error}")
+                        errors[step.name] = error
+                        continue
+                    self._record(execucao, step.name, result)
+                    status[step.name] = result['status']
+
+        if errors:
+            if stages is None:
+                self._set_status(execucao, 'falhou')
+            raise RuntimeError(f"Falha nas etapas: {', '.join(errors)}") from next(iter(errors.values()))
+        if stages is None:
+            self._set_status(execucao, 'concluida')
+        return status
@@ -1,55 +1,443 @@
+import copy
+import os
+import queue
+import shutil
+import threading
+import time
 import duckdb
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Iterator
 import pandas as pd
+import pyarrow as pa
+from src.utils.instrumentation import Instrumentation
+from src.utils.query_cache import QueryCache
 
 
 class DuckDBConnection:
-    def __init__(self, db_path: str) -> None:
+    # Opções da seção ``duckdb`` do settings.yaml repassadas ao DuckDB na conexão.
+    CONFIG_OPTIONS = [
+        'threads',
+        'memory_limit',
+        'temp_directory',
+        'max_temp_directory_size',
+        'enable_object_cache',
+    ]
+
+    # Número de linhas por lote de ``record_batches`` e ``iter_batches``.
+    BATCH_SIZE = 122880
+
+    # Número máximo de statements parametrizados mantidos por conexão.
+    MAX_PREPARED = 256
+
+    def __init__(self, db_path: str, instrumentation: Instrumentation = None, settings: dict = None,
+                 read_only: bool = False, cache: QueryCache = None) -> None:
         """
         Inicializa a conexão com o banco de dados DuckDB.
 
         :param db_path: Caminho para o arquivo do banco de dados DuckDB.
+        :param instrumentation: Coletor de métricas das queries. Se omitido, nenhuma
+            métrica é coletada.
+        :param settings: Opções de recursos do DuckDB (seção ``duckdb`` do settings.yaml).
+        :param read_only: Se True, abre o banco somente para leitura.
+        :param cache: Cache de resultados usado por ``sql``. Se omitido, toda leitura é executada.
         """
         self.db_path = Path(db_path)
+        self.instrumentation = instrumentation or Instrumentation(enabled=False)
+        self.settings = settings or {}
+        self.read_only = read_only
+        self.cache = cache
         self.conn = self.connect()
+        self.db_stamp = self._db_stamp()
+        self.writes = set()
+        self._prepared = OrderedDict()
 
 
     def connect(self) -> duckdb.DuckDBPyConnection:
-        """Conecta ao banco de dados DuckDB no caminho especificado."""
-        return duckdb.connect(str(self.db_path))
+        """
+        Conecta ao banco de dados DuckDB no caminho especificado.
+
+        Aplica os limites de threads e memória, o diretório de spill em disco e o
+        cache de objetos (metadados dos Parquets) definidos em ``settings``.
+        """
+        config = {
+            option: self.settings[option]
+            for option in self.CONFIG_OPTIONS
+            if self.settings.get(option) is not None
+        }
+        if 'temp_directory' in config:
+            Path(config['temp_directory']).mkdir(parents=True, exist_ok=True)
+        return duckdb.connect(str(self.db_path), read_only=self.read_only, config=config)
+
+
+    def cursor(self) -> 'DuckDBConnection':
+        """
+        Cria uma nova conexão sobre a mesma instância do banco.
+
+        Cada cursor pode executar queries em paralelo com os demais em outra thread.
+
+        :return: Um ``DuckDBConnection`` que compartilha o banco, as configurações e a instrumentação.
+        """
+        cursor = copy.copy(self)
+        cursor.conn = self.conn.cursor()
+        cursor.writes = set()
+        cursor._prepared = OrderedDict()
+        return cursor
+
+
+    def reader_pool(self, size: int = None) -> 'DuckDBReaderPool':
+        """
+        Cria um pool de cursores para consultas concorrentes.
+
+        :param size: Número de cursores. Se omitido, usa ``reader_pool_size`` das configurações.
+        """
+        return DuckDBReaderPool(self, size or self.settings.get('reader_pool_size', 4))
     
 
-    def execute(self, query: str) -> None:
+    def _prepare(self, query: str) -> 'duckdb.Statement':
+        """
+        Retorna o statement já analisado de uma query parametrizada.
+
+        Os statements ficam na conexão e são reutilizados enquanto ela estiver aberta,
+        de modo que consultas repetidas não são analisadas de novo; os parâmetros são
+        sempre passados ao DuckDB separadamente, sem serem convertidos em literais.
+        Apenas os ``MAX_PREPARED`` statements usados mais recentemente são mantidos.
+
+        :param query: A consulta SQL, com parâmetros ``?`` ou ``$1``, ``$2``...
+        :return: O statement ou a própria query, se ela tiver mais de um statement.
+        """
+        statement = self._prepared.get(query)
+        if statement is None:
+            statements = self.conn.extract_statements(query)
+            statement = statements[0] if len(statements) == 1 else query
+            self._prepared[query] = statement
+            if len(self._prepared) > self.MAX_PREPARED:
+                self._prepared.popitem(last=False)
+        else:
+            self._prepared.move_to_end(query)
+        return statement
+
+
+    def _run(self, query: str, params: list = None):
+        """
+        Executa uma query medindo o tempo e, se habilitado, gravando o profiling JSON do DuckDB.
+
+        Toda query passa por aqui, seja de ``execute``, ``sql``, ``arrow`` ou dos lotes:
+        as tabelas alteradas por qualquer um dos seus statements são invalidadas no cache
+        e acumuladas em ``writes``, que o ``DAGRunner`` usa para versionar as saídas das etapas.
+
+        :param query: A consulta SQL a ser executada.
+        :param params: Parâmetros da query. Se informados, a query é executada como
+            prepared statement.
+        :return: O resultado do DuckDB, o tempo de execução e o caminho do profiling.
+        """
+        profile = None
+        if self.instrumentation.profiling:
+            profile = self.instrumentation.profile_path()
+            self.conn.execute("PRAGMA enable_profiling = 'json'")
+            self.conn.execute(f"PRAGMA profiling_output = '{profile}'")
+        start = time.perf_counter()
+        if params is not None:
+            result = self.conn.execute(self._prepare(query), params)
+        else:
+            result = self.conn.execute(query)
+        elapsed = time.perf_counter() - start
+        if not self.read_only:
+            self.writes |= QueryCache.written_tables(query)
+        if self.cache:
+            self.cache.invalidate(query)
+        return result, elapsed, profile
+
+
+    def execute(self, query: str, step: str = None, params: list = None) -> None:
         """
         Executa uma query SQL.
 
         :param query: A consulta SQL a ser executada.
+        :param step: Nome da etapa nas métricas. Se omitido, é derivado da query.
+        :param params: Parâmetros da query (``?`` ou ``$1``, ``$2``...). Se informados, a
+            query é analisada uma vez por conexão e reutilizada, e os valores são
+            passados ao DuckDB separadamente.
         """
-        self.conn.execute(query)
+        result, elapsed, profile = self._run(query, params)
+        rows = None
+        if self.instrumentation.enabled and result.description and result.description[0][0] == 'Count':
+            row = result.fetchone()
+            rows = row[0] if row else None
+        self.instrumentation.record(step or Instrumentation.step_name(query), elapsed, rows, profile=profile)
 
 
-    def sql(self, query: str) -> pd.DataFrame:
+    def _db_stamp(self) -> tuple:
+        """
+        Identifica o estado do arquivo do banco e do WAL ao abrir a conexão.
+
+        Enquanto a conexão está aberta, o lock do DuckDB impede escritas de outros
+        processos e as escritas desta conexão incrementam as versões das tabelas no
+        cache; o estado do arquivo só distingue os resultados persistidos por outros
+        processos, que podem ter lido o banco antes de uma escrita.
+        """
+        stamp = [str(self.db_path)]
+        for path in [self.db_path, self.db_path.with_name(self.db_path.name + '.wal')]:
+            if path.exists():
+                stat = path.stat()
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+
+
+    def sql(self, query: str, step: str = None, cache: bool = True, params: list = None) -> pd.DataFrame:
         """
         Executa uma query SQL e retorna um DataFrame.
 
+        Se a conexão tiver um cache de resultados, leituras repetidas são servidas do cache
+        enquanto nenhuma das tabelas consultadas for alterada. O DataFrame retornado pelo
+        cache é compartilhado e não deve ser alterado.
+
         :param query: A consulta SQL a ser executada.
+        :param step: Nome da etapa nas métricas. Se omitido, é derivado da query.
+        :param cache: Se False, ignora o cache nesta consulta.
+        :param params: Parâmetros da query. Se informados, a query é executada como
+            prepared statement (ver ``execute``).
         :return: Um DataFrame contendo os resultados da consulta.
         """
-        return self.conn.sql(query).df()
+        start = time.perf_counter()
+        key = None
+        if self.cache and cache:
+            stamp = self.db_stamp if self.cache.persist_dir else ()
+            if params is not None:
+                stamp += (('params', repr(params)),)
+            key = self.cache.key(query, stamp)
+            df = self.cache.get(key)
+            if df is not None:
+                self.instrumentation.record(
+                    step or Instrumentation.step_name(query), time.perf_counter() - start, len(df), kind='cache'
+                )
+                return df
+
+        result, _, profile = self._run(query, params)
+        df = result.df()
+        if key:
+            self.cache.put(key, df)
+        self.instrumentation.record(
+            step or Instrumentation.step_name(query), time.perf_counter() - start, len(df), profile=profile
+        )
+        return df
+
+
+    def arrow(self, query: str, step: str = None, params: list = None) -> pa.Table:
+        """
+        Executa uma query SQL e retorna uma tabela Arrow.
+
+        O resultado é transferido do DuckDB em formato colunar, sem a cópia e a conversão
+        de tipos do DataFrame, e não passa pelo cache de resultados.
+
+        :param query: A consulta SQL a ser executada.
+        :param step: Nome da etapa nas métricas. Se omitido, é derivado da query.
+        :param params: Parâmetros da query (ver ``execute``).
+        :return: Uma tabela Arrow com os resultados da consulta.
+        """
+        start = time.perf_counter()
+        result, _, profile = self._run(query, params)
+        table = result.arrow()
+        self.instrumentation.record(
+            step or Instrumentation.step_name(query), time.perf_counter() - start, table.num_rows, profile=profile
+        )
+        return table
+
+
+    def record_batches(self, query: str, batch_size: int = None, params: list = None) -> pa.RecordBatchReader:
+        """
+        Executa uma query SQL e retorna um leitor dos resultados em lotes.
+
+        Os lotes são produzidos pelo DuckDB à medida que são lidos, então o consumo de
+        memória é limitado pelo tamanho do lote e não pelo resultado. O leitor usa a
+        conexão até ser esgotado: para executar outras queries enquanto lê, use um
+        ``cursor``.
+
+        :param query: A consulta SQL a ser executada.
+        :param batch_size: Número de linhas por lote. Se omitido, usa ``batch_size`` das
+            configurações.
+        :param params: Parâmetros da query (ver ``execute``).
+        :return: Um ``pyarrow.RecordBatchReader``.
+        """
+        result, _, _ = self._run(query, params)
+        return result.fetch_record_batch(batch_size or self.settings.get('batch_size', self.BATCH_SIZE))
 
 
-    def save_parquet(self, table_name: str, output_path: str) -> None:
+    def iter_batches(self, query: str, batch_size: int = None, step: str = None,
+                     params: list = None) -> Iterator[pa.RecordBatch]:
+        """
+        Itera sobre os resultados de uma query em lotes Arrow.
+
+        Igual a ``record_batches``, mas registra nas métricas o tempo e o total de linhas
+        quando a leitura termina.
+
+        :param query: A consulta SQL a ser executada.
+        :param batch_size: Número de linhas por lote.
+        :param step: Nome da etapa nas métricas. Se omitido, é derivado da query.
+        :param params: Parâmetros da query (ver ``execute``).
+        """
+        start = time.perf_counter()
+        rows = 0
+        for batch in self.record_batches(query, batch_size=batch_size, params=params):
+            rows += batch.num_rows
+            yield batch
+        self.instrumentation.record(step or Instrumentation.step_name(query), time.perf_counter() - start, rows)
+
+
+    def stage(self, name: str):
+        """
+        Agrupa as queries executadas no bloco sob um estágio nas métricas.
+
+        :param name: Nome do estágio (ex.: ``silver``).
+        """
+        return self.instrumentation.stage(name)
+
+
+    def save_parquet(self, table_name: str, output_path: str, sort_by: list = None, compression: str = None,
+                     row_group_size: int = None, partition_by: list = None) -> None:
         """
         Salva uma tabela DuckDB como Parquet.
 
+        O arquivo é gravado em um caminho temporário e renomeado ao final, de modo que
+        leitores nunca encontram um arquivo pela metade.
+
         :param table_name: Nome da tabela a ser salva.
-        :param output_path: Caminho onde o arquivo Parquet será salvo.
+        :param output_path: Caminho onde o arquivo Parquet será salvo. Com ``partition_by``,
+            é o diretório das partições no formato Hive.
+        :param sort_by: Colunas de ordenação das linhas, que melhoram o filtro por
+            estatísticas dos row groups.
+        :param compression: Codec de compressão (ex.: ``zstd``, ``snappy``).
+        :param row_group_size: Número de linhas por row group.
+        :param partition_by: Colunas de particionamento.
         """
         output_path = Path(output_path)
-        query = f"COPY (SELECT * FROM {table_name}) TO '{output_path}' (FORMAT 'parquet')"
-        self.conn.execute(query)
+        temp_path = output_path.with_name(f".{output_path.name}.tmp-{os.getpid()}-{threading.get_ident()}")
+        if temp_path.is_dir():
+            shutil.rmtree(temp_path)
+
+        order_by = f"ORDER BY {', '.join(sort_by)}" if sort_by else ''
+        options = ["FORMAT 'parquet'"]
+        if compression:
+            options.append(f"COMPRESSION '{compression}'")
+        if row_group_size:
+            options.append(f"ROW_GROUP_SIZE {row_group_size}")
+        if partition_by:
+            options.append(f"PARTITION_BY ({', '.join(partition_by)})")
+        query = f"COPY (SELECT * FROM {table_name} {order_by}) TO '{temp_path}' ({', '.join(options)})"
+        self.execute(query, step=f"EXPORT {table_name}")
+
+        if temp_path.is_dir() or output_path.is_dir():
+            # Diretórios não podem ser substituídos atomicamente: o anterior é
+            # renomeado e removido apenas depois que o novo está no lugar.
+            old_path = output_path.with_name(f".{output_path.name}.old-{os.getpid()}-{threading.get_ident()}")
+            if output_path.exists():
+                output_path.rename(old_path)
+            temp_path.rename(output_path)
+            if old_path.is_dir():
+                shutil.rmtree(old_path)
+            elif old_path.exists():
+                old_path.unlink()
+        else:
+            os.replace(temp_path, output_path)
 
 
     def close(self) -> None:
         """Fecha a conexão com o banco de dados."""
         self.conn.close()
+
+
+class DuckDBReaderPool:
+    def __init__(self, connection: DuckDBConnection, size: int = 4) -> None:
+        """
+        Inicializa um pool de cursores para consultas concorrentes, como as do dashboard.
+
+        :param connection: Conexão cujo banco será consultado.
+        :param size: Número de cursores do pool.
+        """
+        self.connection = connection
+        self.size = size
+        self._owns_connection = False
+        self._cursors = queue.Queue()
+        for _ in range(size):
+            self._cursors.put(connection.cursor())
+
+
+    @classmethod
+    def from_path(cls, db_path: str, settings: dict = None, size: int = None,
+                  instrumentation: Instrumentation = None, cache: QueryCache = None) -> 'DuckDBReaderPool':
+        """
+        Abre o banco somente para leitura e cria um pool de cursores sobre ele.
+
+        :param db_path: Caminho para o arquivo do banco de dados DuckDB.
+        :param settings: Opções de recursos do DuckDB (seção ``duckdb`` do settings.yaml).
+        :param size: Número de cursores. Se omitido, usa ``reader_pool_size`` das configurações.
+        :param instrumentation: Coletor de métricas das queries.
+        :param cache: Cache de resultados compartilhado pelos cursores.
+        """
+        settings = settings or {}
+        connection = DuckDBConnection(
+            db_path, instrumentation=instrumentation, settings=settings, read_only=True, cache=cache
+        )
+        pool = cls(connection, size or settings.get('reader_pool_size', 4))
+        pool._owns_connection = True
+        return pool
+
+
+    @contextmanager
+    def acquire(self):
+        """Reserva um cursor do pool, aguardando se todos estiverem em uso."""
+        cursor = self._cursors.get()
+        try:
+            yield cursor
+        finally:
+            self._cursors.put(cursor)
+
+
+    def sql(self, query: str, step: str = None, cache: bool = True, params: list = None) -> pd.DataFrame:
+        """
+        Executa uma query em um cursor livre do pool e retorna um DataFrame.
+
+        :param query: A consulta SQL a ser executada.
+        :param step: Nome da etapa nas métricas. Se omitido, é derivado da query.
+        :param cache: Se False, ignora o cache nesta consulta.
+        :param params: Parâmetros da query, executada como prepared statement do cursor.
+        """
+        with self.acquire() as cursor:
+            return cursor.sql(query, step=step, cache=cache, params=params)
+
+
+    def arrow(self, query: str, step: str = None, params: list = None) -> pa.Table:
+        """
+        Executa uma query em um cursor livre do pool e retorna uma tabela Arrow.
+
+        :param query: A consulta SQL a ser executada.
+        :param step: Nome da etapa nas métricas. Se omitido, é derivado da query.
+        :param params: Parâmetros da query, executada como prepared statement do cursor.
+        """
+        with self.acquire() as cursor:
+            return cursor.arrow(query, step=step, params=params)
+
+
+    def iter_batches(self, query: str, batch_size: int = None, step: str = None,
+                     params: list = None) -> Iterator[pa.RecordBatch]:
+        """
+        Itera sobre os resultados de uma query em lotes Arrow.
+
+        O cursor fica reservado até a leitura terminar ou o iterador ser fechado.
+
+        :param query: A consulta SQL a ser executada.
+        :param batch_size: Número de linhas por lote.
+        :param step: Nome da etapa nas métricas. Se omitido, é derivado da query.
+        :param params: Parâmetros da query, executada como prepared statement do cursor.
+        """
+        with self.acquire() as cursor:
+            yield from cursor.iter_batches(query, batch_size=batch_size, step=step, params=params)
+
+
+    def close(self) -> None:
+        """Fecha os cursores do pool e, se foi aberta pelo pool, a conexão."""
+        while not self._cursors.empty():
+            self._cursors.get().close()
+        if self._owns_connection:
+            self.connection.close()
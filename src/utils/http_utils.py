@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class CachedResponse:
+    def __init__(self, content: bytes, content_hash: str, status: str) -> None:
+        """
+        Resposta devolvida por ``HTTPClient.fetch``.
+
+        :param content: Corpo da resposta.
+        :param content_hash: Hash SHA-256 do corpo.
+        :param status: ``fresh`` (lida do cache dentro do TTL, sem requisição),
+            ``not_modified`` (304 na requisição condicional) ou ``downloaded``.
+        """
+        self.content = content
+        self.content_hash = content_hash
+        self.status = status
+
+
+    @property
+    def from_cache(self) -> bool:
+        """Indica se o corpo veio do cache em disco."""
+        return self.status != 'downloaded'
+
+
+class ResponseCache:
+    def __init__(self, cache_dir: str, ttl: float = 3600) -> None:
+        """
+        Inicializa o cache em disco das respostas HTTP.
+
+        Cada URL tem o corpo da última resposta e um JSON com o ETag, o Last-Modified,
+        o hash do corpo e o horário da última validação com o servidor.
+
+        :param cache_dir: Diretório do cache.
+        :param ttl: Tempo, em segundos, em que uma resposta é usada sem consultar o servidor.
+        """
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'ResponseCache':
+        """
+        Cria o cache a partir da seção ``extract.http_cache`` do settings.yaml.
+
+        :param config: Dicionário de configuração do projeto.
+        :return: O cache ou None se estiver desabilitado.
+        """
+        settings = config.get('extract', {}).get('http_cache', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(settings.get('cache_dir', 'data/cache/http'), ttl=settings.get('ttl', 3600))
+
+
+    def _path(self, url: str, suffix: str) -> Path:
+        """Retorna o arquivo da URL no cache com a extensão informada."""
+        return self.cache_dir / f"{hashlib.sha256(url.encode('utf-8')).hexdigest()}{suffix}"
+
+
+    @staticmethod
+    def _replace(path: Path, content: bytes) -> None:
+        """Grava um arquivo em um caminho temporário e o renomeia ao final."""
+        temp_path = path.with_name(f'.{path.name}.tmp-{os.getpid()}-{threading.get_ident()}')
+        temp_path.write_bytes(content)
+        os.replace(temp_path, path)
+
+
+    def entry(self, url: str) -> dict:
+        """
+        Retorna os metadados da resposta em cache de uma URL.
+
+        :param url: URL requisitada.
+        :return: Os metadados ou None se a URL não estiver em cache.
+        """
+        path = self._path(url, '.json')
+        if not path.exists() or not self._path(url, '.body').exists():
+            return None
+        with open(path) as file:
+            return json.load(file)
+
+
+    def is_fresh(self, entry: dict, ttl: float = None) -> bool:
+        """Indica se a resposta foi validada com o servidor há menos de ``ttl`` segundos."""
+        ttl = self.ttl if ttl is None else ttl
+        return time.time() - entry['validated_at'] < ttl
+
+
+    def read(self, url: str, entry: dict, status: str) -> CachedResponse:
+        """Lê o corpo em cache de uma URL."""
+        return CachedResponse(self._path(url, '.body').read_bytes(), entry['content_hash'], status)
+
+
+    def touch(self, url: str, entry: dict) -> None:
+        """Registra que a resposta em cache foi validada agora (resposta 304)."""
+        entry['validated_at'] = time.time()
+        self._replace(self._path(url, '.json'), json.dumps(entry).encode('utf-8'))
+
+
+    def store(self, url: str, response: requests.Response) -> CachedResponse:
+        """
+        Guarda uma resposta 200 e seus validadores.
+
+        :param url: URL requisitada.
+        :param response: Resposta do servidor.
+        """
+        content = response.content
+        content_hash = hashlib.sha256(content).hexdigest()
+        entry = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'validated_at': time.time(),
+        }
+        self._replace(self._path(url, '.body'), content)
+        self._replace(self._path(url, '.json'), json.dumps(entry).encode('utf-8'))
+        return CachedResponse(content, content_hash, 'downloaded')
+
+
+class HTTPClient:
+    def __init__(self, settings: dict, cache: ResponseCache = None) -> None:
+        """
+        Inicializa um cliente HTTP com sessão keep-alive, timeouts e retentativas.
+
+        :param settings: Configuração da fonte (timeouts, retentativas, backoff, concorrência,
+            headers e ``cache_ttl``, que sobrescreve o TTL do cache para a fonte).
+        :param cache: Cache em disco das respostas usado por ``fetch``. Opcional.
+        """
+        self.settings = settings
+        self.cache = cache
+        self.timeout = (settings.get('connect_timeout', 5), settings.get('timeout', 30))
+        self.max_concurrency = settings.get('max_concurrency', 1)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self.session = self.create_session()
+
+
+    def create_session(self) -> requests.Session:
+        """Cria uma sessão com pool de conexões e retentativas com backoff exponencial."""
+        retry = Retry(
+            total=self.settings.get('retries', 3),
+            backoff_factor=self.settings.get('backoff_factor', 0.5),
+            status_forcelist=self.settings.get('retry_status', [429, 500, 502, 503, 504]),
+            allowed_methods=['GET', 'HEAD'],
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_concurrency,
+            max_retries=retry,
+        )
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(self.settings.get('headers', {}))
+        return session
+
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """
+        Executa um GET respeitando o limite de requisições simultâneas da fonte.
+
+        :param url: URL a ser requisitada.
+        :return: A resposta HTTP, já validada com ``raise_for_status``.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        with self._semaphore:
+            response = self.session.get(url, **kwargs)
+        response.raise_for_status()
+        return response
+
+
+    def fetch(self, url: str, **kwargs) -> CachedResponse:
+        """
+        Executa um GET usando o cache em disco das respostas.
+
+        Dentro do TTL a resposta em cache é devolvida sem consultar o servidor; depois
+        dele é feita uma requisição condicional (``If-None-Match``/``If-Modified-Since``)
+        e, se o servidor responder 304, o corpo em cache é reaproveitado.
+
+        :param url: URL a ser requisitada.
+        :return: O corpo da resposta, seu hash e a origem (cache ou servidor).
+        """
+        if self.cache is None:
+            content = self.get(url, **kwargs).content
+            return CachedResponse(content, hashlib.sha256(content).hexdigest(), 'downloaded')
+
+        entry = self.cache.entry(url)
+        if entry and self.cache.is_fresh(entry, self.settings.get('cache_ttl')):
+            return self.cache.read(url, entry, 'fresh')
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        response = self.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and entry:
+            self.cache.touch(url, entry)
+            return self.cache.read(url, entry, 'not_modified')
+        return self.cache.store(url, response)
+
+
+    def close(self) -> None:
+        """Fecha a sessão e libera as conexões do pool."""
+        self.session.close()
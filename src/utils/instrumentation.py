@@ -0,0 +1,184 @@
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+
+class Instrumentation:
+    def __init__(self, enabled: bool = True, profiling: bool = False, profiling_dir: str = 'logs/profiles') -> None:
+        """
+        Inicializa a coleta de métricas de execução do pipeline.
+
+        :param enabled: Se False, nenhuma métrica é registrada.
+        :param profiling: Se True, grava o profiling JSON do DuckDB de cada statement.
+        :param profiling_dir: Diretório onde os arquivos de profiling são gravados.
+        """
+        self.enabled = enabled
+        self.profiling = enabled and profiling
+        self.profiling_dir = Path(profiling_dir)
+        self.started_at = datetime.now()
+        self.steps = []
+        self._sinks = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'Instrumentation':
+        """
+        Cria a instrumentação a partir da seção ``instrumentation`` do settings.yaml.
+
+        :param config: Dicionário de configuração do projeto.
+        """
+        settings = config.get('instrumentation', {})
+        return cls(
+            enabled=settings.get('enabled', True),
+            profiling=settings.get('profiling', False),
+            profiling_dir=settings.get('profiling_dir', 'logs/profiles'),
+        )
+
+
+    def add_sink(self, sink: Callable[[dict], None]) -> None:
+        """
+        Registra um destino externo de métricas, chamado a cada etapa registrada.
+
+        :param sink: Função que recebe o dicionário da etapa (ex.: envio para StatsD ou Prometheus).
+        """
+        self._sinks.append(sink)
+
+
+    @property
+    def current_stage(self) -> Optional[str]:
+        """Estágio em execução na thread atual."""
+        return getattr(self._local, 'stage', None)
+
+
+    @staticmethod
+    def step_name(query: str) -> str:
+        """
+        Deriva um nome de etapa a partir da query (ex.: ``INSERT silver.usuarios``).
+
+        :param query: A consulta SQL.
+        """
+        statement = ' '.join(query.split())
+        match = re.match(
+            r'(?i)(INSERT(?: OR REPLACE)? INTO|CREATE(?: OR REPLACE)?(?: TEMP| TEMPORARY)? (?:TABLE|VIEW|SCHEMA)'
+            r'(?: IF NOT EXISTS)?|DELETE FROM|UPDATE|COPY \(SELECT \* FROM|COPY|DROP TABLE(?: IF EXISTS)?)\s+([\w."]+)',
+            statement,
+        )
+        if match:
+            verb = match.group(1).split()[0].upper()
+            return f"{verb} {match.group(2)}"
+        return statement[:60]
+
+
+    def profile_path(self) -> Path:
+        """Retorna o caminho do arquivo de profiling da próxima etapa."""
+        self.profiling_dir.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            index = len(self.steps) + 1
+        return self.profiling_dir / f"{self.started_at:%Y%m%d_%H%M%S}_{index:04d}.json"
+
+
+    def record(self, step: str, seconds: float, rows: Optional[int] = None, kind: str = 'statement',
+               profile: Optional[Path] = None) -> None:
+        """
+        Registra uma etapa executada e a repassa aos destinos externos.
+
+        :param step: Nome da etapa.
+        :param seconds: Tempo de execução em segundos.
+        :param rows: Linhas afetadas ou retornadas, quando disponível.
+        :param kind: ``statement`` para queries, ``cache`` para leituras servidas do cache de
+            resultados ou ``stage`` para blocos do pipeline.
+        :param profile: Caminho do profiling JSON do DuckDB, quando habilitado.
+        """
+        if not self.enabled:
+            return
+        entry = {
+            'stage': self.current_stage,
+            'step': step,
+            'kind': kind,
+            'seconds': round(seconds, 6),
+            'rows': rows,
+        }
+        if profile:
+            entry['profile'] = str(profile)
+        with self._lock:
+            self.steps.append(entry)
+        for sink in self._sinks:
+            try:
+                sink(entry)
+            except Exception as error:
+                print(f"Falha ao enviar métricas para o sink {sink}: {error}")
+
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Agrupa as etapas executadas no bloco sob um estágio e mede o tempo total do bloco.
+
+        :param name: Nome do estágio (ex.: ``silver``).
+        """
+        previous = self.current_stage
+        self._local.stage = name if previous is None else f"{previous}.{name}"
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(name, elapsed, kind='stage')
+            self._local.stage = previous
+
+
+    def report(self) -> dict:
+        """Retorna o relatório da execução com todas as etapas registradas."""
+        finished_at = datetime.now()
+        return {
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': finished_at.isoformat(timespec='seconds'),
+            'total_seconds': round((finished_at - self.started_at).total_seconds(), 3),
+            'steps': list(self.steps),
+        }
+
+
+    def summary(self, top: int = 20) -> str:
+        """
+        Retorna uma tabela com os statements mais demorados e o tempo de cada estágio.
+
+        :param top: Número de statements exibidos.
+        """
+        statements = sorted((s for s in self.steps if s['kind'] == 'statement'), key=lambda s: -s['seconds'])
+        stages = [s for s in self.steps if s['kind'] == 'stage']
+        total = sum(s['seconds'] for s in statements) or 1.0
+
+        lines = [f"{'estágio':<20} {'etapa':<45} {'segundos':>10} {'linhas':>12} {'%':>6}"]
+        lines.append('-' * len(lines[0]))
+        for s in statements[:top]:
+            rows = '' if s['rows'] is None else s['rows']
+            lines.append(
+                f"{(s['stage'] or '-')[:20]:<20} {s['step'][:45]:<45} {s['seconds']:>10.3f} {rows:>12} "
+                f"{100 * s['seconds'] / total:>5.1f}%"
+            )
+        if stages:
+            lines.append('')
+            for s in stages:
+                lines.append(f"{(s['stage'] or '-')[:20]:<20} {'[' + s['step'] + ']':<45} {s['seconds']:>10.3f}")
+        return '\n'.join(lines)
+
+
+    def save(self, report_dir: str) -> Path:
+        """
+        Grava o relatório da execução em JSON.
+
+        :param report_dir: Diretório dos relatórios.
+        :return: O caminho do arquivo gravado.
+        """
+        path = Path(report_dir) / f"run_{self.started_at:%Y%m%d_%H%M%S}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+        return path
@@ -0,0 +1,248 @@
+import copy
+import os
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+
+class SnapshotPublisher:
+    def __init__(self, config: dict, keep: int = 3, resume: bool = True) -> None:
+        """
+        Inicializa o publicador de snapshots do banco e da camada gold.
+
+        Cada execução do pipeline constrói uma versão nova, isolada da publicada, em
+        ``gold/versions/<versao>/``: uma cópia do banco em ``db/`` e as exportações em
+        ``gold/``. ``paths.db`` e ``gold/current`` são links fixos para o banco e as
+        exportações de ``gold/versions/current``, e publicar uma versão troca apenas esse
+        link, de forma atômica, de modo que os leitores nunca disputam o lock do banco
+        com o pipeline nem encontram o banco de uma versão e as tabelas de outra.
+
+        :param config: Dicionário de configuração do projeto.
+        :param keep: Número de versões mantidas, incluindo a publicada, para rollback.
+        :param resume: Se True, uma versão cuja construção falhou é mantida e retomada
+            na execução seguinte (``pipeline.resume``).
+        """
+        self.config = config
+        self.keep = max(keep, 1)
+        self.resume = resume
+        self.db_path = Path(config['paths']['db'])
+        self.gold_path = Path(config['paths']['gold'])
+        self.versions_path = self.gold_path / 'versions'
+        self.current_path = self.versions_path / 'current'
+        self.current_gold_path = self.gold_path / 'current'
+        self.version = None
+
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'SnapshotPublisher':
+        """
+        Cria o publicador a partir da seção ``publish`` do settings.yaml.
+
+        :param config: Dicionário de configuração do projeto.
+        :return: O publicador ou None se estiver desabilitado.
+        """
+        settings = config.get('publish', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(config, keep=settings.get('keep', 3), resume=config.get('pipeline', {}).get('resume', True))
+
+
+    def versions(self) -> list:
+        """Retorna as versões construídas, da mais antiga para a mais recente."""
+        if not self.versions_path.exists():
+            return []
+        return sorted(
+            path.name for path in self.versions_path.iterdir()
+            if not path.is_symlink() and self._db_file(path.name).exists()
+        )
+
+
+    def current(self) -> str:
+        """Retorna a versão publicada ou None se nenhuma versão foi publicada."""
+        if not self.current_path.is_symlink():
+            return None
+        return Path(os.readlink(self.current_path)).name
+
+
+    def _db_file(self, version: str) -> Path:
+        """Retorna o arquivo do banco de uma versão."""
+        return self.versions_path / version / 'db' / self.db_path.name
+
+
+    def _gold_dir(self, version: str) -> Path:
+        """Retorna o diretório das exportações gold de uma versão."""
+        return self.versions_path / version / 'gold'
+
+
+    def _shards_dir(self, version: str) -> Path:
+        """Retorna o diretório dos bancos dos shards de usuários de uma versão."""
+        return self._db_file(version).with_suffix('.shards')
+
+
+    def _staging_marker(self, version: str) -> Path:
+        """Retorna o marcador de uma versão ainda não publicada."""
+        return self.versions_path / version / '.staging'
+
+
+    @staticmethod
+    def _link_tree(source: Path, target: Path) -> None:
+        """
+        Replica um diretório com hard links, copiando os arquivos se não for possível.
+
+        O ``DataLoader`` substitui os arquivos por rename, então a versão anterior nunca
+        é alterada pelos arquivos regravados na nova versão.
+        """
+        for path in source.rglob('*'):
+            destination = target / path.relative_to(source)
+            if path.is_dir():
+                destination.mkdir(parents=True, exist_ok=True)
+                continue
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(path, destination)
+            except OSError:
+                shutil.copy2(path, destination)
+
+
+    def prepare(self) -> dict:
+        """
+        Cria a versão de staging a partir da versão publicada.
+
+        O banco publicado é copiado, para que a execução continue incremental, e as
+        exportações gold publicadas são replicadas com hard links, para que as tabelas
+        sem alterações não sejam regravadas. Se a construção de uma versão falhou e
+        ``resume`` está habilitado, essa versão é retomada em vez de criar uma nova.
+
+        :return: Uma cópia da configuração com ``paths.db`` e ``paths.gold`` apontando
+            para a versão de staging.
+        """
+        current = self.current()
+        pendentes = [version for version in self.versions() if self._staging_marker(version).exists()]
+        if self.resume and pendentes:
+            self.version = pendentes[-1]
+            print(f"Retomando a construção da versão {self.version}.")
+            return self._staged_config()
+
+        self.version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        db_file = self._db_file(self.version)
+        gold_dir = self._gold_dir(self.version)
+        db_file.parent.mkdir(parents=True)
+        gold_dir.mkdir(parents=True)
+
+        if self.db_path.exists():
+            shutil.copy2(self.db_path.resolve(), db_file)
+            wal_path = Path(f'{self.db_path.resolve()}.wal')
+            if wal_path.exists():
+                shutil.copy2(wal_path, f'{db_file}.wal')
+            # Os bancos dos shards (sharding.enabled) acompanham o banco, para que a nova
+            # versão continue incremental também nos shards.
+            shards_path = self.db_path.resolve().with_suffix('.shards')
+            if shards_path.is_dir():
+                shutil.copytree(shards_path, self._shards_dir(self.version))
+
+        if current:
+            self._link_tree(self._gold_dir(current), gold_dir)
+        elif (self.gold_path / '_manifest.json').exists():
+            # Primeira publicação: parte das exportações gravadas diretamente em gold/.
+            for path in self.gold_path.iterdir():
+                if path.name in ('versions', 'current'):
+                    continue
+                if path.is_dir():
+                    self._link_tree(path, gold_dir / path.name)
+                else:
+                    os.link(path, gold_dir / path.name)
+
+        self._staging_marker(self.version).touch()
+        print(f"Construindo a versão {self.version} em {db_file} e {gold_dir}.")
+        return self._staged_config()
+
+
+    def _staged_config(self) -> dict:
+        """Retorna uma cópia da configuração com os caminhos da versão de staging."""
+        staged = copy.deepcopy(self.config)
+        staged['paths']['db'] = str(self._db_file(self.version))
+        staged['paths']['gold'] = str(self._gold_dir(self.version))
+        return staged
+
+
+    @staticmethod
+    def _swap_link(link: Path, target: str) -> None:
+        """Aponta um link simbólico para ``target`` de forma atômica."""
+        temp_link = link.with_name(f'.{link.name}.tmp-{os.getpid()}')
+        if temp_link.is_symlink():
+            temp_link.unlink()
+        os.symlink(target, temp_link)
+        os.replace(temp_link, link)
+
+
+    def _point_to(self, version: str) -> None:
+        """
+        Publica uma versão trocando o link ``gold/versions/current``.
+
+        O banco e as exportações são lidos pelos links fixos ``paths.db`` e
+        ``gold/current``, que passam por ``current``, então ambos mudam de versão na
+        mesma troca. Os links fixos só são criados (ou corrigidos) depois dela, na
+        primeira publicação, quando ``paths.db`` ainda é o banco original.
+        """
+        self._swap_link(self.current_path, version)
+        for link, target in [
+            (self.current_gold_path, self.current_path / 'gold'),
+            (self.db_path, self.current_path / 'db' / self.db_path.name),
+        ]:
+            link.parent.mkdir(parents=True, exist_ok=True)
+            target = os.path.relpath(target, link.parent)
+            if not link.is_symlink() or os.readlink(link) != target:
+                self._swap_link(link, target)
+
+
+    def publish(self) -> None:
+        """
+        Publica a versão de staging e remove as versões mais antigas que ``keep``.
+
+        Deve ser chamado depois que todas as etapas terminaram e o banco foi fechado.
+        """
+        self._staging_marker(self.version).unlink(missing_ok=True)
+        self._point_to(self.version)
+        print(f"Versão {self.version} publicada.")
+        for version in self.versions()[:-self.keep]:
+            self._remove(version)
+
+
+    def _remove(self, version: str) -> None:
+        """Remove os arquivos de uma versão."""
+        shutil.rmtree(self.versions_path / version, ignore_errors=True)
+
+
+    def discard(self) -> None:
+        """
+        Trata a versão de staging de uma execução que falhou; a versão publicada é mantida.
+
+        Com ``resume``, a versão é mantida para ser retomada; caso contrário, é removida.
+        """
+        if self.resume:
+            print(f"Versão {self.version} mantida para ser retomada na próxima execução.")
+        elif self.version and self.version != self.current():
+            self._remove(self.version)
+            print(f"Versão {self.version} descartada.")
+
+
+    def rollback(self, version: str = None) -> str:
+        """
+        Publica novamente uma versão anterior.
+
+        :param version: Versão a publicar. Se omitida, publica a anterior à atual.
+        :return: A versão publicada.
+        :raises ValueError: Se a versão não existir ou não houver versão anterior.
+        """
+        versions = [v for v in self.versions() if not self._staging_marker(v).exists()]
+        if version is None:
+            current = self.current()
+            anteriores = [v for v in versions if current is None or v < current]
+            if not anteriores:
+                raise ValueError("Não há versão anterior para rollback.")
+            version = anteriores[-1]
+        elif version not in versions:
+            raise ValueError(f"Versão '{version}' não encontrada. Versões disponíveis: {versions}.")
+        self._point_to(version)
+        print(f"Versão {version} publicada (rollback).")
+        return version
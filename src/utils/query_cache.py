@@ -0,0 +1,290 @@
+import glob
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+
+# Statements que alteram uma tabela e o nome da tabela alterada.
+WRITE_STATEMENT = re.compile(
+    r'(?i)^\s*(?:INSERT(?:\s+OR\s+(?:REPLACE|IGNORE))?\s+INTO|CREATE(?:\s+OR\s+REPLACE)?(?:\s+TEMP|\s+TEMPORARY)?'
+    r'\s+(?:TABLE|VIEW)(?:\s+IF\s+NOT\s+EXISTS)?|DELETE\s+FROM|UPDATE|DROP\s+(?:TABLE|VIEW)(?:\s+IF\s+EXISTS)?'
+    r'|ALTER\s+TABLE|TRUNCATE(?:\s+TABLE)?|COPY)\s+([\w."]+)'
+)
+
+# Statements que não alteram dados.
+READ_STATEMENT = re.compile(r'(?i)^\s*(?:SELECT|WITH|FROM|PRAGMA|SET|EXPLAIN|DESCRIBE|SHOW|SUMMARIZE|COPY\s*\()')
+
+# Statements que não alteram o conteúdo de nenhuma tabela existente.
+DDL_STATEMENT = re.compile(
+    r'(?i)^\s*(?:CREATE(?:\s+OR\s+REPLACE)?\s+(?:SCHEMA|MACRO|FUNCTION|SEQUENCE)'
+    r'|CREATE(?:\s+TEMP|\s+TEMPORARY)?\s+(?:TABLE|VIEW)\s+IF\s+NOT\s+EXISTS|ATTACH|DETACH|CHECKPOINT)\b'
+)
+
+FILE_LITERAL = re.compile(r"'([^']+\.(?:parquet|csv|json|arrow))'", re.IGNORECASE)
+TABLE_REFERENCE = re.compile(r'(?i)\b(?:FROM|JOIN)\s+([\w."]+)')
+
+# Literais de texto e identificadores entre aspas, preservados pela normalização.
+QUOTED = re.compile(r'''('(?:[^']|'')*'|"(?:[^"]|"")*")''')
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = 256, max_mb: float = 256, persist_dir: str = None) -> None:
+        """
+        Inicializa o cache de resultados de queries.
+
+        Cada resultado é indexado pela query normalizada e pela versão de cada tabela
+        consultada. A versão de uma tabela é incrementada a cada escrita feita pela
+        conexão, de modo que um resultado em cache nunca fica desatualizado.
+
+        :param max_entries: Número máximo de resultados em memória.
+        :param max_mb: Tamanho máximo, em MB, dos resultados em memória.
+        :param persist_dir: Diretório para persistir os resultados em Arrow. Opcional.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.persist_dir = Path(persist_dir) if persist_dir else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._versions = {}
+        self._epoch = 0
+        self._tables = {}
+        self._lock = threading.Lock()
+        if self.persist_dir:
+            self.persist_dir.mkdir(parents=True, exist_ok=True)
+
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'QueryCache':
+        """
+        Cria o cache a partir da seção ``query_cache`` do settings.yaml.
+
+        :param config: Dicionário de configuração do projeto.
+        :return: O cache ou None se estiver desabilitado.
+        """
+        settings = config.get('query_cache', {})
+        if not settings.get('enabled', False):
+            return None
+        return cls(
+            max_entries=settings.get('max_entries', 256),
+            max_mb=settings.get('max_mb', 256),
+            persist_dir=settings.get('persist_dir'),
+        )
+
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+        Normaliza espaços em branco e o ponto e vírgula final da query.
+
+        Os espaços dentro de literais e identificadores entre aspas são preservados, para
+        que queries que diferem só neles não compartilhem o resultado.
+        """
+        partes = QUOTED.split(query)
+        partes[::2] = [re.sub(r'\s+', ' ', parte) for parte in partes[::2]]
+        return ''.join(partes).strip().rstrip(';').strip()
+
+
+    @staticmethod
+    def statements(query: str) -> list:
+        """Separa os statements de uma query pelos ``;`` fora de literais e identificadores."""
+        statements = ['']
+        for i, parte in enumerate(QUOTED.split(query)):
+            if i % 2:
+                statements[-1] += parte
+                continue
+            pedacos = parte.split(';')
+            statements[-1] += pedacos[0]
+            statements.extend(pedacos[1:])
+        return [statement for statement in statements if statement.strip()]
+
+
+    @staticmethod
+    def _table_name(name: str) -> str:
+        """Reduz ``schema.tabela`` ao nome da tabela em minúsculas."""
+        return name.replace('"', '').split('.')[-1].lower()
+
+
+    @classmethod
+    def written_tables(cls, query: str) -> set:
+        """
+        Retorna as tabelas cujo conteúdo é alterado pelos statements de uma query.
+
+        Criações com ``IF NOT EXISTS`` e statements que não tocam em tabelas (esquemas,
+        macros, ``ATTACH``) são ignorados; um statement de escrita não reconhecido é
+        indicado por ``*``.
+
+        :param query: A query executada, com um ou mais statements.
+        """
+        tables = set()
+        for statement in cls.statements(query):
+            if READ_STATEMENT.match(statement) or DDL_STATEMENT.match(statement):
+                continue
+            match = WRITE_STATEMENT.match(statement)
+            tables.add(cls._table_name(match.group(1)) if match else '*')
+        return tables
+
+
+    def tables(self, query: str) -> set:
+        """
+        Retorna as tabelas consultadas pela query.
+
+        O resultado é memorizado por query para não repetir o parse a cada leitura.
+
+        :param query: A consulta SQL.
+        """
+        if query not in self._tables:
+            if len(self._tables) >= 4096:
+                self._tables.clear()
+            try:
+                names = duckdb.get_table_names(query)
+            except duckdb.Error:
+                names = TABLE_REFERENCE.findall(query)
+            self._tables[query] = {self._table_name(name) for name in names}
+        return self._tables[query]
+
+
+    @staticmethod
+    def _files_stamp(query: str) -> tuple:
+        """Retorna a data de modificação e o tamanho dos arquivos lidos pela query."""
+        stamp = []
+        for pattern in sorted(set(FILE_LITERAL.findall(query))):
+            for path in sorted(glob.glob(pattern)):
+                stat = Path(path).stat()
+                stamp.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+
+
+    def key(self, query: str, db_stamp: tuple = ()) -> str:
+        """
+        Calcula a chave de cache de uma query.
+
+        :param query: A consulta SQL.
+        :param db_stamp: Identificação do arquivo do banco (caminho, data de modificação
+            e tamanho) ao abrir a conexão, que invalida resultados persistidos por outro
+            processo antes de uma escrita. Desnecessária sem ``persist_dir``, já que as
+            versões das tabelas cobrem as escritas da própria conexão.
+        """
+        query = self.normalize(query)
+        tables = self.tables(query)
+        with self._lock:
+            versions = tuple(sorted((table, self._versions.get(table, 0)) for table in tables))
+            epoch = self._epoch
+        content = repr((query, versions, epoch, db_stamp, self._files_stamp(query)))
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+    def get(self, key: str) -> pd.DataFrame:
+        """
+        Retorna um resultado em cache, buscando no disco se não estiver em memória.
+
+        O DataFrame retornado é compartilhado entre as leituras e não deve ser alterado.
+
+        :param key: Chave calculada por ``key``.
+        :return: O DataFrame em cache ou None.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+
+        if self.persist_dir and (self.persist_dir / f'{key}.arrow').exists():
+            df = feather.read_feather(self.persist_dir / f'{key}.arrow')
+            self._store(key, df)
+            with self._lock:
+                self.disk_hits += 1
+            return df
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+
+    def _store(self, key: str, df: pd.DataFrame) -> None:
+        """Guarda um resultado em memória, removendo os menos usados se necessário."""
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (df, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Guarda o resultado de uma query.
+
+        :param key: Chave calculada por ``key``.
+        :param df: Resultado da query.
+        """
+        self._store(key, df)
+        if self.persist_dir:
+            path = self.persist_dir / f'{key}.arrow'
+            temp_path = path.with_suffix('.tmp')
+            feather.write_feather(pa.Table.from_pandas(df, preserve_index=False), temp_path)
+            temp_path.replace(path)
+
+
+    def invalidate(self, query: str = None) -> None:
+        """
+        Incrementa a versão das tabelas alteradas pelos statements de uma query.
+
+        Statements de leitura não invalidam nada; statements que não são reconhecidos
+        invalidam todo o cache.
+
+        :param query: A query executada, com um ou mais statements. Se omitida, invalida
+            todo o cache.
+        """
+        if query is None:
+            with self._lock:
+                self._epoch += 1
+            return
+        for statement in self.statements(query):
+            match = WRITE_STATEMENT.match(statement)
+            with self._lock:
+                if match:
+                    table = self._table_name(match.group(1))
+                    self._versions[table] = self._versions.get(table, 0) + 1
+                elif not READ_STATEMENT.match(statement):
+                    self._epoch += 1
+
+
+    def clear(self) -> None:
+        """Remove todos os resultados em memória e no disco."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._epoch += 1
+        if self.persist_dir:
+            for path in self.persist_dir.glob('*.arrow'):
+                path.unlink()
+
+
+    def stats(self) -> dict:
+        """Retorna os contadores do cache."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_mb': round(self._bytes / 1024 / 1024, 2),
+            }
@@ -0,0 +1,26 @@
+from pathlib import Path
+
+import pytest
+
+from src.bench.generator import BronzeGenerator
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> dict:
+    """Configuração do pipeline sobre um bronze sintético pequeno, em um diretório temporário."""
+    generator = BronzeGenerator(tmp_path, tickers=8, days=5, users=2, trades=12)
+    generator.generate()
+    (tmp_path / 'gold').mkdir()
+    return {
+        'paths': {
+            'bronze': str(generator.bronze_path),
+            'gold': str(tmp_path / 'gold'),
+            'db': str(tmp_path / 'database.db'),
+            'usuarios_negociacoes': str(generator.fixtures_path / 'usuarios_negociacoes.xlsx'),
+        },
+        'screener': {
+            'regras': {'cotacao_positiva': 'cotacao > 0', 'p_vp_abaixo_de_1': 'p_vp < 1'},
+            'estrategias': {'oportunidades': ['cotacao_positiva', 'p_vp_abaixo_de_1']},
+        },
+        'analytics': {'janelas': [3]},
+    }
@@ -0,0 +1,84 @@
+import copy
+import shutil
+from pathlib import Path
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.elt.pipeline import Pipeline
+from src.utils.db_utils import DuckDBConnection
+
+TABELAS = ['fact_indicadores_janelas', 'fact_percentis_setor', 'fact_setores']
+
+
+def _run(config: dict, full_refresh: bool = False) -> None:
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config, full_refresh=full_refresh).run(extract=False)
+    finally:
+        db_connection.close()
+
+
+def _checksums(config: dict) -> dict:
+    db_connection = DuckDBConnection(config['paths']['db'], read_only=True)
+    try:
+        return {
+            tabela: db_connection.sql(
+                f"SELECT COUNT(*) AS linhas, SUM(HASH(t))::VARCHAR AS hash FROM gold.{tabela} AS t", cache=False
+            ).to_dict('records')
+            for tabela in TABELAS
+        }
+    finally:
+        db_connection.close()
+
+
+def test_alterar_a_configuracao_recalcula_os_agregados(config, tmp_path):
+    _run(config)
+    alterada = copy.deepcopy(config)
+    alterada['analytics'] = {'janelas': [2, 4], 'indicadores': ['cotacao', 'p_l']}
+    _run(alterada)
+
+    referencia = copy.deepcopy(alterada)
+    referencia['paths']['db'] = str(tmp_path / 'referencia.db')
+    _run(referencia, full_refresh=True)
+
+    assert _checksums(alterada) == _checksums(referencia)
+
+
+def test_janelas_incrementais_cobrem_dias_uteis(config, tmp_path):
+    bronze = Path(config['paths']['bronze'])
+    particoes = sorted((bronze / 'fundamentus').glob('extracted_date=*'))
+
+    # Um ticker sem snapshot em uma data intermediária.
+    arquivo = next(particoes[2].glob('*.parquet'))
+    tabela = pq.read_table(arquivo)
+    ticker = tabela['ticker'][0].as_py()
+    pq.write_table(tabela.filter(pc.not_equal(tabela['ticker'], ticker)), arquivo)
+
+    escondidas = tmp_path / 'escondidas'
+    escondidas.mkdir()
+    for particao in particoes[-2:]:
+        shutil.move(particao, escondidas / particao.name)
+    _run(config)
+    for particao in escondidas.iterdir():
+        shutil.move(particao, bronze / 'fundamentus' / particao.name)
+    _run(config)
+
+    referencia = copy.deepcopy(config)
+    referencia['paths']['db'] = str(tmp_path / 'referencia.db')
+    _run(referencia, full_refresh=True)
+    assert _checksums(config) == _checksums(referencia)
+
+    # A janela de 3 dias úteis que termina logo após a lacuna tem só dois snapshots.
+    db_connection = DuckDBConnection(config['paths']['db'], read_only=True)
+    try:
+        observacoes = db_connection.sql(f"""
+            SELECT j.observacoes
+            FROM gold.fact_indicadores_janelas AS j
+            JOIN gold.dim_acoes AS a ON j.acao_id = a.id
+            WHERE a.ticker = '{ticker}' AND j.indicador = 'cotacao' AND j.janela = 3
+            ORDER BY j.tempo_id
+        """, cache=False)['observacoes'].tolist()
+    finally:
+        db_connection.close()
+    assert observacoes == [1, 2, 2, 2]
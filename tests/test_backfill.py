@@ -0,0 +1,52 @@
+from datetime import date
+from pathlib import Path
+
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from src.elt.pipeline import Pipeline
+from src.utils.db_utils import DuckDBConnection
+
+
+def _run(config: dict, **kwargs) -> None:
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config).run(extract=False, **kwargs)
+    finally:
+        db_connection.close()
+
+
+def _indicadores(config: dict):
+    db_connection = DuckDBConnection(config['paths']['db'], read_only=True)
+    try:
+        return db_connection.sql("""
+            SELECT tempo_id, acao_id, cotacao, p_l
+            FROM gold.fact_indicadores
+            ORDER BY tempo_id, acao_id
+        """, cache=False)
+    finally:
+        db_connection.close()
+
+
+def test_backfill_da_ultima_particao_atualiza_os_indicadores(config):
+    _run(config)
+    antes = _indicadores(config)
+
+    particoes = sorted((Path(config['paths']['bronze']) / 'fundamentus').glob('extracted_date=*'))
+    ultima = date.fromisoformat(particoes[-1].name.split('=', 1)[1])
+    tempo_id = int(ultima.strftime('%Y%m%d'))
+
+    # Recarrega a última partição com as cotações corrigidas.
+    for arquivo in particoes[-1].glob('*.parquet'):
+        tabela = pq.read_table(arquivo)
+        indice = tabela.schema.get_field_index('cotacao')
+        pq.write_table(tabela.set_column(indice, 'cotacao', pc.multiply(tabela['cotacao'], 2)), arquivo)
+    _run(config, inicio=ultima, fim=ultima)
+
+    depois = _indicadores(config)
+    anteriores = antes['tempo_id'] != tempo_id
+    assert depois[depois['tempo_id'] != tempo_id].reset_index(drop=True).equals(antes[anteriores].reset_index(drop=True))
+    recarregada = depois[depois['tempo_id'] == tempo_id].reset_index(drop=True)
+    esperada = antes[~anteriores].reset_index(drop=True)
+    assert len(recarregada) == len(esperada) > 0
+    assert (recarregada['cotacao'] == esperada['cotacao'] * 2).all()
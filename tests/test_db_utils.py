@@ -0,0 +1,31 @@
+from datetime import date
+
+from src.utils.db_utils import DuckDBConnection
+
+
+def test_parametros_sao_passados_sem_conversao_em_literais(tmp_path):
+    db_connection = DuckDBConnection(tmp_path / 'database.db')
+    try:
+        db_connection.execute("CREATE TABLE t (texto VARCHAR, data DATE, valores INTEGER[])")
+        db_connection.execute("INSERT INTO t VALUES ($1, $2, $3)", params=["it's -- ok", date(2024, 1, 2), [1, 2]])
+        db_connection.execute("INSERT INTO t VALUES (?, ?, ?)", params=[None, None, None])
+
+        df = db_connection.sql("SELECT * FROM t WHERE texto = $1 OR ($1 IS NULL AND texto IS NULL)", params=["it's -- ok"])
+        assert df['texto'].tolist() == ["it's -- ok"]
+        assert df['data'][0].date() == date(2024, 1, 2)
+        assert list(df['valores'][0]) == [1, 2]
+        assert db_connection.sql("SELECT COUNT(*) AS n FROM t WHERE texto IS NOT DISTINCT FROM ?", params=[None])['n'][0] == 1
+    finally:
+        db_connection.close()
+
+
+def test_statements_preparados_sao_limitados_por_conexao(tmp_path, monkeypatch):
+    monkeypatch.setattr(DuckDBConnection, 'MAX_PREPARED', 2)
+    db_connection = DuckDBConnection(tmp_path / 'database.db')
+    try:
+        for i in range(4):
+            assert db_connection.arrow(f"SELECT ? + {i} AS x", params=[1])['x'][0].as_py() == 1 + i
+        db_connection.arrow("SELECT ? + 2 AS x", params=[1])
+        assert list(db_connection._prepared) == ["SELECT ? + 3 AS x", "SELECT ? + 2 AS x"]
+    finally:
+        db_connection.close()
@@ -0,0 +1,19 @@
+import pytest
+
+from src.elt.transformations import GoldTransformer
+from src.utils.db_utils import DuckDBConnection
+
+
+@pytest.mark.parametrize('feriados, dias_uteis', [([], 5), (['2024-09-18'], 4)])
+def test_dias_uteis_da_dim_tempo(config, feriados, dias_uteis):
+    config['tempo'] = {'inicio': '2024-09-16', 'fim': '2024-09-22', 'feriados_fixos': [], 'feriados': feriados}
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        transformer = GoldTransformer(db_connection, config)
+        transformer.create_tables()
+        df = db_connection.sql("SELECT dia_util, dia_util_ordinal FROM gold.dim_tempo ORDER BY id", cache=False)
+    finally:
+        db_connection.close()
+
+    assert int(df['dia_util'].sum()) == dias_uteis
+    assert df['dia_util_ordinal'].iloc[-1] == dias_uteis
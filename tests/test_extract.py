@@ -0,0 +1,45 @@
+import copy
+import threading
+from datetime import date
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pyarrow.parquet as pq
+import pytest
+
+from src.elt.extract import DataExtractor
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def fixtures_url(config):
+    fixtures_path = Path(config['paths']['usuarios_negociacoes']).parent
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(_QuietHandler, directory=str(fixtures_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize('http_cache', [False, True])
+def test_resposta_identica_nao_regrava_o_snapshot(config, fixtures_url, tmp_path, http_cache):
+    config = copy.deepcopy(config)
+    config['extract'] = {
+        'sources': {'brapi': {'url': f'{fixtures_url}/brapi.json', 'cache_ttl': 0}},
+        'http_cache': {'enabled': http_cache, 'cache_dir': str(tmp_path / 'cache')},
+    }
+
+    extractor = DataExtractor(config)
+    extractor.extract_brapi()
+    particao = Path(config['paths']['bronze']) / 'brapi' / f'extracted_date={date.today()}' / 'data.parquet'
+    gravada = particao.stat().st_mtime_ns
+    assert pq.read_schema(particao).metadata[b'content_hash']
+
+    extractor.extract_brapi()
+    extractor.close()
+    assert particao.stat().st_mtime_ns == gravada
@@ -0,0 +1,91 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src.utils.http_utils import HTTPClient, ResponseCache
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    """Responde com os status de ``server.falhas`` e depois com ``server.corpo`` e seu ETag."""
+
+    def do_GET(self) -> None:
+        server = self.server
+        server.requisicoes.append(dict(self.headers))
+        if server.falhas:
+            self.send_response(server.falhas.pop(0))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        etag = f'"{hash(server.corpo)}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(server.corpo)))
+        self.end_headers()
+        self.wfile.write(server.corpo)
+
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StubHandler)
+    server.falhas = []
+    server.corpo = b'{"stocks": []}'
+    server.requisicoes = []
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/quote/list'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_falhas_temporarias_sao_retentadas(server):
+    server.falhas = [503, 500]
+    client = HTTPClient({'retries': 3, 'backoff_factor': 0})
+    try:
+        assert client.get(server.url).content == server.corpo
+    finally:
+        client.close()
+    assert len(server.requisicoes) == 3
+
+
+def test_erro_apos_esgotar_as_retentativas(server):
+    server.falhas = [503] * 5
+    client = HTTPClient({'retries': 2, 'backoff_factor': 0})
+    try:
+        with pytest.raises(requests.HTTPError):
+            client.get(server.url)
+    finally:
+        client.close()
+    assert len(server.requisicoes) == 3
+
+
+def test_cache_revalida_com_etag_apos_o_ttl(server, tmp_path):
+    cache = ResponseCache(tmp_path, ttl=3600)
+    client = HTTPClient({'backoff_factor': 0}, cache=cache)
+    try:
+        primeira = client.fetch(server.url)
+        assert (primeira.status, primeira.content) == ('downloaded', server.corpo)
+        assert client.fetch(server.url).status == 'fresh'
+        assert len(server.requisicoes) == 1
+
+        client.settings['cache_ttl'] = 0
+        revalidada = client.fetch(server.url)
+        assert (revalidada.status, revalidada.content_hash) == ('not_modified', primeira.content_hash)
+        assert server.requisicoes[-1]['If-None-Match'] == cache.entry(server.url)['etag']
+
+        server.corpo = b'{"stocks": [{"stock": "PETR4"}]}'
+        alterada = client.fetch(server.url)
+        assert (alterada.status, alterada.content) == ('downloaded', server.corpo)
+        assert cache.read(server.url, cache.entry(server.url), 'fresh').content == server.corpo
+    finally:
+        client.close()
+    assert len(server.requisicoes) == 3
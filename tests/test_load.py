@@ -0,0 +1,32 @@
+import json
+from pathlib import Path
+
+from src.elt.load import DataLoader
+from src.elt.pipeline import Pipeline
+from src.utils.db_utils import DuckDBConnection
+
+
+def _manifesto(config: dict) -> dict:
+    with open(Path(config['paths']['gold']) / '_manifest.json') as file:
+        return json.load(file)
+
+
+def test_exportacao_regrava_so_as_tabelas_com_versao_nova(config):
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config).run(extract=False)
+        anterior = _manifesto(config)
+
+        DataLoader(db_connection, config).load_data()
+        assert _manifesto(config) == anterior
+
+        db_connection.execute("""
+            UPDATE gold.controle_tabelas SET versao = versao + 1 WHERE tabela = 'gold.dim_acoes'
+        """)
+        DataLoader(db_connection, config).load_data()
+    finally:
+        db_connection.close()
+
+    atual = _manifesto(config)
+    alteradas = {table for table in DataLoader.TABLES if atual[table] != anterior[table]}
+    assert alteradas == {'dim_acoes'}
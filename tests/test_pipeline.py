@@ -0,0 +1,86 @@
+import pytest
+
+from src.elt.pipeline import Pipeline
+from src.utils.dag import DAGRunner, Step
+from src.utils.db_utils import DuckDBConnection
+
+
+def _run(config: dict, **kwargs) -> dict:
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        return Pipeline(db_connection, config).run(extract=False, **kwargs)
+    finally:
+        db_connection.close()
+
+
+def test_segunda_execucao_sem_alteracoes_ignora_gold_fatos(config):
+    primeira = _run(config)
+    segunda = _run(config)
+
+    assert primeira['gold_fatos'] == 'concluida'
+    assert segunda['gold_fatos'] == 'ignorada'
+    assert segunda['load'] == 'ignorada'
+
+
+def test_criacao_das_tabelas_preserva_os_dados(config):
+    _run(config)
+    _run(config, stages=['gold'])
+
+    db_connection = DuckDBConnection(config['paths']['db'], read_only=True)
+    try:
+        estrategias = db_connection.sql("SELECT nome FROM gold.dim_estrategias", cache=False)
+    finally:
+        db_connection.close()
+    assert list(estrategias['nome']) == ['oportunidades']
+
+
+@pytest.mark.parametrize('iniciada_em, retomada', [
+    ('CURRENT_TIMESTAMP', True),
+    ('CURRENT_TIMESTAMP - INTERVAL 1 DAY', False),
+])
+def test_execucao_com_falha_so_e_retomada_no_mesmo_dia(config, iniciada_em, retomada):
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        runner = DAGRunner(db_connection, config)
+        runner._create_tables()
+        db_connection.execute(f"""
+            INSERT INTO gold.controle_execucoes
+            VALUES ('anterior', 'falhou', {iniciada_em}, NULL)
+        """)
+        db_connection.execute("""
+            INSERT INTO gold.controle_etapas
+            VALUES ('extract_fundamentus', 'anterior', 'concluida', '', '', 0.0, CURRENT_TIMESTAMP)
+        """)
+        execucao, concluidas = runner._execution()
+    finally:
+        db_connection.close()
+
+    if retomada:
+        assert (execucao, concluidas) == ('anterior', {'extract_fundamentus'})
+    else:
+        assert execucao != 'anterior'
+        assert concluidas == set()
+
+
+def test_etapa_reexecutada_so_quando_a_tabela_lida_e_alterada(config):
+    valor = {'x': 1}
+
+    def gravar(cursor):
+        cursor.execute(f"CREATE OR REPLACE TABLE gold.t AS SELECT {valor['x']} AS x")
+
+    def executar():
+        db_connection = DuckDBConnection(config['paths']['db'])
+        try:
+            runner = DAGRunner(db_connection, {'fonte': dict(valor)})
+            runner.add(Step('criar', lambda cursor: cursor.execute("CREATE TABLE IF NOT EXISTS gold.t (x INTEGER)")))
+            runner.add(Step('gravar', gravar, inputs=['config:fonte'], outputs=['table:gold.t'], after=['criar']))
+            runner.add(Step('ler', lambda cursor: cursor.sql("SELECT * FROM gold.t"), inputs=['table:gold.t']))
+            return runner.run()
+        finally:
+            db_connection.close()
+
+    assert executar() == {'criar': 'concluida', 'gravar': 'concluida', 'ler': 'concluida'}
+    assert executar() == {'criar': 'concluida', 'gravar': 'ignorada', 'ler': 'ignorada'}
+    # O mesmo número de linhas com outro conteúdo também muda a versão da tabela.
+    valor['x'] = 2
+    assert executar() == {'criar': 'concluida', 'gravar': 'concluida', 'ler': 'concluida'}
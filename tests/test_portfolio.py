@@ -0,0 +1,33 @@
+import pandas as pd
+from pathlib import Path
+
+from src.elt.pipeline import Pipeline
+from src.utils.db_utils import DuckDBConnection
+
+
+def _carteira(config: dict) -> pd.DataFrame:
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config).run(extract=False)
+        return db_connection.sql("""
+            SELECT rowid AS linha, *
+            FROM gold.fact_carteira_diaria
+            ORDER BY usuario_id, tempo_id
+        """, cache=False)
+    finally:
+        db_connection.close()
+
+
+def test_negociacao_sem_acao_nao_recalcula_a_carteira(config):
+    arquivo = sorted((Path(config['paths']['bronze']) / 'sheets' / 'negociacoes').glob('*.parquet'))[0]
+    negociacoes = pd.read_parquet(arquivo)
+    negociacoes.loc[0, 'ticker'] = None
+    negociacoes.to_parquet(arquivo, index=False)
+
+    primeira = _carteira(config)
+    # Outra configuração das janelas executa as transformações gold sem negociações novas.
+    config['analytics']['janelas'] = [2]
+    segunda = _carteira(config)
+
+    assert len(primeira)
+    assert segunda.equals(primeira)
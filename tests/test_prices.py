@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+
+import pyarrow.compute as pc
+
+from src.elt.prices import FakePriceProvider, HistoricalPriceExtractor, PriceCache
+
+ONTEM = date.today() - timedelta(days=1)
+
+
+def test_precos_sinteticos_nao_dependem_do_intervalo_baixado():
+    provider = FakePriceProvider()
+    inteiro = provider.download(['PETR4'], date(2024, 1, 1), date(2024, 3, 31)).to_pandas()
+    partes = provider.download(['PETR4'], date(2024, 2, 1), date(2024, 2, 29)).to_pandas()
+
+    esperado = inteiro[inteiro['date'].between(date(2024, 2, 1), date(2024, 2, 29))].reset_index(drop=True)
+    assert len(partes) == 21
+    assert partes.equals(esperado)
+
+
+def test_cache_retorna_somente_os_intervalos_nao_consultados(tmp_path):
+    cache = PriceCache(tmp_path)
+    tabela = FakePriceProvider().download(['PETR4'], date(2024, 1, 1), date(2024, 1, 31))
+    cache.write('PETR4', tabela, [(date(2024, 1, 1), date(2024, 1, 10))])
+    cache.write('PETR4', tabela, [(date(2024, 1, 11), date(2024, 1, 20)), (date(2024, 1, 25), date(2024, 1, 31))])
+
+    assert cache.ranges('PETR4') == [(date(2024, 1, 1), date(2024, 1, 20)), (date(2024, 1, 25), date(2024, 1, 31))]
+    assert cache.missing('PETR4', date(2023, 12, 1), date(2024, 2, 5)) == [
+        (date(2023, 12, 1), date(2023, 12, 31)),
+        (date(2024, 1, 21), date(2024, 1, 24)),
+        (date(2024, 2, 1), date(2024, 2, 5)),
+    ]
+    assert cache.read('PETR4').num_rows == tabela.num_rows
+
+
+def test_extrator_baixa_apenas_o_que_falta_no_cache(tmp_path):
+    provider = FakePriceProvider()
+    extractor = HistoricalPriceExtractor(provider, PriceCache(tmp_path), batch_size=2)
+
+    extractor.extract(['PETR4', 'VALE3', 'ITUB4'], date(2024, 1, 1), date(2024, 1, 31))
+    assert sorted(provider.calls) == [
+        (('ITUB4', 'PETR4'), date(2024, 1, 1), date(2024, 1, 31)),
+        (('VALE3',), date(2024, 1, 1), date(2024, 1, 31)),
+    ]
+
+    provider.calls.clear()
+    assert extractor.extract(['PETR4', 'VALE3'], date(2024, 1, 1), date(2024, 1, 31)).num_rows == 0
+    assert provider.calls == []
+
+    novos = extractor.extract(['PETR4', 'BBAS3'], date(2024, 1, 15), date(2024, 2, 29))
+    assert sorted(provider.calls) == [
+        (('BBAS3',), date(2024, 1, 15), date(2024, 2, 29)),
+        (('PETR4',), date(2024, 2, 1), date(2024, 2, 29)),
+    ]
+    assert pc.min(novos.filter(pc.equal(novos['ticker'], 'PETR4'))['date']).as_py() == date(2024, 2, 1)
+
+    cache = PriceCache(tmp_path)
+    esperado = provider.download(['PETR4'], date(2024, 1, 1), date(2024, 2, 29))
+    assert cache.read('PETR4').equals(esperado)
+
+
+def test_extrator_baixa_novamente_o_dia_corrente(tmp_path):
+    provider = FakePriceProvider()
+    extractor = HistoricalPriceExtractor(provider, PriceCache(tmp_path))
+
+    extractor.extract(['PETR4'], ONTEM - timedelta(days=10))
+    provider.calls.clear()
+    extractor.extract(['PETR4'], ONTEM - timedelta(days=10))
+
+    assert provider.calls == [(('PETR4',), date.today(), date.today())]
@@ -0,0 +1,66 @@
+import os
+from pathlib import Path
+
+from src.elt.pipeline import Pipeline
+from src.utils.db_utils import DuckDBConnection
+from src.utils.publish import SnapshotPublisher
+
+
+def _publicar(config: dict, publisher: SnapshotPublisher) -> str:
+    staged = publisher.prepare()
+    db_connection = DuckDBConnection(staged['paths']['db'])
+    try:
+        Pipeline(db_connection, staged).run(extract=False)
+    finally:
+        db_connection.close()
+    publisher.publish()
+    return publisher.version
+
+
+def _versao_publicada(config: dict) -> tuple:
+    """Retorna as versões de que o banco e a camada gold publicados são lidos."""
+    db_file = Path(config['paths']['db']).resolve()
+    gold_dir = (Path(config['paths']['gold']) / 'current').resolve()
+    return db_file.parent.parent.name, gold_dir.parent.name
+
+
+def test_banco_e_gold_sao_publicados_por_um_unico_link(config):
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config).run(extract=False)
+    finally:
+        db_connection.close()
+
+    # A primeira publicação parte do banco e das exportações gravados sem publicação.
+    primeira = _publicar(config, SnapshotPublisher(config, keep=2))
+    assert Path(config['paths']['db']).is_symlink()
+    assert _versao_publicada(config) == (primeira, primeira)
+
+    segunda = _publicar(config, SnapshotPublisher(config, keep=2))
+    assert _versao_publicada(config) == (segunda, segunda)
+    assert os.readlink(Path(config['paths']['gold']) / 'versions' / 'current') == segunda
+    assert (Path(config['paths']['gold']) / 'current' / 'fact_indicadores.parquet').exists()
+    db_connection = DuckDBConnection(config['paths']['db'], read_only=True)
+    try:
+        assert len(db_connection.sql("SELECT * FROM gold.dim_acoes", cache=False)) > 0
+    finally:
+        db_connection.close()
+
+    assert SnapshotPublisher(config, keep=2).rollback() == primeira
+    assert _versao_publicada(config) == (primeira, primeira)
+
+    terceira = _publicar(config, SnapshotPublisher(config, keep=2))
+    assert SnapshotPublisher(config).versions() == [segunda, terceira]
+
+
+def test_versao_com_falha_e_retomada_sem_alterar_a_publicada(config):
+    primeira = _publicar(config, SnapshotPublisher(config))
+
+    publisher = SnapshotPublisher(config)
+    publisher.prepare()
+    publisher.discard()
+    assert _versao_publicada(config) == (primeira, primeira)
+
+    retomada = SnapshotPublisher(config)
+    retomada.prepare()
+    assert retomada.version == publisher.version
@@ -0,0 +1,47 @@
+from src.utils.db_utils import DuckDBConnection
+from src.utils.query_cache import QueryCache
+
+
+def test_normalizacao_preserva_os_espacos_dos_literais():
+    assert QueryCache.normalize("SELECT   'a  b'\n FROM t ;") == "SELECT 'a  b' FROM t"
+    assert QueryCache.normalize("SELECT 'a  b' FROM t") != QueryCache.normalize("SELECT 'a b' FROM t")
+
+
+def test_escrita_invalida_apenas_as_tabelas_alteradas(tmp_path):
+    cache = QueryCache()
+    db_connection = DuckDBConnection(tmp_path / 'database.db', cache=cache)
+    try:
+        db_connection.execute("CREATE TABLE a AS SELECT 1 AS x")
+        db_connection.execute("CREATE TABLE b AS SELECT 1 AS x")
+
+        db_connection.sql("SELECT SUM(x) AS x FROM a")
+        db_connection.execute("INSERT INTO b VALUES (2)")
+        db_connection.sql("SELECT SUM(x) AS x FROM a")
+        assert cache.stats()['hits'] == 1
+
+        db_connection.execute("INSERT INTO a VALUES (2)")
+        assert db_connection.sql("SELECT SUM(x) AS x FROM a")['x'][0] == 3
+        assert cache.stats()['hits'] == 1
+    finally:
+        db_connection.close()
+
+
+def test_escritas_em_queries_com_varios_statements_invalidam_o_cache(tmp_path):
+    cache = QueryCache()
+    db_connection = DuckDBConnection(tmp_path / 'database.db', cache=cache)
+    try:
+        db_connection.execute("CREATE TABLE a AS SELECT 1 AS x; CREATE TABLE b AS SELECT 1 AS x")
+        assert db_connection.sql("SELECT SUM(x) AS x FROM b")['x'][0] == 1
+
+        db_connection.execute("DELETE FROM a; INSERT INTO b SELECT 2 WHERE '; SELECT 1' <> ''")
+        assert db_connection.sql("SELECT SUM(x) AS x FROM b")['x'][0] == 3
+
+        assert db_connection.sql("SELECT COUNT(*) AS n FROM a")['n'][0] == 0
+        db_connection.arrow("INSERT INTO a VALUES (5)")
+        assert db_connection.sql("SELECT COUNT(*) AS n FROM a")['n'][0] == 1
+    finally:
+        db_connection.close()
+
+
+def test_separacao_dos_statements_preserva_os_literais():
+    assert QueryCache.statements("SELECT ';'; DELETE FROM \"a;b\";") == ["SELECT ';'", ' DELETE FROM "a;b"']
@@ -0,0 +1,48 @@
+import copy
+
+import pytest
+
+from src.elt.pipeline import Pipeline
+from src.utils.db_utils import DuckDBConnection
+
+
+def _run(config: dict, full_refresh: bool = False) -> None:
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config, full_refresh=full_refresh).run(extract=False)
+    finally:
+        db_connection.close()
+
+
+def _oportunidades(config: dict):
+    db_connection = DuckDBConnection(config['paths']['db'], read_only=True)
+    try:
+        return db_connection.sql("SELECT * FROM gold.fact_oportunidades ORDER BY id", cache=False)
+    finally:
+        db_connection.close()
+
+
+@pytest.mark.parametrize('screener', [
+    {'estrategias': {'oportunidades': ['cotacao_positiva']}},
+    {
+        'estrategias': {'oportunidades': ['cotacao_positiva', 'p_vp_abaixo_de_1'], 'todas': ['cotacao_positiva']},
+        'oportunidades': 'todas',
+    },
+])
+def test_alterar_a_estrategia_regera_as_oportunidades(config, tmp_path, capsys, screener):
+    _run(config)
+    antes = _oportunidades(config)
+    capsys.readouterr()
+
+    alterada = copy.deepcopy(config)
+    alterada['screener'].update(screener)
+    _run(alterada)
+    assert 'Reavaliando as regras' not in capsys.readouterr().out
+
+    referencia = copy.deepcopy(alterada)
+    referencia['paths']['db'] = str(tmp_path / 'referencia.db')
+    _run(referencia, full_refresh=True)
+
+    depois = _oportunidades(alterada)
+    assert len(depois) != len(antes)
+    assert depois.equals(_oportunidades(referencia))
@@ -0,0 +1,67 @@
+import os
+import shutil
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from src.elt.pipeline import Pipeline
+from src.serve.catalog import ENDPOINTS
+from src.serve.server import GoldService
+from src.utils.db_utils import DuckDBConnection
+
+
+def test_todos_os_endpoints_respondem_com_paginacao(config):
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config).run(extract=False)
+        ticker = db_connection.sql("SELECT ticker FROM gold.dim_acoes ORDER BY id LIMIT 1", cache=False)['ticker'][0]
+    finally:
+        db_connection.close()
+
+    valores = {'usuario_id': '1', 'ticker': ticker}
+    service = GoldService(config)
+    try:
+        for name, endpoint in ENDPOINTS.items():
+            query = {param: valores[param] for param, (_, required) in endpoint.params.items() if required}
+            pagina, seguinte = service.query(name, {**query, 'limit': 1})
+            assert pagina.num_rows <= 1
+            if seguinte is not None:
+                assert service.query(name, {**query, 'limit': 1, 'offset': seguinte})[0].num_rows == 1
+
+        vazia, seguinte = service.query('indicadores', {'ticker': "x' OR '1'='1"})
+        assert (vazia.num_rows, seguinte) == (0, None)
+    finally:
+        service.close()
+
+
+def test_nova_versao_troca_todas_as_views_de_uma_vez(config):
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config).run(extract=False)
+    finally:
+        db_connection.close()
+
+    service = GoldService(config)
+    try:
+        assert service.query('oportunidades', {})[0].num_rows >= 0
+        # Uma consulta em andamento mantém o esquema da versão anterior.
+        anterior = service._acquire_schema()
+        gold_path = Path(config['paths']['gold'])
+        for path in gold_path.glob('fact_oportunidades*'):
+            shutil.rmtree(path) if path.is_dir() else path.unlink()
+        manifest = gold_path / '_manifest.json'
+        os.utime(manifest, ns=(manifest.stat().st_atime_ns, manifest.stat().st_mtime_ns + 1))
+
+        with pytest.raises(duckdb.CatalogException):
+            service.query('oportunidades', {})
+        esquemas = service.connection.sql("SELECT DISTINCT schema_name FROM duckdb_views() WHERE NOT internal")
+        assert set(esquemas['schema_name']) == {anterior, 'gold_v2'}
+        service._release_schema(anterior)
+        views = service.connection.sql("SELECT schema_name, view_name FROM duckdb_views() WHERE NOT internal")
+    finally:
+        service.close()
+
+    assert set(views['schema_name']) == {'gold_v2'}
+    assert 'fact_oportunidades' not in set(views['view_name'])
+    assert 'fact_posicoes' in set(views['view_name'])
@@ -0,0 +1,57 @@
+import copy
+import shutil
+from pathlib import Path
+
+import duckdb
+
+from src.elt.pipeline import Pipeline
+from src.elt.transformations import ShardTransformer
+from src.utils.db_utils import DuckDBConnection
+
+TABELAS = ['fact_negociacoes', 'fact_posicoes', 'fact_carteira_diaria']
+
+
+def _run(config: dict, full_refresh: bool = False) -> None:
+    db_connection = DuckDBConnection(config['paths']['db'])
+    try:
+        Pipeline(db_connection, config, full_refresh=full_refresh).run(extract=False)
+    finally:
+        db_connection.close()
+
+
+def _checksums(db_path: str) -> dict:
+    conn = duckdb.connect(db_path, read_only=True)
+    try:
+        return {
+            tabela: conn.execute(f"SELECT COUNT(*), SUM(HASH(t))::VARCHAR FROM gold.{tabela} AS t").fetchone()
+            for tabela in TABELAS
+        }
+    finally:
+        conn.close()
+
+
+def test_shards_incrementais_equivalem_ao_full_refresh_sem_shards(config, tmp_path):
+    bronze = Path(config['paths']['bronze'])
+    escondidas = tmp_path / 'escondidas'
+    for fonte in ['fundamentus', 'brapi']:
+        (escondidas / fonte).mkdir(parents=True)
+        for particao in sorted((bronze / fonte).iterdir())[-2:]:
+            shutil.move(particao, escondidas / fonte / particao.name)
+
+    sharded = copy.deepcopy(config)
+    sharded['sharding'] = {'enabled': True, 'shards': 3, 'max_workers': 2}
+    _run(sharded)
+
+    # Snapshots novos e um usuário sem negociações: a segunda execução mescla só as alterações.
+    for fonte in ['fundamentus', 'brapi']:
+        for particao in (escondidas / fonte).iterdir():
+            shutil.move(particao, bronze / fonte / particao.name)
+    sorted((bronze / 'sheets' / 'negociacoes').iterdir())[0].unlink()
+    _run(sharded)
+    assert not ShardTransformer(None, sharded).reconstruir_path.exists()
+
+    unsharded = copy.deepcopy(config)
+    unsharded['paths']['db'] = str(tmp_path / 'unsharded.db')
+    _run(unsharded, full_refresh=True)
+
+    assert _checksums(sharded['paths']['db']) == _checksums(unsharded['paths']['db'])
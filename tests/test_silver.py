@@ -0,0 +1,22 @@
+from src.elt.transformations import SilverTransformer
+from src.utils.db_utils import DuckDBConnection
+
+
+def _negociacoes(config: dict, threads: int):
+    db_connection = DuckDBConnection(config['paths']['db'], settings={'threads': threads})
+    try:
+        transformer = SilverTransformer(db_connection, config)
+        transformer.create_tables()
+        transformer.load_negociacoes()
+        return db_connection.sql("SELECT * FROM silver.negociacoes ORDER BY id", cache=False)
+    finally:
+        db_connection.close()
+
+
+def test_ids_das_negociacoes_sao_deterministicos(config):
+    primeira = _negociacoes(config, threads=1)
+    segunda = _negociacoes(config, threads=4)
+
+    assert primeira.equals(segunda)
+    chave = ['usuario_id', 'data_movimentacao', 'ticker']
+    assert primeira[chave].equals(primeira.sort_values(chave, kind='stable')[chave])